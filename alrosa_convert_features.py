@@ -2,17 +2,21 @@ import re
 from pprint import pprint
 from typing import Any, Callable, Dict, List, Optional
 
-import pudb
 import rdflib
-from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import RDF, RDFS, XSD
 
+from logs import get_logger
+from skolem import skolem_iri
+
 # Определение пространств имен
 CRUST = Namespace("http://crust.irk.ru/ontology/contents/terms/1.0/")
 RDF_NAMESPACE = RDF
 RDFS_NAMESPACE = RDFS
 XSD_NAMESPACE = XSD
 
+log = get_logger("alrosa_convert_features")
+
 
 def normalize_key(key: str) -> str:
     """
@@ -80,6 +84,18 @@ def create_pipe_uri(pipe_id: str) -> URIRef:
     return CRUST[f"KimberlitePipe/{pipe_id}"]
 
 
+def section_node(parent_node, predicate, node_type, mapping) -> URIRef:
+    """
+    Возвращает IRI узла раздела описания трубки.
+
+    Узел определяется родителем, предикатом, типом и набором ключей
+    маппинга: разделы одного типа (например, геотермальные данные по
+    клинопироксену и по гранату) различаются ключами.
+    """
+    return skolem_iri(parent_node, "section", predicate=predicate,
+                      type=node_type, keys=",".join(mapping))
+
+
 def data_take_value(ddata_dict, key):
     val = data_dict.get(key)
     del data_dict[key]
@@ -95,13 +111,13 @@ def add_mapped_triples_with_callback(
     mapping: Dict[str, Any],
     callback: Callable,
     **callback_kwargs,
-) -> BNode:
+) -> URIRef:
     """
     Добавляет набор триплетов с использованием callback-функции для создания сложных структур.
 
     Args:
         g: RDF граф
-        parent_node: Родительский узел (URI или BNode)
+        parent_node: Родительский узел
         predicate: Предикат для связи родительского узла с новым узлом
         node_type: Тип нового узла
         data_dict: Словарь с данными
@@ -110,10 +126,10 @@ def add_mapped_triples_with_callback(
         **callback_kwargs: Дополнительные аргументы для callback
 
     Returns:
-        Созданный BNode
+        Созданный узел (детерминированный IRI, см. section_node())
     """
     # Создаем новый узел
-    new_node = BNode()
+    new_node = section_node(parent_node, predicate, node_type, mapping)
     g.add((parent_node, predicate, new_node))
     g.add((new_node, RDF.type, node_type))
 
@@ -130,7 +146,7 @@ def add_mapped_triples_with_callback(
             del data_dict[key]
             callback(g, new_node, key, val, map_key, **callback_kwargs)
         else:
-            print("ERROR: cannot map {} with {}.".format(key, val))
+            log.warning("cannot map %s with %s.", key, val)
 
     return new_node
 
@@ -145,13 +161,13 @@ def add_mapped_triples(
     numeric_props: Optional[List] = None,
     search_keys: bool = False,
     normalize_search: bool = False,
-) -> BNode:
+) -> URIRef:
     """
     Добавляет набор триплетов в функциональном стиле.
 
     Args:
         g: RDF граф
-        parent_node: Родительский узел (URI или BNode)
+        parent_node: Родительский узел
         predicate: Предикат для связи родительского узла с новым узлом
         node_type: Тип нового узла
         data_dict: Словарь с данными
@@ -161,10 +177,10 @@ def add_mapped_triples(
         normalize_search: Если True, нормализует ключи при поиске
 
     Returns:
-        Созданный BNode
+        Созданный узел (детерминированный IRI, см. section_node())
     """
     # Создаем новый узел
-    new_node = BNode()
+    new_node = section_node(parent_node, predicate, node_type, mapping)
     g.add((parent_node, predicate, new_node))
     g.add((new_node, RDF.type, node_type))
 
@@ -205,7 +221,7 @@ def add_mapped_triples(
                 if num_val is not None:
                     g.add((new_node, prop, Literal(num_val, datatype=XSD.decimal)))
                 else:
-                    print("ERROR: None value ", key)
+                    log.warning("None value %s", key)
             else:
                 g.add((new_node, prop, Literal(str(value), lang="ru")))
     return new_node
@@ -284,7 +300,8 @@ def convert_features_to_rdf(g: Graph, tube, pipe_uri=None) -> Graph:
         ):
             num_val = clean_numeric(value)
             if num_val is not None:
-                fraction_bnode = BNode()
+                fraction_bnode = skolem_iri(parent_node, "olivine-fraction",
+                                            key=key)
                 g.add((parent_node, CRUST.hasOlivineFraction, fraction_bnode))
                 g.add((fraction_bnode, RDF.type, CRUST.OlivineSizeFraction))
 
@@ -352,7 +369,7 @@ def convert_features_to_rdf(g: Graph, tube, pipe_uri=None) -> Graph:
         assoc_data = data_dict["assoc"]
 
         # Создаем основной узел для алмазной ассоциации
-        assoc_bnode = BNode()
+        assoc_bnode = skolem_iri(pipe_uri, "diamond-association")
         g.add((pipe_uri, CRUST.hasDiamondAssociation, assoc_bnode))
         g.add((assoc_bnode, RDF.type, CRUST.DiamondAssociation))
 
@@ -466,14 +483,17 @@ def convert_features_to_rdf(g: Graph, tube, pipe_uri=None) -> Graph:
                     del assoc_data[data_key]
                     # Создаем композицию для минерала, если еще не создана
                     if mineral_code not in mineral_compositions:
-                        comp_bnode = BNode()
+                        comp_bnode = skolem_iri(pipe_uri, "mineral-composition",
+                                                mineral=mineral_code)
                         g.add((pipe_uri, CRUST.mineralComposition, comp_bnode))
                         g.add((comp_bnode, RDF.type, CRUST.MineralTypeComposition))
                         g.add((comp_bnode, CRUST.forMineral, mineral_uri))
                         mineral_compositions[mineral_code] = comp_bnode
 
                     # Добавляем значение типа
-                    value_bnode = BNode()
+                    value_bnode = skolem_iri(
+                        mineral_compositions[mineral_code],
+                        "mineral-type-value", key=data_key)
                     g.add(
                         (
                             mineral_compositions[mineral_code],
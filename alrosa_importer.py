@@ -9,10 +9,7 @@ from pprint import pprint
 
 import openpyxl
 import pandas as pd
-import pudb
 from openpyxl.cell import Cell
-from pandas.core.internals.blocks import IgnoreRaise
-from pandas.core.internals.managers import new_block
 from rdflib import (
     DCTERMS,
     FOAF,
@@ -25,6 +22,7 @@ from rdflib import (
     URIRef,
 )
 from rdflib.namespace import SDO, WGS
+from sqlalchemy import create_engine
 
 from alrosa_convert_features import canonicalize_keys, convert_features_to_rdf
 from alrosa_models import (
@@ -33,37 +31,56 @@ from alrosa_models import (
     Geochemy,
     Isotopes,
     LAMAnalysis,
+    Measurement,
     Oxides,
     Petrochemy,
     Phlogopite,
+    PipeImport,
 )
+from bulk_load import LOADERS, default_loader, load_dataframe
+from graph_store import GraphStore
+from instrument import TRACER, count, count_sql_round_trips, span
+from logs import add_arguments, get_logger, print_summary, setup_from_args
+from memory import MemoryBudget, MemoryBudgetExceeded
 from namespace import BIBO, CGI, DBP, DBP_OWL, GS, MT, PT, SCHEMA, P
+from normalization import normalize_frame
+from profiling import add_arguments as add_profile_arguments
+from profiling import setup_from_args as setup_profile
+from schema import ensure_schema
+from skolem import generate_deterministic_uuid
 
 CONNECTION_STRING = "sqlite:///tubes.db"
 # CONNECTION_STRING = "sqlite:///:memory:"
+
+
+def bind_namespaces(g):
+    """Добавление алиасов (префиксов) для пространств имен"""
+    g.bind("foaf", FOAF)
+    g.bind("xsd", XSD)
+    g.bind("rdf", RDF)
+    g.bind("rdfs", RDFS)
+    g.bind("dcterms", DCTERMS)
+    g.bind("wgs", WGS)
+    g.bind("sdo", SDO)
+    g.bind("pt", PT)
+    g.bind("p", P)
+    g.bind("schema", SCHEMA)
+    g.bind("bibo", BIBO)
+    g.bind("mt", MT)
+    g.bind("gs", GS)
+    g.bind("cgi", CGI)
+    g.bind("dbp", DBP)
+    g.bind("dbp-owl", DBP_OWL)
+    return g
+
+
 # Создание графа
-G = Graph()
-
-# Добавление алиасов (префиксов) для пространств имен
-G.bind("foaf", FOAF)
-G.bind("xsd", XSD)
-G.bind("rdf", RDF)
-G.bind("rdfs", RDFS)
-G.bind("dcterms", DCTERMS)
-G.bind("wgs", WGS)
-G.bind("sdo", SDO)
-G.bind("pt", PT)
-G.bind("p", P)
-G.bind("schema", SCHEMA)
-G.bind("bibo", BIBO)
-G.bind("mt", MT)
-G.bind("gs", GS)
-G.bind("cgi", CGI)
-G.bind("dbp", DBP)
-G.bind("dbp-owl", DBP_OWL)
+G = bind_namespaces(Graph())
 
 import pickle
 
+log = get_logger("alrosa_importer")
+
 
 def save_dict_as_pickle(data_dict, filename="data.pkl"):
     """
@@ -227,7 +244,6 @@ def import_transposed_table_as_data_frame(sheet, column_number, match_string):
     - Subsequent rows contain data for different samples
     - Columns represent different samples/analyses
     """
-    # pu.db
     matches = search_substring_on_sheet(sheet, column_number, match_string)
     if not matches:
         return None
@@ -453,7 +469,7 @@ def normalize_columns(df, table_name):
         # Пропускаем None
         if pd.isna(col) or col is None:
             new_col = f"val_{i}"
-            print(f"  {table_name}: колонка {i} была None -> '{new_col}'")
+            log.info("%s: колонка %s была None -> '%s'", table_name, i, new_col)
             new_columns.append(new_col)
             continue
 
@@ -487,7 +503,7 @@ def normalize_columns(df, table_name):
         # Если после всех преобразований получилась пустая строка
         if not col_str:
             col_str = f"val_{i}"
-            print(f"  {table_name}: колонка '{original}' стала пустой -> '{col_str}'")
+            log.info("%s: колонка '%s' стала пустой -> '%s'", table_name, original, col_str)
 
         # Проверка на дубликаты (если такое имя уже есть)
         base_col = col_str
@@ -497,7 +513,7 @@ def normalize_columns(df, table_name):
             counter += 1
 
         if original != col_str:
-            print(f"  {table_name}: '{original}' -> '{col_str}'")
+            log.info("%s: '%s' -> '%s'", table_name, original, col_str)
 
         new_columns.append(col_str)
 
@@ -552,7 +568,7 @@ def preprocess_diamonds(df):
     # 1. Переименовываем колонку '75' в '000_075'
     if "75" in df.columns:
         df.rename(columns={"75": "000_075"}, inplace=True)
-        print("Переименована колонка '75' -> '000_075'")
+        log.info("Переименована колонка '75' -> '000_075'")
 
     # 2. Словарь для переименования всех диапазонов в формат XXX_YYY
     range_columns = {}
@@ -579,7 +595,7 @@ def preprocess_diamonds(df):
     # Применяем переименование
     df.rename(columns=range_columns, inplace=True)
     for old, new in range_columns.items():
-        print(f"Переименована колонка '{old}' -> '{new}'")
+        log.info("Переименована колонка '%s' -> '%s'", old, new)
 
     # 3. Собираем все колонки с диапазонами
     range_pattern = re.compile(r"^\d{3}_\d{3}$")
@@ -592,7 +608,7 @@ def preprocess_diamonds(df):
 
     range_cols.sort(key=sort_key)
 
-    print(f"\nНайдены диапазоны ({len(range_cols)}): {range_cols}")
+    log.info("Найдены диапазоны (%s): %s", len(range_cols), range_cols)
 
     # 4. Создаём JSONB колонку с фракциями
     def create_fractions_json(row):
@@ -635,22 +651,22 @@ def post_process_dataframes(normalized_dfs):
         val_cols = [col for col in df.columns if re.match(r"val_\d+", col)]
 
         if val_cols:
-            print(f"\ndiamonds: найдены колонки {val_cols}")
+            log.info("diamonds: найдены колонки %s", val_cols)
 
             # Переименовываем первую найденную val_ в 'check'
             first_val = val_cols[0]
             df.rename(columns={first_val: "check"}, inplace=True)
-            print(f"  Переименована {first_val} -> check")
+            log.info("diamonds: переименована %s -> check", first_val)
 
             # Если были другие val_ колонки, оставляем их как есть
             if len(val_cols) > 1:
-                print(f"  Остальные val_ колонки оставлены: {val_cols[1:]}")
+                log.info("diamonds: остальные val_ колонки оставлены: %s", val_cols[1:])
 
             # Преобразуем значения в колонке check
             if "check" in df.columns:
                 # ok -> True, всё остальное -> False
                 df["check"] = df["check"].apply(lambda x: True if x == "ok" else False)
-                print(f"  Колонка check преобразована: 'ok' -> True, иначе -> False")
+                log.info("diamonds: колонка check преобразована: 'ok' -> True, иначе -> False")
         df, _range_cols = preprocess_diamonds(df)
         processed_dfs["diamonds"] = df
 
@@ -662,7 +678,7 @@ def post_process_dataframes(normalized_dfs):
         val_20_cols = [col for col in df.columns if col == "val_20"]
         for col in val_20_cols:
             df.rename(columns={col: "a_number"}, inplace=True)
-            print(f"\nepma: {col} -> a_number")
+            log.info("epma: %s -> a_number", col)
 
         # 2.2 Обработка val_17
         if "val_17" in df.columns:
@@ -680,22 +696,22 @@ def post_process_dataframes(normalized_dfs):
 
             if id_columns:
                 id_col = id_columns[0]  # Берём первую подходящую колонку
-                print(f"\nepma: используем колонку '{id_col}' для идентификации проб")
+                log.info("epma: используем колонку '%s' для идентификации проб", id_col)
 
                 # Для трубки 1_5 переименовываем в correction
                 mask_1_5 = df[id_col] == "1_5"
                 if mask_1_5.any():
                     # Создаём новую колонку correction только для строк с 1_5
                     df.loc[mask_1_5, "correction"] = df.loc[mask_1_5, "val_17"]
-                    print(f"  val_17 для трубки 1_5 -> correction")
+                    log.info("epma: val_17 для трубки 1_5 -> correction")
 
                 # Для трубки 2_1 удаляем значения
                 mask_2_1 = df[id_col] == "2_1"
                 if mask_2_1.any():
                     df.loc[mask_2_1, "val_17"] = None
-                    print(f"  val_17 для трубки 2_1 удалён (значения заменены на None)")
+                    log.info("epma: val_17 для трубки 2_1 удалён (значения заменены на None)")
             else:
-                print(f"\nepma: не найдена колонка с идентификатором пробы")
+                log.warning("epma: не найдена колонка с идентификатором пробы")
 
     # 3. Обработка oxides
     if "oxides" in processed_dfs:
@@ -704,25 +720,25 @@ def post_process_dataframes(normalized_dfs):
         # 3.1 val_16 -> удалить
         if "val_16" in df.columns:
             df.drop(columns=["val_16"], inplace=True)
-            print(f"\noxides: val_16 удалён")
+            log.info("oxides: val_16 удалён")
 
         # 3.2 val_17 -> total
         if "val_17" in df.columns:
             df.rename(columns={"val_17": "total"}, inplace=True)
-            print(f"oxides: val_17 -> total")
+            log.info("oxides: val_17 -> total")
 
     # 4. Обработка phlogopite - val_17 игнорируем
     if "phlogopite" in processed_dfs:
         df = processed_dfs["phlogopite"]
 
         if "val_17" in df.columns:
-            print(f"\nphlogopite: val_17 оставлен без изменений (игнорируем)")
+            log.info("phlogopite: val_17 оставлен без изменений (игнорируем)")
 
     # 5. Проверяем, нет ли ещё где val_ колонок
     for name, df in processed_dfs.items():
         val_cols = [col for col in df.columns if re.match(r"val_\d+", col)]
         if val_cols and name not in ["diamonds", "epma", "oxides", "phlogopite"]:
-            print(f"\n{name}: найдены необработанные val_ колонки: {val_cols}")
+            log.warning("%s: найдены необработанные val_ колонки: %s", name, val_cols)
 
     return processed_dfs
 
@@ -876,27 +892,73 @@ def convert_to_canonic_form(tube):
     return name, new_data
 
 
-def generate_deterministic_uuid(
-    pipe_name: str = "",
-    namespace: str = "http://crust.irk.ru/ontology/contents/1.0/",
-    pipe_uuid: str = "",
-    **kwargs,
-) -> uuid.UUID:
+# Единицы хранения столбцов анализов в SQL-таблицах
+FRAME_UNITS = {
+    "oxides": "%",
+    "petrochemy": "%",
+    "phlogopite": "%",
+    "epma": "%",
+    "geochemy": "PPM",
+    "lam": "PPM",
+}
+
+
+def normalize_frames(dfs, units=FRAME_UNITS, source_units=None):
     """
-    Генерирует детерминированный UUID v5 на основе имени трубки (и/или UUID) и дополнительных данных
+    Приводит столбцы элементов и оксидов к числовому виду и пересчитывает
+    их в единицы хранения.
+
+    Значения вида '0,15' распознаются как числа, нечисловые - становятся NaN.
+
+    Args:
+        dfs (dict): Таблицы трубки.
+        units (dict): Единица хранения для каждой таблицы.
+        source_units (dict): Единицы исходных данных по таблицам - одна
+            единица, {столбец: единица} или вектор единиц по строкам (см.
+            normalization.normalize_frame()). В листах Alrosa единицы не
+            указаны, поэтому по умолчанию исходная единица равна единице
+            хранения.
     """
-    # Создаем UUID v5 на основе пространства имен и имени
-    namespace_uuid = uuid.NAMESPACE_DNS  # Или можно создать свой
-    uuid_additional_data = ""
-    for key, value in kwargs.items():
-        uuid_additional_data += f"{str(key)}:{str(value)}"
-    new_pipe_uuid = uuid.uuid5(
-        namespace_uuid, f"{namespace}{pipe_name}{str(pipe_uuid)}{uuid_additional_data}"
-    )
-    return new_pipe_uuid
+    source_units = source_units or {}
+    new_dfs = dict(dfs)
+    for name, unit in units.items():
+        if name in new_dfs:
+            new_dfs[name] = normalize_frame(
+                new_dfs[name], source_units.get(name, unit), to_unit=unit)
+    return new_dfs
+
+
+RUN_REPORT = "alrosa-run.json"
+
+# Порядок импорта таблиц: (ключ кадра, название, модель, параметры импорта)
+SQL_TABLES = [
+    ("oxides", "Oxides", Oxides, {"if_exists": "fail"}),
+    ("diamonds", "Diamonds", Diamonds, {"if_exists": "fail"}),
+    ("isotopic", "Isotopic", Isotopes, {"if_exists": "fail"}),
+    ("phlogopite", "Phlogopite", Phlogopite, {"if_exists": "fail"}),
+    ("petrochemy", "Petrochemy", Petrochemy, {"if_exists": "fail"}),
+    ("geochemy", "Geochemy", Geochemy, {"if_exists": "fail"}),
+    # Import serious tables EPMA, LAM
+    ("epma", "EPMA", EPMAAnalysis, {}),
+    ("lam", "LAM", LAMAnalysis, {}),
+]
 
 
-def convert_dataframes_to_sql(dfs, connection_string, pipe_uuid):
+def convert_dataframes_to_sql(dfs, connection_string, pipe_uuid, loader=None,
+                              source_units=None):
+    """
+    Импорт таблиц трубки в SQL.
+
+    loader: 'orm' - import_from_dataframe() моделей, 'bulk' - bulk_load
+    (COPY на PostgreSQL); по умолчанию выбирается по базе.
+    source_units: единицы исходных таблиц, если они отличаются от единиц
+    хранения FRAME_UNITS (см. normalize_frames()).
+    """
+    ensure_schema(connection_string)
+    engine = create_engine(connection_string)
+    loader = loader or default_loader(engine)
+    with span("normalize"):
+        dfs = normalize_frames(dfs, source_units=source_units)
     frame_names = [
         "phlogopite",
         "isotopic",
@@ -907,54 +969,28 @@ def convert_dataframes_to_sql(dfs, connection_string, pipe_uuid):
         "petrochemy",
         "geochemy",
     ]
-    if "oxides" in dfs:  #
-        print("Importing Oxides")
-        df = dfs["oxides"]
-        Oxides.import_from_dataframe(df, pipe_uuid, connection_string, if_exists="fail")
-    if "diamonds" in dfs:  #
-        print("Importing Diamonds")
-        df = dfs["diamonds"]
-        Diamonds.import_from_dataframe(
-            df, pipe_uuid, connection_string, if_exists="fail"
-        )
-    if "isotopic" in dfs:  #
-        print("Importing Isotopic")
-        df = dfs["isotopic"]
-        Isotopes.import_from_dataframe(
-            df, pipe_uuid, connection_string, if_exists="fail"
-        )
-    if "phlogopite" in dfs:  #
-        print("Importing Phlogopite")
-        df = dfs["phlogopite"]
-        Phlogopite.import_from_dataframe(
-            df, pipe_uuid, connection_string, if_exists="fail"
-        )
-    if "petrochemy" in dfs:  #
-        print("Importing Petrochemy")
-        df = dfs["petrochemy"]
-        Petrochemy.import_from_dataframe(
-            df, pipe_uuid, connection_string, if_exists="fail"
-        )
-    if "geochemy" in dfs:  #
-        print("Importing Geochemy")
-        df = dfs["geochemy"]
-        Geochemy.import_from_dataframe(
-            df, pipe_uuid, connection_string, if_exists="fail"
-        )
-    # Import serious tables EPMA, LAM
-    if "epma" in dfs:  #
-        print("Importing EPMA")
-        df = dfs["epma"]
-        EPMAAnalysis.import_from_dataframe(df, pipe_uuid, connection_string)
-    if "lam" in dfs:  #
-        print("Importing LAM")
-        df = dfs["lam"]
-        LAMAnalysis.import_from_dataframe(df, pipe_uuid, connection_string)
+    for name, label, model, options in SQL_TABLES:
+        if name not in dfs:
+            continue
+        log.info("Importing %s", label)
+        df = dfs[name]
+        with span("sql", table=name):
+            count("rows", len(df))
+            count("cells", int(df.size))
+            if loader == "bulk":
+                with engine.begin() as connection:
+                    load_dataframe(connection, model, df, pipe_uuid, **options)
+            else:
+                model.import_from_dataframe(df, pipe_uuid, connection_string, **options)
+    with span("sql", table="measurements"):
+        with engine.begin() as connection:
+            count("measurements", Measurement.refresh(connection, pipe_uuid))
+            PipeImport.record(connection, pipe_uuid)
     # print("Frames:", dfs.keys())
     # quit()
 
 
-def export_tube(g, tube):
+def export_tube(g, tube, connection_string=CONNECTION_STRING, loader=None):
     tube_name, tube_dict = tube
 
     print("Processing pipe {}".format(tube_name))
@@ -963,6 +999,7 @@ def export_tube(g, tube):
         return None
 
     tube_uri = P[tube_name]
+    before = len(g)
 
     # Add type assertion
     g.add((tube_uri, RDF.type, PT.KimberlitePipe))
@@ -977,9 +1014,11 @@ def export_tube(g, tube):
     features = tube_dict.get("features", {})
     dataframes = tube_dict.get("frames", {})
 
-    convert_features_to_rdf(G, (tube_name, features), tube_uri)
+    with span("rdf"):
+        convert_features_to_rdf(g, (tube_name, features), tube_uri)
+    count("triples", len(g) - before)
 
-    convert_dataframes_to_sql(dataframes, CONNECTION_STRING, pipe_uuid)
+    convert_dataframes_to_sql(dataframes, connection_string, pipe_uuid, loader)
 
     print("INFO: features after conversion:", end=": ")
     pprint(features)
@@ -987,58 +1026,273 @@ def export_tube(g, tube):
     return tube_uri
 
 
-def main():
-    # Example usage
+def iter_tube_sheets(path):
+    """
+    Листы книги по одному, каждый в отдельной книге в памяти.
+
+    Книга открывается только для чтения, поэтому в памяти находится лишь
+    текущий лист; его копия позволяет разбирать лист тем же
+    import_excel_table_into_dict().
+
+    Yields:
+        tuple: (имя листа, книга openpyxl с одним листом)
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for name in wb.sheetnames:
+            book = openpyxl.Workbook()
+            sheet = book.active
+            sheet.title = name
+            for row in wb[name].iter_rows(values_only=True):
+                sheet.append(row)
+            yield name.strip(), book
+    finally:
+        wb.close()
+
+
+def import_streaming(path, connection_string, shard_dir, budget=None, loader=None):
+    """
+    Импорт книги по одной трубке: разбор листа, канонический вид, SQL и
+    RDF-фрагмент трубки (<shard_dir>/<трубка>.ttl); всё, что относится к
+    трубке, освобождается до перехода к следующей.
+
+    Args:
+        path (str): Книга Excel.
+        connection_string (str): Строка подключения к БД.
+        shard_dir (str): Каталог для RDF-фрагментов трубок.
+        budget (MemoryBudget): Проверка памяти после каждой трубки.
+        loader (str): Способ загрузки в SQL (см. convert_dataframes_to_sql()).
+
+    Returns:
+        list: Имена файлов RDF-фрагментов.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = []
+    for name, book in iter_tube_sheets(path):
+        with span("pipe", group=name):
+            with span("extract"):
+                _, data = import_excel_table_into_dict(book, 0)
+            del book
+            if data is None:
+                continue
+            with span("canonicalize"):
+                tube = convert_to_canonic_form((name, data))
+            del data
+            g = bind_namespaces(Graph())
+            export_tube(g, tube, connection_string, loader)
+            shard = os.path.join(shard_dir, "{}.ttl".format(name))
+            with span("serialize", file=shard):
+                g.serialize(destination=shard, format="turtle")
+            shards.append(shard)
+            del g, tube
+            if budget is not None:
+                budget.check(name)
+    return shards
+
+
+def merge_shards(shards, output_path):
+    """
+    Объединяет RDF-фрагменты трубок в один файл Turtle.
+
+    Фрагменты просто дописываются друг за другом: директивы @prefix
+    допустимы в любом месте документа, а пустых узлов в фрагментах нет
+    (см. skolem), поэтому объединение - корректный Turtle того же графа.
+    """
+    with span("merge", file=output_path):
+        with open(output_path, "wb") as o:
+            for shard in shards:
+                with open(shard, "rb") as inp:
+                    while True:
+                        block = inp.read(1 << 20)
+                        if not block:
+                            break
+                        o.write(block)
+                o.write(b"\n")
+    print(f"RDF graph saved to {output_path}")
+
+
+def pipe_graph(name):
+    """IRI именованного графа A-Box трубки."""
+    return P["a-box/{}".format(name)]
+
+
+def publish_shards(shards, data_url, query_url=None, auth=None, replace=True,
+                   workers=4):
+    """
+    Загружает RDF-фрагменты трубок по протоколу Graph Store, каждый в
+    свой именованный граф (pipe_graph()); графы загружаются параллельно.
+
+    Returns:
+        list: Отчёты GraphStore.load_all().
+    """
+    graphs = {
+        str(pipe_graph(os.path.splitext(os.path.basename(shard))[0])): shard
+        for shard in shards
+    }
+    store = GraphStore(data_url, query_url, auth=auth, workers=workers)
+    return store.load_all(graphs, replace=replace)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Импорт трубок Alrosa в RDF и SQL")
+    parser.add_argument(
+        "--report", default=RUN_REPORT, help="JSON-отчёт о времени этапов и счётчиках"
+    )
+    parser.add_argument(
+        "--trace", help="Трасса этапов (Chrome Trace Event, открывается в speedscope)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Импортировать по одной трубке, не держа всю книгу в памяти",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="Допустимый RSS процесса (включает --stream)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Отслеживать выделения памяти через tracemalloc (медленно); "
+        "при превышении бюджета печатаются места выделения",
+    )
+    parser.add_argument("--workbook", help="Книга Excel (по умолчанию data/tubes.xlsx)")
+    parser.add_argument(
+        "--shards", default="a-box.shards", help="Каталог RDF-фрагментов трубок"
+    )
+    parser.add_argument(
+        "--loader",
+        choices=LOADERS,
+        help="Загрузка в SQL: orm или bulk (COPY через промежуточные таблицы); "
+        "по умолчанию bulk для PostgreSQL",
+    )
+    parser.add_argument(
+        "--store",
+        help="Загрузить фрагменты трубок в именованные графы по протоколу "
+        "Graph Store (URL, включает --stream)",
+    )
+    parser.add_argument("--query", help="Точка доступа SPARQL для проверки загрузки")
+    parser.add_argument(
+        "--append", action="store_true", help="Дополнить графы вместо замены"
+    )
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    add_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    setup_from_args(args)
+    profiler = setup_profile(args)
+
+    count_sql_round_trips()
 
     file_path = "data/tubes.xlsx"
     tubes_path = "tubes.pkl"
 
+    output_paths = [
+        os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            "gql-server",
+            "fuseki",
+            "a-box.ttl",
+        ),
+        "a-box.ttl",
+    ]
+
+    if args.stream or args.memory_budget or args.store:
+        budget = MemoryBudget(args.memory_budget, trace=args.trace_memory)
+        try:
+            shards = import_streaming(
+                args.workbook or search_file_to_root(file_path),
+                CONNECTION_STRING,
+                args.shards,
+                budget,
+                args.loader,
+            )
+        except MemoryBudgetExceeded as e:
+            log.error("%s", e)
+            TRACER.write_report(args.report)
+            raise SystemExit(1)
+        for output_path in output_paths:
+            merge_shards(shards, output_path)
+        reports = []
+        if args.store:
+            from requests.auth import HTTPBasicAuth
+
+            auth = HTTPBasicAuth(args.user, args.password) if args.user else None
+            with span("publish"):
+                reports = publish_shards(
+                    shards, args.store, args.query, auth, replace=not args.append
+                )
+        log.info("peak RSS %.0f MiB", budget.peak_rss / 2**20)
+        print_summary()
+        TRACER.print_summary()
+        TRACER.write_report(args.report)
+        if args.trace:
+            TRACER.write_trace(args.trace)
+        if profiler is not None:
+            profiler.dump()
+        if any("error" in r for r in reports):
+            raise SystemExit(1)
+        return
+
     tubes_pn = search_file_to_root(tubes_path)
     if tubes_pn is not None:
         start_time = time.time()
-        tubes = load_dict_from_pickle(tubes_pn)
+        with span("load"):
+            tubes = load_dict_from_pickle(tubes_pn)
         load_time = time.time() - start_time
         print(f"INFO: Load success! Time: {load_time:.2f} sec")
         del tubes["ценник"]
     else:
         print("INFO: Starting import from excel")
         tubes = {}
-        workbook = openpyxl.load_workbook(
-            search_file_to_root(file_path), data_only=True
-        )
+        with span("extract"):
+            workbook = openpyxl.load_workbook(
+                args.workbook or search_file_to_root(file_path), data_only=True
+            )
 
-        # for sheet_number in [1]:
-        for sheet_number in range(len(workbook.sheetnames)):
-            sheet, excel_data = import_excel_table_into_dict(workbook, sheet_number)
-            # pprint(excel_data)
-            tubes[sheet.title.strip()] = excel_data
+            # for sheet_number in [1]:
+            for sheet_number in range(len(workbook.sheetnames)):
+                sheet, excel_data = import_excel_table_into_dict(workbook, sheet_number)
+                # pprint(excel_data)
+                tubes[sheet.title.strip()] = excel_data
+                count("rows", sheet.max_row, group=sheet.title.strip())
+                count("cells", sheet.max_row * sheet.max_column, group=sheet.title.strip())
 
         save_dict_as_pickle(tubes, tubes_path)
         print("INFO: Conversionhas been done. Rerun if export needed.")
+        TRACER.write_report(args.report)
+        if profiler is not None:
+            profiler.dump()
         quit()
 
     for tube_item in tubes.items():
-        tube_item = convert_to_canonic_form(tube_item)
-        export_tube(G, tube_item)
+        with span("pipe", group=tube_item[0]):
+            with span("canonicalize"):
+                tube_item = convert_to_canonic_form(tube_item)
+            export_tube(G, tube_item, loader=args.loader)
         # break
 
     print(keymaster)
 
-    # save Graph G in ../gql-server/fuseki/a-box.ttl
-
-    output_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)),
-        "gql-server",
-        "fuseki",
-        "a-box.ttl",
-    )
+    # save Graph G in ../gql-server/fuseki/a-box.ttl and a-box.ttl
 
-    G.serialize(destination=output_path, format="turtle")
-    print(f"RDF graph saved to {output_path}")
+    for output_path in output_paths:
+        with span("serialize", file=output_path):
+            G.serialize(destination=output_path, format="turtle")
+        print(f"RDF graph saved to {output_path}")
 
-    output_path = "a-box.ttl"
-    G.serialize(destination=output_path, format="turtle")
-    print(f"RDF graph saved to {output_path}")
+    print_summary()
+    TRACER.print_summary()
+    TRACER.write_report(args.report)
+    if args.trace:
+        TRACER.write_trace(args.trace)
+    if profiler is not None:
+        profiler.dump()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,8 @@
+import datetime
+import functools
+import re
 import uuid
+from collections import Counter
 from pprint import pprint
 
 from sqlalchemy import (
@@ -8,17 +12,154 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
     create_engine,
+    delete,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    union_all,
 )
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy.sql import func
 
+from elements import oxide_composition
+from logs import get_logger
+from normalization import ANALYTE_ELEMENTS, PERCENT, PPM
+from skolem import generate_deterministic_uuid
+
 Base = declarative_base()
+log = get_logger("alrosa_models")
+
+# Значения столбца 'минерал' EPMA, для которых строятся частичные индексы.
+# Условие запроса должно совпадать с условием индекса (mineral = 'Gar'),
+# иначе планировщик индекс не использует.
+GARNET = "Gar"
+CHROMITE = "Chr"
+ILMENITE = "Ilm"
+
+
+def mineral_index(name, column, mineral):
+    """Частичный индекс по столбцу анализов одного минерала (PostgreSQL, SQLite)."""
+    where = text("mineral = '{}'".format(mineral))
+    return Index(name, column, postgresql_where=where, sqlite_where=where)
+
+
+def clean(x):
+    if isinstance(x, float):
+        return x
+    elif isinstance(x, int):
+        return x
+    return None
+
+
+def sigma(value):
+    if value is None:
+        return None
+    if isinstance(value, str) and value.startswith("±"):
+        return float(value[1:])
+    else:
+        return float(value)
+
+
+UPSERT_BATCH = 500
+
+
+class AnalysisIds:
+    """
+    Детерминированные id анализов зёрен трубки.
+
+    id выводится из таблицы, трубки, шашки, зерна и номера анализа зерна
+    (порядок строк с теми же шашкой и зерном в таблице трубки), поэтому
+    повторный импорт трубки даёт те же id.
+    """
+
+    def __init__(self, table_name, pipe_uuid):
+        self.table_name = table_name
+        self.pipe_uuid = pipe_uuid
+        self.ordinals = Counter()
+
+    def next(self, sample_name, grain_name):
+        key = (str(sample_name), str(grain_name))
+        ordinal = self.ordinals[key]
+        self.ordinals[key] += 1
+        return generate_deterministic_uuid(
+            namespace=self.table_name,
+            pipe_uuid=self.pipe_uuid,
+            sample=key[0],
+            grain=key[1],
+            ordinal=ordinal,
+        )
+
+
+def dialect_insert(connection, table):
+    """INSERT с поддержкой ON CONFLICT для диалекта соединения."""
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def upsert_statement(connection, table, columns, names=None, query=None):
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE; строки с теми же значениями
+    не изменяются (условие IS DISTINCT FROM по обновляемым столбцам).
+
+    Args:
+        columns (list): Имена обновляемых столбцов.
+        names, query: Столбцы и SELECT для INSERT ... SELECT; без них -
+            INSERT ... VALUES для executemany.
+    """
+    stmt = dialect_insert(connection, table)
+    if query is not None:
+        stmt = stmt.from_select(names, query)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={name: excluded[name] for name in columns},
+        where=or_(*[table.c[name].is_distinct_from(excluded[name]) for name in columns]),
+    )
+
+
+def upsert(connection, table, rows, batch=UPSERT_BATCH):
+    """Пакетный upsert строк (словари по именам столбцов, с id).
+
+    Returns:
+        int - количество вставленных и изменённых строк
+    """
+    if not rows:
+        return 0
+    stmt = upsert_statement(connection, table, [k for k in rows[0] if k != "id"])
+    changed = 0
+    for start in range(0, len(rows), batch):
+        changed += connection.execute(stmt, rows[start:start + batch]).rowcount
+    return changed
+
+
+def records_import(method):
+    """
+    Отмечает импорт трубки (PipeImport.record()) после успешного
+    import_from_dataframe(), чтобы кэш читателей (alrosa_query) устарел и
+    при прямом вызове метода, без convert_dataframes_to_sql().
+    """
+    @functools.wraps(method)
+    def wrapper(cls, df, pipe_uuid, connection_string, *args, **kwargs):
+        result = method(cls, df, pipe_uuid, connection_string, *args, **kwargs)
+        engine = create_engine(connection_string)
+        try:
+            with engine.begin() as connection:
+                PipeImport.record(connection, pipe_uuid)
+        finally:
+            engine.dispose()
+        return result
+    return wrapper
 
 
 class Diamonds(Base):
@@ -27,6 +168,7 @@ class Diamonds(Base):
     """
 
     __tablename__ = "diamonds"
+    __table_args__ = (Index("ix_diamonds_pipe_sample", "pipe_uuid", "sample_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -89,6 +231,68 @@ class Diamonds(Base):
         return f"<Diamonds(sample_id='{self.sample_id}', pipe_uuid={self.pipe_uuid})>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Map Russian DataFrame columns to English model fields
+            sample_id=record.get(
+                "пробы"
+            ),  # DataFrame: "пробы" -> model: sample_id
+            sample_id_alt=record.get(
+                "пробы_1"
+            ),  # DataFrame: "пробы_1" -> model: sample_id_alt
+            borehole=record.get(
+                "скважина"
+            ),  # DataFrame: "скважина" -> model: borehole
+            rock_type=record.get(
+                "порода"
+            ),  # DataFrame: "порода" -> model: rock_type
+            interval=record.get(
+                "Интервал"
+            ),  # DataFrame: "Интервал" -> model: interval
+            # Weight indicators
+            initial_weight_kg=record.get(
+                "Исход_вес_кг"
+            ),  # DataFrame: "Исход_вес_кг" -> model: initial_weight_kg
+            acid_concentrate_kg=record.get(
+                "Выход_кислотного_концентрата_кг"
+            ),  # DataFrame: "Выход_кислотного_концентрата_кг" -> model: acid_concentrate_kg
+            salt_concentrate_g=record.get(
+                "Выход_солевого_концентр_г"
+            ),  # DataFrame: "Выход_солевого_концентр_г" -> model: salt_concentrate_g
+            alkaline_concentrate_g=record.get(
+                "Выход_щелочного_концентрата_г"
+            ),  # DataFrame: "Выход_щелочного_концентрата_г" -> model: alkaline_concentrate_g
+            heavy_fraction_g=record.get(
+                "Выход_тяжелой_фракции_г"
+            ),  # DataFrame: "Выход_тяжелой_фракции_г" -> model: heavy_fraction_g
+            acid_cleaning_g=record.get(
+                "Кислотная_очистка_солев_Конц_г"
+            ),  # DataFrame: "Кислотная_очистка_солев_Конц_г" -> model: acid_cleaning_g
+            # Diamonds
+            diamonds_monocrystals=record.get(
+                "Количество_обнаруженных_алмазов_монокристаллы"
+            ),  # DataFrame: "Количество_обнаруженных_алмазов_монокристаллы" -> model: diamonds_monocrystals
+            diamonds_fragments=record.get(
+                "Количество_обнаруженных_алмазов_обломки_и_поликр_исталлы"
+            ),  # DataFrame: "Количество_обнаруженных_алмазов_обломки_и_поликр_исталлы" -> model: diamonds_fragments
+            crystals_per_kg=record.get(
+                "кристаллов_обломков_кг"
+            ),  # DataFrame: "кристаллов_обломков_кг" -> model: crystals_per_kg
+            # Service fields (from val_XX substitutions)
+            quality_check=record.get(
+                "check"
+            ),  # DataFrame: "check" (from first val_) -> model: quality_check
+            total_weight=record.get(
+                "total"
+            ),  # DataFrame: "total" -> model: total_weight
+            fractions=record.get(
+                "fractions", {}
+            ),  # DataFrame: "fractions" -> model: fractions
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Одноразовый импорт данных для конкретной трубки
@@ -134,13 +338,15 @@ class Diamonds(Base):
                     # Удаляем существующие записи
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(
-                        f"Удалено {deleted} существующих записей для трубки {pipe_uuid}"
+                    log.info(
+                        "Удалено %s существующих записей для трубки %s",
+                        deleted, pipe_uuid
                     )
 
                 elif if_exists == "append":
-                    print(
-                        f"Добавление к {existing_count} существующим записям для трубки {pipe_uuid}"
+                    log.info(
+                        "Добавление к %s существующим записям для трубки %s",
+                        existing_count, pipe_uuid
                     )
                 else:
                     raise ValueError(f"Недопустимое значение if_exists: {if_exists}")
@@ -151,76 +357,20 @@ class Diamonds(Base):
 
             for record in records:
                 # Create model object with field mapping from DataFrame columns
-                diamond = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Map Russian DataFrame columns to English model fields
-                    sample_id=record.get(
-                        "пробы"
-                    ),  # DataFrame: "пробы" -> model: sample_id
-                    sample_id_alt=record.get(
-                        "пробы_1"
-                    ),  # DataFrame: "пробы_1" -> model: sample_id_alt
-                    borehole=record.get(
-                        "скважина"
-                    ),  # DataFrame: "скважина" -> model: borehole
-                    rock_type=record.get(
-                        "порода"
-                    ),  # DataFrame: "порода" -> model: rock_type
-                    interval=record.get(
-                        "Интервал"
-                    ),  # DataFrame: "Интервал" -> model: interval
-                    # Weight indicators
-                    initial_weight_kg=record.get(
-                        "Исход_вес_кг"
-                    ),  # DataFrame: "Исход_вес_кг" -> model: initial_weight_kg
-                    acid_concentrate_kg=record.get(
-                        "Выход_кислотного_концентрата_кг"
-                    ),  # DataFrame: "Выход_кислотного_концентрата_кг" -> model: acid_concentrate_kg
-                    salt_concentrate_g=record.get(
-                        "Выход_солевого_концентр_г"
-                    ),  # DataFrame: "Выход_солевого_концентр_г" -> model: salt_concentrate_g
-                    alkaline_concentrate_g=record.get(
-                        "Выход_щелочного_концентрата_г"
-                    ),  # DataFrame: "Выход_щелочного_концентрата_г" -> model: alkaline_concentrate_g
-                    heavy_fraction_g=record.get(
-                        "Выход_тяжелой_фракции_г"
-                    ),  # DataFrame: "Выход_тяжелой_фракции_г" -> model: heavy_fraction_g
-                    acid_cleaning_g=record.get(
-                        "Кислотная_очистка_солев_Конц_г"
-                    ),  # DataFrame: "Кислотная_очистка_солев_Конц_г" -> model: acid_cleaning_g
-                    # Diamonds
-                    diamonds_monocrystals=record.get(
-                        "Количество_обнаруженных_алмазов_монокристаллы"
-                    ),  # DataFrame: "Количество_обнаруженных_алмазов_монокристаллы" -> model: diamonds_monocrystals
-                    diamonds_fragments=record.get(
-                        "Количество_обнаруженных_алмазов_обломки_и_поликр_исталлы"
-                    ),  # DataFrame: "Количество_обнаруженных_алмазов_обломки_и_поликр_исталлы" -> model: diamonds_fragments
-                    crystals_per_kg=record.get(
-                        "кристаллов_обломков_кг"
-                    ),  # DataFrame: "кристаллов_обломков_кг" -> model: crystals_per_kg
-                    # Service fields (from val_XX substitutions)
-                    quality_check=record.get(
-                        "check"
-                    ),  # DataFrame: "check" (from first val_) -> model: quality_check
-                    total_weight=record.get(
-                        "total"
-                    ),  # DataFrame: "total" -> model: total_weight
-                    fractions=record.get(
-                        "fractions", {}
-                    ),  # DataFrame: "fractions" -> model: fractions
-                )
+                diamond = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
                 session.add(diamond)
                 imported_count += 1
 
             session.commit()
-            print(
-                f"Успешно импортировано {imported_count} записей для трубки {pipe_uuid}"
+            log.info(
+                "Успешно импортировано %s записей для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -294,6 +444,22 @@ class Sample(Base):
         return f"<Sample(sample_name='{self.sample_name}', pipe_uuid={self.pipe_uuid})>"
 
     @classmethod
+    def fields(cls, sample_data):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            laboratory=sample_data.get("Лаборатория"),
+            rock_type=sample_data.get("Порода"),
+            depth=sample_data.get("глубина"),
+            class_name=sample_data.get("класс"),
+            line_borehole=sample_data.get("линия_скважина"),
+            body=sample_data.get("тело"),
+            fraction=sample_data.get("фракция"),
+            note=sample_data.get("примечание"),
+            dimension=sample_data.get("размерность"),
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string):
         """
         Импорт уникальных шашек из DataFrame EPMA
@@ -325,21 +491,15 @@ class Sample(Base):
                     sample = cls(
                         pipe_uuid=pipe_uuid,
                         sample_name=sample_name,
-                        laboratory=sample_data.get("Лаборатория"),
-                        rock_type=sample_data.get("Порода"),
-                        depth=sample_data.get("глубина"),
-                        class_name=sample_data.get("класс"),
-                        line_borehole=sample_data.get("линия_скважина"),
-                        body=sample_data.get("тело"),
-                        fraction=sample_data.get("фракция"),
-                        note=sample_data.get("примечание"),
-                        dimension=sample_data.get("размерность"),
+                        **cls.fields(sample_data),
                     )
                     session.add(sample)
                     imported_count += 1
 
             session.commit()
-            print(f"Импортировано {imported_count} новых шашек для трубки {pipe_uuid}")
+            log.info(
+                "Импортировано %s новых шашек для трубки %s", imported_count, pipe_uuid
+            )
 
         finally:
             session.close()
@@ -375,6 +535,29 @@ class Grain(Base):
     )
 
 
+def delete_stale_analyses(connection, model, pipe_uuid, ids, batch=UPSERT_BATCH):
+    """
+    Удаляет анализы зёрен трубки, id которых нет среди загруженных
+    (анализ убран из исходной таблицы или зерно больше не найдено).
+    """
+    table = model.__table__
+    grains = Grain.__table__
+    samples = Sample.__table__
+    existing = connection.execute(
+        select(table.c.id)
+        .join(grains, grains.c.id == table.c.grain_id)
+        .join(samples, samples.c.id == grains.c.sample_id)
+        .where(samples.c.pipe_uuid == pipe_uuid)
+    ).scalars()
+    stale = list(set(existing) - set(ids))
+    for start in range(0, len(stale), batch):
+        connection.execute(
+            delete(table).where(table.c.id.in_(stale[start:start + batch])))
+    if stale:
+        log.info("Удалено %s устаревших анализов %s", len(stale), table.name)
+    return len(stale)
+
+
 class EPMAAnalysis(Base):
     """
     EPMA анализ зерна
@@ -382,6 +565,13 @@ class EPMAAnalysis(Base):
     """
 
     __tablename__ = "epma_analyses"
+    __table_args__ = (
+        Index("ix_epma_grain_id", "grain_id"),
+        Index("ix_epma_mineral", "mineral"),
+        mineral_index("ix_epma_garnet_cr2o3", "cr2o3", GARNET),
+        mineral_index("ix_epma_chromite_cr2o3", "cr2o3", CHROMITE),
+        mineral_index("ix_epma_ilmenite_mgo", "mgo", ILMENITE),
+    )
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -458,6 +648,92 @@ class EPMAAnalysis(Base):
         return f"<EPMAAnalysis(grain_id={self.grain_id})>"
 
     @classmethod
+    def fields(cls, row):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Основные оксиды
+            al2o3=clean(row.get("Al2O3")),
+            sio2=clean(row.get("SiO2")),
+            tio2=clean(row.get("TiO2")),
+            feo=clean(row.get("FeO")),
+            fe2o3=clean(row.get("Fe2O3")),
+            feo_alt=clean(row.get("FeO_1")),
+            mgo=clean(row.get("MgO")),
+            cao=clean(row.get("CaO")),
+            na2o=clean(row.get("Na2O")),
+            k2o=clean(row.get("K2O")),
+            mno=clean(row.get("MnO")),
+            p2o5=clean(row.get("P2O5")),
+            cr2o3=clean(row.get("Cr2O3")),
+            # Никель (три варианта)
+            nio=clean(row.get("NiO")) if "NiO" in row else None,
+            nio_1=clean(row.get("NiO_1")) if "NiO_1" in row else None,
+            nio_2=clean(row.get("NiO_2")) if "NiO_2" in row else None,
+            coo=clean(row.get("CoO")),
+            # Ванадий (два варианта)
+            v2o3=clean(row.get("V2O3")) if "V2O3" in row else None,
+            v2o3_1=clean(row.get("V2O3_1")) if "V2O3_1" in row else None,
+            # Цинк (два варианта)
+            zno=clean(row.get("ZnO")) if "ZnO" in row else None,
+            zno_1=clean(row.get("ZnO_1")) if "ZnO_1" in row else None,
+            # Минорные элементы
+            v=clean(row.get("V")),
+            zn=clean(row.get("Zn")),
+            x_coord=clean(row.get("X")),
+            y_coord=clean(row.get("Y")),
+            # Special parameters
+            t_zn_chr=clean(
+                row.get("T_Zn_Chr")
+            ),  # DataFrame: "T_Zn_Chr" -> model: t_zn_chr
+            total=clean(row.get("Total")),  # DataFrame: "Total" -> model: total
+            no=row.get("No"),  # DataFrame: "No" -> model: no
+            # Service fields (from val_XX substitutions)
+            a_number=row.get(
+                "a_number"
+            ),  # DataFrame: "a_number" (from val_20) -> model: a_number
+            correction=row.get(
+                "correction"
+            ),  # DataFrame: "correction" (from val_17 for tube 1_5) -> model: correction
+            # Additional measurement fields
+            measurement_12=clean(
+                row.get("val_12")
+            ),  # DataFrame: "val_12" -> model: measurement_12
+            measurement_13=clean(
+                row.get("val_13")
+            ),  # DataFrame: "val_13" -> model: measurement_13
+            measurement_14=clean(
+                row.get("val_14")
+            ),  # DataFrame: "val_14" -> model: measurement_14
+            measurement_15=clean(
+                row.get("val_15")
+            ),  # DataFrame: "val_15" -> model: measurement_15
+            measurement_16=clean(
+                row.get("val_16")
+            ),  # DataFrame: "val_16" -> model: measurement_16
+            measurement_17=clean(
+                row.get("val_17")
+            ),  # DataFrame: "val_17" (for tube 2_1) -> model: measurement_17
+            # Counters
+            count_akb=row.get(
+                "счет_АКБ"
+            ),  # DataFrame: "счет_АКБ" -> model: count_akb
+            count_pk=row.get(
+                "счет_ПК"
+            ),  # DataFrame: "счет_ПК" -> model: count_pk
+            # Minerals
+            mineral=row.get(
+                "минерал"
+            ),  # DataFrame: "минерал" -> model: mineral
+            mineral_alt=row.get(
+                "минерал_1"
+            ),  # DataFrame: "минерал_1" -> model: mineral_alt
+            sum_total=row.get(
+                "Сумма"
+            ),  # DataFrame: "Сумма" -> model: sum_total
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string):
         """
         Импорт EPMA данных с созданием иерархии Sample -> Grain -> Analysis
@@ -468,23 +744,20 @@ class EPMAAnalysis(Base):
         Session = sessionmaker(bind=engine)
         session = Session()
 
-        def clean(x):
-            if isinstance(x, float):
-                return x
-            elif isinstance(x, int):
-                return x
-            return None
-
         try:
             # 1. Сначала импортируем шашки
             Sample.import_from_dataframe(df, pipe_uuid, connection_string)
 
             # 2. Создаем маппинг sample_name -> sample_id
-            samples = {s.sample_name: s.id for s in session.query(Sample).all()}
+            samples = {
+                s.sample_name: s.id
+                for s in session.query(Sample).filter_by(pipe_uuid=pipe_uuid)
+            }
 
             # 3. Группируем по шашкам и зернам
             grain_cache = {}  # (sample_id, grain_name) -> grain_id
-            imported_count = 0
+            ids = AnalysisIds(cls.__tablename__, pipe_uuid)
+            rows = []
 
             for _, row in df.iterrows():
                 sample_name = row.get("шашка")
@@ -493,6 +766,7 @@ class EPMAAnalysis(Base):
                 if not sample_name or not grain_name:
                     continue
 
+                analysis_id = ids.next(sample_name, grain_name)
                 sample_id = samples.get(sample_name)
                 if not sample_id:
                     continue
@@ -515,105 +789,20 @@ class EPMAAnalysis(Base):
 
                 grain_id = grain_cache[grain_key]
 
-                # Создаем анализ
-                analysis = cls(
-                    grain_id=grain_id,
-                    # Основные оксиды
-                    al2o3=clean(row.get("Al2O3")),
-                    sio2=clean(row.get("SiO2")),
-                    tio2=clean(row.get("TiO2")),
-                    feo=clean(row.get("FeO")),
-                    fe2o3=clean(row.get("Fe2O3")),
-                    feo_alt=clean(row.get("FeO_1")),
-                    mgo=clean(row.get("MgO")),
-                    cao=clean(row.get("CaO")),
-                    na2o=clean(row.get("Na2O")),
-                    k2o=clean(row.get("K2O")),
-                    mno=clean(row.get("MnO")),
-                    p2o5=clean(row.get("P2O5")),
-                    cr2o3=clean(row.get("Cr2O3")),
-                    # Никель (три варианта)
-                    nio=clean(row.get("NiO")) if "NiO" in row else None,
-                    nio_1=clean(row.get("NiO_1")) if "NiO_1" in row else None,
-                    nio_2=clean(row.get("NiO_2")) if "NiO_2" in row else None,
-                    coo=clean(row.get("CoO")),
-                    # Ванадий (два варианта)
-                    v2o3=clean(row.get("V2O3")) if "V2O3" in row else None,
-                    v2o3_1=clean(row.get("V2O3_1")) if "V2O3_1" in row else None,
-                    # Цинк (два варианта)
-                    zno=clean(row.get("ZnO")) if "ZnO" in row else None,
-                    zno_1=clean(row.get("ZnO_1")) if "ZnO_1" in row else None,
-                    # Минорные элементы
-                    v=clean(row.get("V")),
-                    zn=clean(row.get("Zn")),
-                    x_coord=clean(row.get("X")),
-                    y_coord=clean(row.get("Y")),
-                    # Special parameters
-                    t_zn_chr=clean(
-                        row.get("T_Zn_Chr")
-                    ),  # DataFrame: "T_Zn_Chr" -> model: t_zn_chr
-                    total=clean(row.get("Total")),  # DataFrame: "Total" -> model: total
-                    no=row.get("No"),  # DataFrame: "No" -> model: no
-                    # Service fields (from val_XX substitutions)
-                    a_number=row.get(
-                        "a_number"
-                    ),  # DataFrame: "a_number" (from val_20) -> model: a_number
-                    correction=row.get(
-                        "correction"
-                    ),  # DataFrame: "correction" (from val_17 for tube 1_5) -> model: correction
-                    # Additional measurement fields
-                    measurement_12=clean(
-                        row.get("val_12")
-                    ),  # DataFrame: "val_12" -> model: measurement_12
-                    measurement_13=clean(
-                        row.get("val_13")
-                    ),  # DataFrame: "val_13" -> model: measurement_13
-                    measurement_14=clean(
-                        row.get("val_14")
-                    ),  # DataFrame: "val_14" -> model: measurement_14
-                    measurement_15=clean(
-                        row.get("val_15")
-                    ),  # DataFrame: "val_15" -> model: measurement_15
-                    measurement_16=clean(
-                        row.get("val_16")
-                    ),  # DataFrame: "val_16" -> model: measurement_16
-                    measurement_17=clean(
-                        row.get("val_17")
-                    ),  # DataFrame: "val_17" (for tube 2_1) -> model: measurement_17
-                    # Counters
-                    count_akb=row.get(
-                        "счет_АКБ"
-                    ),  # DataFrame: "счет_АКБ" -> model: count_akb
-                    count_pk=row.get(
-                        "счет_ПК"
-                    ),  # DataFrame: "счет_ПК" -> model: count_pk
-                    # Minerals
-                    mineral=row.get(
-                        "минерал"
-                    ),  # DataFrame: "минерал" -> model: mineral
-                    mineral_alt=row.get(
-                        "минерал_1"
-                    ),  # DataFrame: "минерал_1" -> model: mineral_alt
-                    sum_total=row.get(
-                        "Сумма"
-                    ),  # DataFrame: "Сумма" -> model: sum_total
-                )
-
-                session.add(analysis)
-                imported_count += 1
-
-                # Периодический commit для больших DataFrame
-                if imported_count % 100 == 0:
-                    session.commit()
+                rows.append(dict(id=analysis_id, grain_id=grain_id, **cls.fields(row)))
 
+            connection = session.connection()
+            changed = upsert(connection, cls.__table__, rows)
+            delete_stale_analyses(connection, cls, pipe_uuid, [r["id"] for r in rows])
             session.commit()
-            print(
-                f"Импортировано {imported_count} EPMA анализов для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s EPMA анализов для трубки %s (изменено %s)",
+                len(rows), pipe_uuid, changed
             )
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -626,6 +815,7 @@ class LAMAnalysis(Base):
     """
 
     __tablename__ = "lam_analyses"
+    __table_args__ = (Index("ix_lam_grain_id", "grain_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -714,6 +904,71 @@ class LAMAnalysis(Base):
         return f"<LAMAnalysis(grain_id={self.grain_id})>"
 
     @classmethod
+    def fields(cls, row):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Основные элементы
+            si=clean(row.get("Si")),
+            ti=clean(row.get("Ti")),
+            al=clean(row.get("Al")),
+            fe=clean(row.get("Fe")),
+            mn=clean(row.get("Mn")),
+            mg=clean(row.get("Mg")),
+            ca=clean(row.get("Ca")),
+            na=clean(row.get("Na")),
+            k=clean(row.get("K")),
+            p=clean(row.get("P")),
+            # Редкоземельные
+            la=clean(row.get("La")),
+            ce=clean(row.get("Ce")),
+            pr=clean(row.get("Pr")),
+            nd=clean(row.get("Nd")),
+            sm=clean(row.get("Sm")),
+            eu=clean(row.get("Eu")),
+            gd=clean(row.get("Gd")),
+            tb=clean(row.get("Tb")),
+            dy=clean(row.get("Dy")),
+            ho=clean(row.get("Ho")),
+            er=clean(row.get("Er")),
+            tm=clean(row.get("Tm")),
+            yb=clean(row.get("Yb")),
+            lu=clean(row.get("Lu")),
+            # HFSE
+            zr=clean(row.get("Zr")),
+            hf=clean(row.get("Hf")),
+            nb=clean(row.get("Nb")),
+            ta=clean(row.get("Ta")),
+            # LILE
+            rb=clean(row.get("Rb")),
+            cs=clean(row.get("Cs")),
+            ba=clean(row.get("Ba")),
+            sr=clean(row.get("Sr")),
+            # Переходные металлы
+            sc=clean(row.get("Sc")),
+            v=clean(row.get("V")),
+            cr=clean(row.get("Cr")),
+            co=clean(row.get("Co")),
+            ni=clean(row.get("Ni")),
+            cu=clean(row.get("Cu")),
+            zn=clean(row.get("Zn")),
+            # Другие
+            ga=clean(row.get("Ga")),
+            y=clean(row.get("Y")),
+            sn=clean(row.get("Sn")),
+            pb=clean(row.get("Pb")),
+            th=clean(row.get("Th")),
+            u=clean(row.get("U")),
+            be=clean(row.get("Be")),
+            b=clean(row.get("B")),
+            li=clean(row.get("Li")),
+            # Счетчики
+            count_akb=row.get("счет_АКБ"),
+            count_pk=row.get("счет_ПК"),
+            rock_type=row.get("порода"),
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string):
         """
         Импорт LAM данных с привязкой к существующим зернам из EPMA
@@ -723,13 +978,6 @@ class LAMAnalysis(Base):
         Session = sessionmaker(bind=engine)
         session = Session()
 
-        def clean(x):
-            if isinstance(x, float):
-                return x
-            elif isinstance(x, int):
-                return x
-            return None
-
         try:
             # Получаем все зерна для данной трубки с их sample_id
             grains = (
@@ -745,7 +993,8 @@ class LAMAnalysis(Base):
                 key = (sample_name, grain_name)
                 grain_map[key] = grain_id
 
-            imported_count = 0
+            ids = AnalysisIds(cls.__tablename__, pipe_uuid)
+            rows = []
             skipped_count = 0
 
             for _, row in df.iterrows():
@@ -755,6 +1004,7 @@ class LAMAnalysis(Base):
                 if not sample_name or not grain_name:
                     continue
 
+                analysis_id = ids.next(sample_name, grain_name)
                 # Ищем зерно в маппинге
                 grain_id = grain_map.get((sample_name, grain_name))
 
@@ -764,81 +1014,21 @@ class LAMAnalysis(Base):
                     continue
 
                 # Создаем LAM анализ
-                analysis = cls(
-                    grain_id=grain_id,
-                    # Основные элементы
-                    si=clean(row.get("Si")),
-                    ti=clean(row.get("Ti")),
-                    al=clean(row.get("Al")),
-                    fe=clean(row.get("Fe")),
-                    mn=clean(row.get("Mn")),
-                    mg=clean(row.get("Mg")),
-                    ca=clean(row.get("Ca")),
-                    na=clean(row.get("Na")),
-                    k=clean(row.get("K")),
-                    p=clean(row.get("P")),
-                    # Редкоземельные
-                    la=clean(row.get("La")),
-                    ce=clean(row.get("Ce")),
-                    pr=clean(row.get("Pr")),
-                    nd=clean(row.get("Nd")),
-                    sm=clean(row.get("Sm")),
-                    eu=clean(row.get("Eu")),
-                    gd=clean(row.get("Gd")),
-                    tb=clean(row.get("Tb")),
-                    dy=clean(row.get("Dy")),
-                    ho=clean(row.get("Ho")),
-                    er=clean(row.get("Er")),
-                    tm=clean(row.get("Tm")),
-                    yb=clean(row.get("Yb")),
-                    lu=clean(row.get("Lu")),
-                    # HFSE
-                    zr=clean(row.get("Zr")),
-                    hf=clean(row.get("Hf")),
-                    nb=clean(row.get("Nb")),
-                    ta=clean(row.get("Ta")),
-                    # LILE
-                    rb=clean(row.get("Rb")),
-                    cs=clean(row.get("Cs")),
-                    ba=clean(row.get("Ba")),
-                    sr=clean(row.get("Sr")),
-                    # Переходные металлы
-                    sc=clean(row.get("Sc")),
-                    v=clean(row.get("V")),
-                    cr=clean(row.get("Cr")),
-                    co=clean(row.get("Co")),
-                    ni=clean(row.get("Ni")),
-                    cu=clean(row.get("Cu")),
-                    zn=clean(row.get("Zn")),
-                    # Другие
-                    ga=clean(row.get("Ga")),
-                    y=clean(row.get("Y")),
-                    sn=clean(row.get("Sn")),
-                    pb=clean(row.get("Pb")),
-                    th=clean(row.get("Th")),
-                    u=clean(row.get("U")),
-                    be=clean(row.get("Be")),
-                    b=clean(row.get("B")),
-                    li=clean(row.get("Li")),
-                    # Счетчики
-                    count_akb=row.get("счет_АКБ"),
-                    count_pk=row.get("счет_ПК"),
-                    rock_type=row.get("порода"),
-                )
-
-                session.add(analysis)
-                imported_count += 1
-
-                if imported_count % 100 == 0:
-                    session.commit()
+                rows.append(dict(id=analysis_id, grain_id=grain_id, **cls.fields(row)))
 
+            connection = session.connection()
+            changed = upsert(connection, cls.__table__, rows)
+            delete_stale_analyses(connection, cls, pipe_uuid, [r["id"] for r in rows])
             session.commit()
-            print(f"Импортировано {imported_count} LAM анализов для трубки {pipe_uuid}")
-            print(f"Пропущено {skipped_count} записей (зерна не найдены в EPMA)")
+            log.info(
+                "Импортировано %s LAM анализов для трубки %s (изменено %s)",
+                len(rows), pipe_uuid, changed
+            )
+            log.info("Пропущено %s записей (зерна не найдены в EPMA)", skipped_count)
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -850,6 +1040,7 @@ class Phlogopite(Base):
     """
 
     __tablename__ = "phlogopite"
+    __table_args__ = (Index("ix_phlogopite_pipe_sample", "pipe_uuid", "sample_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -908,6 +1099,54 @@ class Phlogopite(Base):
         return f"<Phlogopite(pipe_uuid={self.pipe_uuid}, sample_id='{self.sample_id}')>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Идентификаторы
+            sample_id=record.get("Образец"),
+            point_id=record.get("точки"),
+            mineral=record.get("минерал"),
+            mineral_alt=record.get("Минерал"),
+            source=record.get("Источник"),
+            rock_type=record.get("Порода"),
+            # Основные оксиды
+            sio2=clean(record.get("SiO2")),
+            tio2=clean(record.get("TiO2")),
+            al2o3=clean(record.get("Al2O3")),
+            feo=clean(record.get("FeO")),
+            mgo=clean(record.get("MgO")),
+            cao=clean(record.get("CaO")),
+            na2o=clean(record.get("Na2O")),
+            k2o=clean(record.get("K2O")),
+            mno=clean(record.get("MnO")),
+            p2o5=clean(record.get("P2O5")),
+            cr2o3=clean(record.get("Cr2O3")),
+            nio=clean(record.get("NiO")),
+            # Редкоземельные
+            bao=clean(record.get("BaO")),
+            sro=clean(record.get("SrO")),
+            ce2o3=clean(record.get("Ce2O3")),
+            la2o3=clean(record.get("La2O3")),
+            nd2o3=clean(record.get("Nd2O3")),
+            nb2o5=clean(record.get("Nb2O5")),
+            ta2o5=clean(record.get("Ta2O5")),
+            tho2=clean(record.get("ThO2")),
+            so3=clean(record.get("SO3")),
+            # Летучие
+            f=clean(record.get("F")),
+            cl=clean(record.get("Cl")),
+            # Service fields
+            total=clean(
+                record.get("Total")
+            ),  # DataFrame: 'Total' -> model: total
+            measurement_17=clean(
+                record.get("val_17")
+            ),  # DataFrame: 'val_17' -> model: measurement_17
+            zno=clean(record.get("ZnO")),  # DataFrame: 'ZnO' -> model: zno
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Импорт данных флогопита для конкретной трубки
@@ -917,13 +1156,6 @@ class Phlogopite(Base):
         Session = sessionmaker(bind=engine)
         session = Session()
 
-        def clean(x):
-            if isinstance(x, float):
-                return x
-            elif isinstance(x, int):
-                return x
-            return None
-
         try:
             # Проверяем существующие данные
             existing_count = session.query(cls).filter_by(pipe_uuid=pipe_uuid).count()
@@ -936,9 +1168,9 @@ class Phlogopite(Base):
                 elif if_exists == "replace":
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(f"Удалено {deleted} существующих записей")
+                    log.info("Удалено %s существующих записей", deleted)
                 elif if_exists == "append":
-                    print(f"Добавление к {existing_count} существующим записям")
+                    log.info("Добавление к %s существующим записям", existing_count)
 
             # Импортируем новые данные
             records = df.to_dict("records")
@@ -946,50 +1178,7 @@ class Phlogopite(Base):
 
             for record in records:
                 # pprint(record)
-                phlog = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Идентификаторы
-                    sample_id=record.get("Образец"),
-                    point_id=record.get("точки"),
-                    mineral=record.get("минерал"),
-                    mineral_alt=record.get("Минерал"),
-                    source=record.get("Источник"),
-                    rock_type=record.get("Порода"),
-                    # Основные оксиды
-                    sio2=clean(record.get("SiO2")),
-                    tio2=clean(record.get("TiO2")),
-                    al2o3=clean(record.get("Al2O3")),
-                    feo=clean(record.get("FeO")),
-                    mgo=clean(record.get("MgO")),
-                    cao=clean(record.get("CaO")),
-                    na2o=clean(record.get("Na2O")),
-                    k2o=clean(record.get("K2O")),
-                    mno=clean(record.get("MnO")),
-                    p2o5=clean(record.get("P2O5")),
-                    cr2o3=clean(record.get("Cr2O3")),
-                    nio=clean(record.get("NiO")),
-                    # Редкоземельные
-                    bao=clean(record.get("BaO")),
-                    sro=clean(record.get("SrO")),
-                    ce2o3=clean(record.get("Ce2O3")),
-                    la2o3=clean(record.get("La2O3")),
-                    nd2o3=clean(record.get("Nd2O3")),
-                    nb2o5=clean(record.get("Nb2O5")),
-                    ta2o5=clean(record.get("Ta2O5")),
-                    tho2=clean(record.get("ThO2")),
-                    so3=clean(record.get("SO3")),
-                    # Летучие
-                    f=clean(record.get("F")),
-                    cl=clean(record.get("Cl")),
-                    # Service fields
-                    total=clean(
-                        record.get("Total")
-                    ),  # DataFrame: 'Total' -> model: total
-                    measurement_17=clean(
-                        record.get("val_17")
-                    ),  # DataFrame: 'val_17' -> model: measurement_17
-                    zno=clean(record.get("ZnO")),  # DataFrame: 'ZnO' -> model: zno
-                )
+                phlog = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
 
                 session.add(phlog)
                 imported_count += 1
@@ -998,14 +1187,15 @@ class Phlogopite(Base):
                     session.commit()
 
             session.commit()
-            print(
-                f"Импортировано {imported_count} записей флогопита для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s записей флогопита для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -1017,6 +1207,7 @@ class Geochemy(Base):
     """
 
     __tablename__ = "geochemy"
+    __table_args__ = (Index("ix_geochemy_pipe_sample", "pipe_uuid", "sample_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -1088,6 +1279,76 @@ class Geochemy(Base):
         return f"<Geochemy(pipe_uuid={self.pipe_uuid}, sample_id='{self.sample_id}')>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Идентификаторы
+            sample_id=record.get(
+                "Образец"
+            ),  # DataFrame: "Образец" -> model: sample_id
+            sample_interval=record.get(
+                "Образец_интервал_от"
+            ),  # DataFrame: "Образец_интервал_от" -> model: sample_interval
+            borehole=record.get(
+                "Скважина"
+            ),  # DataFrame: "Скважина" -> model: borehole
+            rock_type=record.get(
+                "Порода"
+            ),  # DataFrame: "Порода" -> model: rock_type
+            source=record.get(
+                "Источник"
+            ),  # DataFrame: "Источник" -> model: source
+            number=record.get("п_п"),  # DataFrame: "п_п" -> model: number
+            # LILE (Large Ion Lithophile Elements)
+            rb=clean(record.get("Rb")),  # DataFrame: "Rb" -> model: rb (ppm)
+            cs=clean(record.get("Cs")),  # DataFrame: "Cs" -> model: cs (ppm)
+            ba=clean(record.get("Ba")),  # DataFrame: "Ba" -> model: ba (ppm)
+            sr=clean(record.get("Sr")),  # DataFrame: "Sr" -> model: sr (ppm)
+            # HFSE (High Field Strength Elements)
+            zr=clean(record.get("Zr")),  # DataFrame: "Zr" -> model: zr (ppm)
+            hf=clean(record.get("Hf")),  # DataFrame: "Hf" -> model: hf (ppm)
+            nb=clean(record.get("Nb")),  # DataFrame: "Nb" -> model: nb (ppm)
+            ta=clean(record.get("Ta")),  # DataFrame: "Ta" -> model: ta (ppm)
+            th=clean(record.get("Th")),  # DataFrame: "Th" -> model: th (ppm)
+            u=clean(record.get("U")),  # DataFrame: "U" -> model: u (ppm)
+            # REE (Rare Earth Elements)
+            la=clean(record.get("La")),  # DataFrame: "La" -> model: la (ppm)
+            ce=clean(record.get("Ce")),  # DataFrame: "Ce" -> model: ce (ppm)
+            pr=clean(record.get("Pr")),  # DataFrame: "Pr" -> model: pr (ppm)
+            nd=clean(record.get("Nd")),  # DataFrame: "Nd" -> model: nd (ppm)
+            sm=clean(record.get("Sm")),  # DataFrame: "Sm" -> model: sm (ppm)
+            eu=clean(record.get("Eu")),  # DataFrame: "Eu" -> model: eu (ppm)
+            gd=clean(record.get("Gd")),  # DataFrame: "Gd" -> model: gd (ppm)
+            tb=clean(record.get("Tb")),  # DataFrame: "Tb" -> model: tb (ppm)
+            dy=clean(record.get("Dy")),  # DataFrame: "Dy" -> model: dy (ppm)
+            ho=clean(record.get("Ho")),  # DataFrame: "Ho" -> model: ho (ppm)
+            er=clean(record.get("Er")),  # DataFrame: "Er" -> model: er (ppm)
+            tm=clean(record.get("Tm")),  # DataFrame: "Tm" -> model: tm (ppm)
+            yb=clean(record.get("Yb")),  # DataFrame: "Yb" -> model: yb (ppm)
+            lu=clean(record.get("Lu")),  # DataFrame: "Lu" -> model: lu (ppm)
+            # Transition metals
+            sc=clean(record.get("Sc")),  # DataFrame: "Sc" -> model: sc (ppm)
+            v=clean(record.get("V")),  # DataFrame: "V" -> model: v (ppm)
+            cr=clean(record.get("Cr")),  # DataFrame: "Cr" -> model: cr (ppm)
+            co=clean(record.get("Co")),  # DataFrame: "Co" -> model: co (ppm)
+            ni=clean(record.get("Ni")),  # DataFrame: "Ni" -> model: ni (ppm)
+            cu=clean(record.get("Cu")),  # DataFrame: "Cu" -> model: cu (ppm)
+            zn=clean(record.get("Zn")),  # DataFrame: "Zn" -> model: zn (ppm)
+            # Other elements
+            y=clean(record.get("Y")),  # DataFrame: "Y" -> model: y (ppm)
+            ga=clean(record.get("Ga")),  # DataFrame: "Ga" -> model: ga (ppm)
+            arsenic=clean(
+                record.get("As")
+            ),  # DataFrame: "As" -> model: arsenic (ppm)
+            mo=clean(record.get("Mo")),  # DataFrame: "Mo" -> model: mo (ppm)
+            sn=clean(record.get("Sn")),  # DataFrame: "Sn" -> model: sn (ppm)
+            pb=clean(record.get("Pb")),  # DataFrame: "Pb" -> model: pb (ppm)
+            be=clean(record.get("Be")),  # DataFrame: "Be" -> model: be (ppm)
+            li=clean(record.get("Li")),  # DataFrame: "Li" -> model: li (ppm)
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Импорт геохимических данных для конкретной трубки
@@ -1111,88 +1372,16 @@ class Geochemy(Base):
                 elif if_exists == "replace":
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(f"Удалено {deleted} существующих записей")
+                    log.info("Удалено %s существующих записей", deleted)
                 elif if_exists == "append":
-                    print(f"Добавление к {existing_count} существующим записям")
+                    log.info("Добавление к %s существующим записям", existing_count)
 
             # Импортируем новые данные
             records = df.to_dict("records")
             imported_count = 0
 
-            def clean(x):
-                if isinstance(x, float):
-                    return x
-                elif isinstance(x, int):
-                    return x
-                return None
-
             for record in records:
-                geochem = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Идентификаторы
-                    sample_id=record.get(
-                        "Образец"
-                    ),  # DataFrame: "Образец" -> model: sample_id
-                    sample_interval=record.get(
-                        "Образец_интервал_от"
-                    ),  # DataFrame: "Образец_интервал_от" -> model: sample_interval
-                    borehole=record.get(
-                        "Скважина"
-                    ),  # DataFrame: "Скважина" -> model: borehole
-                    rock_type=record.get(
-                        "Порода"
-                    ),  # DataFrame: "Порода" -> model: rock_type
-                    source=record.get(
-                        "Источник"
-                    ),  # DataFrame: "Источник" -> model: source
-                    number=record.get("п_п"),  # DataFrame: "п_п" -> model: number
-                    # LILE (Large Ion Lithophile Elements)
-                    rb=clean(record.get("Rb")),  # DataFrame: "Rb" -> model: rb (ppm)
-                    cs=clean(record.get("Cs")),  # DataFrame: "Cs" -> model: cs (ppm)
-                    ba=clean(record.get("Ba")),  # DataFrame: "Ba" -> model: ba (ppm)
-                    sr=clean(record.get("Sr")),  # DataFrame: "Sr" -> model: sr (ppm)
-                    # HFSE (High Field Strength Elements)
-                    zr=clean(record.get("Zr")),  # DataFrame: "Zr" -> model: zr (ppm)
-                    hf=clean(record.get("Hf")),  # DataFrame: "Hf" -> model: hf (ppm)
-                    nb=clean(record.get("Nb")),  # DataFrame: "Nb" -> model: nb (ppm)
-                    ta=clean(record.get("Ta")),  # DataFrame: "Ta" -> model: ta (ppm)
-                    th=clean(record.get("Th")),  # DataFrame: "Th" -> model: th (ppm)
-                    u=clean(record.get("U")),  # DataFrame: "U" -> model: u (ppm)
-                    # REE (Rare Earth Elements)
-                    la=clean(record.get("La")),  # DataFrame: "La" -> model: la (ppm)
-                    ce=clean(record.get("Ce")),  # DataFrame: "Ce" -> model: ce (ppm)
-                    pr=clean(record.get("Pr")),  # DataFrame: "Pr" -> model: pr (ppm)
-                    nd=clean(record.get("Nd")),  # DataFrame: "Nd" -> model: nd (ppm)
-                    sm=clean(record.get("Sm")),  # DataFrame: "Sm" -> model: sm (ppm)
-                    eu=clean(record.get("Eu")),  # DataFrame: "Eu" -> model: eu (ppm)
-                    gd=clean(record.get("Gd")),  # DataFrame: "Gd" -> model: gd (ppm)
-                    tb=clean(record.get("Tb")),  # DataFrame: "Tb" -> model: tb (ppm)
-                    dy=clean(record.get("Dy")),  # DataFrame: "Dy" -> model: dy (ppm)
-                    ho=clean(record.get("Ho")),  # DataFrame: "Ho" -> model: ho (ppm)
-                    er=clean(record.get("Er")),  # DataFrame: "Er" -> model: er (ppm)
-                    tm=clean(record.get("Tm")),  # DataFrame: "Tm" -> model: tm (ppm)
-                    yb=clean(record.get("Yb")),  # DataFrame: "Yb" -> model: yb (ppm)
-                    lu=clean(record.get("Lu")),  # DataFrame: "Lu" -> model: lu (ppm)
-                    # Transition metals
-                    sc=clean(record.get("Sc")),  # DataFrame: "Sc" -> model: sc (ppm)
-                    v=clean(record.get("V")),  # DataFrame: "V" -> model: v (ppm)
-                    cr=clean(record.get("Cr")),  # DataFrame: "Cr" -> model: cr (ppm)
-                    co=clean(record.get("Co")),  # DataFrame: "Co" -> model: co (ppm)
-                    ni=clean(record.get("Ni")),  # DataFrame: "Ni" -> model: ni (ppm)
-                    cu=clean(record.get("Cu")),  # DataFrame: "Cu" -> model: cu (ppm)
-                    zn=clean(record.get("Zn")),  # DataFrame: "Zn" -> model: zn (ppm)
-                    # Other elements
-                    y=clean(record.get("Y")),  # DataFrame: "Y" -> model: y (ppm)
-                    ga=clean(record.get("Ga")),  # DataFrame: "Ga" -> model: ga (ppm)
-                    arsenic=clean(
-                        record.get("As")
-                    ),  # DataFrame: "As" -> model: arsenic (ppm)
-                    mo=clean(record.get("Mo")),  # DataFrame: "Mo" -> model: mo (ppm)
-                    sn=clean(record.get("Sn")),  # DataFrame: "Sn" -> model: sn (ppm)
-                    pb=clean(record.get("Pb")),  # DataFrame: "Pb" -> model: pb (ppm)
-                    be=clean(record.get("Be")),  # DataFrame: "Be" -> model: be (ppm)
-                    li=clean(record.get("Li")),  # DataFrame: "Li" -> model: li (ppm)
-                )
+                geochem = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
 
                 session.add(geochem)
                 imported_count += 1
@@ -1201,14 +1390,15 @@ class Geochemy(Base):
                     session.commit()
 
             session.commit()
-            print(
-                f"Импортировано {imported_count} записей геохимии для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s записей геохимии для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -1220,6 +1410,7 @@ class Petrochemy(Base):
     """
 
     __tablename__ = "petrochemy"
+    __table_args__ = (Index("ix_petrochemy_pipe_sample", "pipe_uuid", "sample_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -1278,6 +1469,51 @@ class Petrochemy(Base):
         return f"<Petrochemy(pipe_uuid={self.pipe_uuid}, sample_id='{self.sample_id}')>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Идентификаторы
+            sample_id=record.get("Образец"),
+            sample_interval=record.get("Образец_интервал_от"),
+            borehole=record.get("Скважина"),
+            rock_type=record.get("Порода"),
+            source=record.get("Источник"),
+            number=record.get("п_п"),
+            # Основные оксиды
+            sio2=clean(record.get("SiO2")),
+            tio2=clean(record.get("TiO2")),
+            al2o3=clean(record.get("Al2O3")),
+            fe2o3=clean(record.get("Fe2O3")),
+            feo_total=clean(record.get("FeOtotal")),
+            mgo=clean(record.get("MgO")),
+            cao=clean(record.get("CaO")),
+            na2o=clean(record.get("Na2O")),
+            k2o=clean(record.get("K2O")),
+            mno=clean(record.get("MnO")),
+            p2o5=clean(record.get("P2O5")),
+            # Летучие
+            h2o=clean(record.get("H2O")),
+            co2=clean(record.get("СО2")),
+            f=clean(record.get("F")),
+            s=clean(record.get("S")),
+            loi=clean(record.get("Ппп")),
+            # Индексы
+            fe_num=clean(record.get("Fenum")),
+            mg_num=clean(record.get("Mgnum")),
+            k_na=clean(record.get("K_Na")),
+            na2o_k2o=clean(record.get("Na2O_K2O")),
+            ic=clean(record.get("I_C")),
+            ilm_i=clean(record.get("Ilm_I")),
+            # Суммы
+            total=clean(record.get("Сумма")),
+            # Service fields
+            measurement_21=clean(
+                record.get("val_21")
+            ),  # DataFrame: 'val_21' -> model: measurement_21
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Импорт петрохимических данных для конкретной трубки
@@ -1287,13 +1523,6 @@ class Petrochemy(Base):
         Session = sessionmaker(bind=engine)
         session = Session()
 
-        def clean(x):
-            if isinstance(x, float):
-                return x
-            elif isinstance(x, int):
-                return x
-            return None
-
         try:
             # Проверяем существующие данные
             existing_count = session.query(cls).filter_by(pipe_uuid=pipe_uuid).count()
@@ -1306,56 +1535,16 @@ class Petrochemy(Base):
                 elif if_exists == "replace":
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(f"Удалено {deleted} существующих записей")
+                    log.info("Удалено %s существующих записей", deleted)
                 elif if_exists == "append":
-                    print(f"Добавление к {existing_count} существующим записям")
+                    log.info("Добавление к %s существующим записям", existing_count)
 
             # Импортируем новые данные
             records = df.to_dict("records")
             imported_count = 0
 
             for record in records:
-                petro = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Идентификаторы
-                    sample_id=record.get("Образец"),
-                    sample_interval=record.get("Образец_интервал_от"),
-                    borehole=record.get("Скважина"),
-                    rock_type=record.get("Порода"),
-                    source=record.get("Источник"),
-                    number=record.get("п_п"),
-                    # Основные оксиды
-                    sio2=clean(record.get("SiO2")),
-                    tio2=clean(record.get("TiO2")),
-                    al2o3=clean(record.get("Al2O3")),
-                    fe2o3=clean(record.get("Fe2O3")),
-                    feo_total=clean(record.get("FeOtotal")),
-                    mgo=clean(record.get("MgO")),
-                    cao=clean(record.get("CaO")),
-                    na2o=clean(record.get("Na2O")),
-                    k2o=clean(record.get("K2O")),
-                    mno=clean(record.get("MnO")),
-                    p2o5=clean(record.get("P2O5")),
-                    # Летучие
-                    h2o=clean(record.get("H2O")),
-                    co2=clean(record.get("СО2")),
-                    f=clean(record.get("F")),
-                    s=clean(record.get("S")),
-                    loi=clean(record.get("Ппп")),
-                    # Индексы
-                    fe_num=clean(record.get("Fenum")),
-                    mg_num=clean(record.get("Mgnum")),
-                    k_na=clean(record.get("K_Na")),
-                    na2o_k2o=clean(record.get("Na2O_K2O")),
-                    ic=clean(record.get("I_C")),
-                    ilm_i=clean(record.get("Ilm_I")),
-                    # Суммы
-                    total=clean(record.get("Сумма")),
-                    # Service fields
-                    measurement_21=clean(
-                        record.get("val_21")
-                    ),  # DataFrame: 'val_21' -> model: measurement_21
-                )
+                petro = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
 
                 session.add(petro)
                 imported_count += 1
@@ -1364,14 +1553,15 @@ class Petrochemy(Base):
                     session.commit()
 
             session.commit()
-            print(
-                f"Импортировано {imported_count} записей петрохимии для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s записей петрохимии для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -1383,6 +1573,10 @@ class Oxides(Base):
     """
 
     __tablename__ = "oxides"
+    __table_args__ = (
+        Index("ix_oxides_pipe_sample", "pipe_uuid", "sample_id"),
+        Index("ix_oxides_pipe_mineral", "pipe_uuid", "mineral"),
+    )
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -1438,6 +1632,51 @@ class Oxides(Base):
         return f"<Oxides(pipe_uuid={self.pipe_uuid}, sample_id='{self.sample_id}')>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Идентификаторы
+            sample_id=record.get("Образец"),
+            point_id=record.get("точки"),
+            mineral=record.get("минерал"),
+            source=record.get("Источник"),
+            rock_type=record.get("Порода"),
+            # Основные оксиды
+            sio2=record.get("SiO2"),
+            tio2=record.get("TiO2"),
+            al2o3=record.get("Al2O3"),
+            fe2o3=record.get("Fe2O3"),
+            feo=record.get("FeO"),
+            mgo=record.get("MgO"),
+            cao=record.get("CaO"),
+            na2o=record.get("Na2O"),
+            k2o=record.get("K2O"),
+            mno=record.get("MnO"),
+            p2o5=record.get("P2O5"),
+            cr2o3=record.get("Cr2O3"),
+            nio=record.get("NiO"),
+            # Редкоземельные и другие
+            bao=record.get("BaO"),
+            sro=record.get("SrO"),
+            ce2o3=record.get("Ce2O3"),
+            la2o3=record.get("La2O3"),
+            nd2o3=record.get("Nd2O3"),
+            nb2o5=record.get("Nb2O5"),
+            ta2o5=record.get("Ta2O5"),
+            tho2=record.get("ThO2"),
+            v2o3=record.get("V2O3"),
+            zno=record.get("ZnO"),
+            so3=record.get("SO3"),
+            # Летучие
+            f=record.get("F"),
+            # Totals
+            total_oxides=record.get(
+                "Total", record.get("total", record.get("val_17"))
+            ),  # DataFrame: 'Total' -> model: total_oxides
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Импорт данных по оксидам для конкретной трубки
@@ -1459,56 +1698,16 @@ class Oxides(Base):
                 elif if_exists == "replace":
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(f"Удалено {deleted} существующих записей")
+                    log.info("Удалено %s существующих записей", deleted)
                 elif if_exists == "append":
-                    print(f"Добавление к {existing_count} существующим записям")
+                    log.info("Добавление к %s существующим записям", existing_count)
 
             # Импортируем новые данные
             records = df.to_dict("records")
             imported_count = 0
 
             for record in records:
-                oxides = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Идентификаторы
-                    sample_id=record.get("Образец"),
-                    point_id=record.get("точки"),
-                    mineral=record.get("минерал"),
-                    source=record.get("Источник"),
-                    rock_type=record.get("Порода"),
-                    # Основные оксиды
-                    sio2=record.get("SiO2"),
-                    tio2=record.get("TiO2"),
-                    al2o3=record.get("Al2O3"),
-                    fe2o3=record.get("Fe2O3"),
-                    feo=record.get("FeO"),
-                    mgo=record.get("MgO"),
-                    cao=record.get("CaO"),
-                    na2o=record.get("Na2O"),
-                    k2o=record.get("K2O"),
-                    mno=record.get("MnO"),
-                    p2o5=record.get("P2O5"),
-                    cr2o3=record.get("Cr2O3"),
-                    nio=record.get("NiO"),
-                    # Редкоземельные и другие
-                    bao=record.get("BaO"),
-                    sro=record.get("SrO"),
-                    ce2o3=record.get("Ce2O3"),
-                    la2o3=record.get("La2O3"),
-                    nd2o3=record.get("Nd2O3"),
-                    nb2o5=record.get("Nb2O5"),
-                    ta2o5=record.get("Ta2O5"),
-                    tho2=record.get("ThO2"),
-                    v2o3=record.get("V2O3"),
-                    zno=record.get("ZnO"),
-                    so3=record.get("SO3"),
-                    # Летучие
-                    f=record.get("F"),
-                    # Totals
-                    total_oxides=record.get(
-                        "Total", record.get("total", record.get("val_17"))
-                    ),  # DataFrame: 'Total' -> model: total_oxides
-                )
+                oxides = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
 
                 session.add(oxides)
                 imported_count += 1
@@ -1517,14 +1716,15 @@ class Oxides(Base):
                     session.commit()
 
             session.commit()
-            print(
-                f"Импортировано {imported_count} записей оксидов для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s записей оксидов для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
@@ -1536,6 +1736,7 @@ class Isotopes(Base):
     """
 
     __tablename__ = "isotopes"
+    __table_args__ = (Index("ix_isotopes_pipe_sample", "pipe_uuid", "sample_id"),)
 
     # Primary Key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -1600,19 +1801,60 @@ class Isotopes(Base):
         return f"<Isotopes(pipe_uuid={self.pipe_uuid}, sample_id='{self.sample_id}')>"
 
     @classmethod
+    def fields(cls, record):
+        """Значения столбцов модели по строке DataFrame."""
+        return dict(
+            # Идентификаторы
+            sample_id=record.get("Образец"),
+            sample_id_alt=record.get("Образец_1") or record.get("Образец_2"),
+            source=record.get("Источник"),
+            # Концентрации
+            rb_ppm=record.get("Rb_ppm"),
+            sr_ppm=record.get("Sr_ppm"),
+            sm_ppm=record.get("Sm_ppm"),
+            nd_ppm=record.get("Nd_ppm"),
+            lu_ppm=record.get("Lu_ppm"),
+            hf_ppm=record.get("Hf_ppm"),
+            # Отношения
+            rb_sr=record.get("Rb_Sr"),
+            sm_nd=record.get("Sm_Nd"),
+            # Обратные
+            one_nd=record.get("1_Nd"),
+            one_sr=record.get("1_Sr"),
+            # Nd изотопы
+            nd143_nd144=record.get("143Nd_144Nd"),
+            nd143_nd144_i=record.get("143Nd_144Nd_i"),
+            sm147_nd144=record.get("147Sm_144Nd"),
+            # Sr изотопы
+            sr87_sr86=record.get("87Sr_86Sr"),
+            sr87_sr86_i=record.get("87Sr_86Sr_i"),
+            rb87_sr86=record.get("87Rb_86Sr"),
+            # Hf изотопы
+            hf176_hf177=record.get("176Hf_177Hf"),
+            lu176_hf177=record.get("176Lu_177Hf"),
+            # Эпсилон
+            eps_nd=record.get("epsNd"),
+            eps_sr=record.get("epsSr"),
+            eps_hf=record.get("epsHf"),
+            # Погрешности
+            sigma_2=sigma(record.get("2σ")),
+            sigma_2_1=sigma(record.get("2σ_1")),
+            sigma_2_2=sigma(record.get("2σ_2")),
+            sigma_2_3=sigma(record.get("2σ_3")),
+            sigma_2_4=sigma(record.get("2σ_4")),
+            # Возраст
+            age_ma=record.get("Возраст_млн"),
+            age_ma_1=record.get("Возраст_млн_1"),
+            age_ma_2=record.get("Возраст_млн_2"),
+        )
+
+    @classmethod
+    @records_import
     def import_from_dataframe(cls, df, pipe_uuid, connection_string, if_exists="fail"):
         """
         Импорт изотопных данных для конкретной трубки
         """
 
-        def sigma(value):
-            if value is None:
-                return None
-            if isinstance(value, str) and value.startswith("±"):
-                return float(value[1:])
-            else:
-                return float(value)
-
         engine = create_engine(connection_string)
         cls.metadata.create_all(engine)
         Session = sessionmaker(bind=engine)
@@ -1630,60 +1872,16 @@ class Isotopes(Base):
                 elif if_exists == "replace":
                     deleted = session.query(cls).filter_by(pipe_uuid=pipe_uuid).delete()
                     session.commit()
-                    print(f"Удалено {deleted} существующих записей")
+                    log.info("Удалено %s существующих записей", deleted)
                 elif if_exists == "append":
-                    print(f"Добавление к {existing_count} существующим записям")
+                    log.info("Добавление к %s существующим записям", existing_count)
 
             # Импортируем новые данные
             records = df.to_dict("records")
             imported_count = 0
 
             for record in records:
-                isotopes = cls(
-                    pipe_uuid=pipe_uuid,
-                    # Идентификаторы
-                    sample_id=record.get("Образец"),
-                    sample_id_alt=record.get("Образец_1") or record.get("Образец_2"),
-                    source=record.get("Источник"),
-                    # Концентрации
-                    rb_ppm=record.get("Rb_ppm"),
-                    sr_ppm=record.get("Sr_ppm"),
-                    sm_ppm=record.get("Sm_ppm"),
-                    nd_ppm=record.get("Nd_ppm"),
-                    lu_ppm=record.get("Lu_ppm"),
-                    hf_ppm=record.get("Hf_ppm"),
-                    # Отношения
-                    rb_sr=record.get("Rb_Sr"),
-                    sm_nd=record.get("Sm_Nd"),
-                    # Обратные
-                    one_nd=record.get("1_Nd"),
-                    one_sr=record.get("1_Sr"),
-                    # Nd изотопы
-                    nd143_nd144=record.get("143Nd_144Nd"),
-                    nd143_nd144_i=record.get("143Nd_144Nd_i"),
-                    sm147_nd144=record.get("147Sm_144Nd"),
-                    # Sr изотопы
-                    sr87_sr86=record.get("87Sr_86Sr"),
-                    sr87_sr86_i=record.get("87Sr_86Sr_i"),
-                    rb87_sr86=record.get("87Rb_86Sr"),
-                    # Hf изотопы
-                    hf176_hf177=record.get("176Hf_177Hf"),
-                    lu176_hf177=record.get("176Lu_177Hf"),
-                    # Эпсилон
-                    eps_nd=record.get("epsNd"),
-                    eps_sr=record.get("epsSr"),
-                    eps_hf=record.get("epsHf"),
-                    # Погрешности
-                    sigma_2=sigma(record.get("2σ")),
-                    sigma_2_1=sigma(record.get("2σ_1")),
-                    sigma_2_2=sigma(record.get("2σ_2")),
-                    sigma_2_3=sigma(record.get("2σ_3")),
-                    sigma_2_4=sigma(record.get("2σ_4")),
-                    # Возраст
-                    age_ma=record.get("Возраст_млн"),
-                    age_ma_1=record.get("Возраст_млн_1"),
-                    age_ma_2=record.get("Возраст_млн_2"),
-                )
+                isotopes = cls(pipe_uuid=pipe_uuid, **cls.fields(record))
 
                 session.add(isotopes)
                 imported_count += 1
@@ -1692,14 +1890,183 @@ class Isotopes(Base):
                     session.commit()
 
             session.commit()
-            print(
-                f"Импортировано {imported_count} записей изотопии для трубки {pipe_uuid}"
+            log.info(
+                "Импортировано %s записей изотопии для трубки %s",
+                imported_count, pipe_uuid
             )
             return imported_count
 
         except Exception as e:
             session.rollback()
-            print(f"Ошибка при импорте: {e}")
+            log.error("Ошибка при импорте: %s", e)
             raise
         finally:
             session.close()
+
+
+OXIDE_COLUMN = re.compile(r"([a-z]+?)(\d*)o(\d*)")
+
+
+def analyte_formula(column_name):
+    """
+    Символ элемента или формула оксида по имени столбца модели.
+
+    'ni' -> 'Ni', 'cr2o3' -> 'Cr2O3'; служебные и расчётные столбцы
+    ('total', 'loi', 'nio_1') - None.
+    """
+    symbol = column_name.capitalize()
+    if symbol in ANALYTE_ELEMENTS:
+        return symbol
+    m = OXIDE_COLUMN.fullmatch(column_name)
+    if m is None:
+        return None
+    formula = "{}{}O{}".format(m.group(1).capitalize(), m.group(2), m.group(3))
+    return formula if oxide_composition(formula) is not None else None
+
+
+class Measurement(Base):
+    """
+    Измерения всех таблиц анализов в длинном формате
+    (одна строка - одно значение одного элемента или оксида).
+
+    Таблица - материализованное представление широких таблиц: строки
+    не редактируются, а пересобираются refresh() по трубке или целиком.
+    """
+
+    __tablename__ = "measurements"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pipe_uuid = Column(UUID(as_uuid=True), nullable=False)
+    source_table = Column(String(50), nullable=False)  # 'epma_analyses'
+    row_id = Column(UUID(as_uuid=True), nullable=False)  # id строки source_table
+    analyte = Column(String(20), nullable=False)  # 'Ni', 'Cr2O3'
+    value = Column(Float, nullable=False)
+    unit = Column(String(10), nullable=False)  # '%', 'PPM'
+
+    __table_args__ = (
+        # value в индексе: выборка по элементу читается только из индекса
+        Index("ix_measurements_analyte_pipe", "analyte", "pipe_uuid", "value"),
+        Index("ix_measurements_pipe_source", "pipe_uuid", "source_table"),
+    )
+
+    # Таблицы-источники и единицы хранения их анализов
+    # (см. FRAME_UNITS в alrosa_importer)
+    SOURCES = [
+        ("oxides", PERCENT),
+        ("petrochemy", PERCENT),
+        ("phlogopite", PERCENT),
+        ("epma_analyses", PERCENT),
+        ("geochemy", PPM),
+        ("lam_analyses", PPM),
+    ]
+
+    def __repr__(self):
+        return f"<Measurement({self.source_table}.{self.analyte}={self.value} {self.unit})>"
+
+    @classmethod
+    def source_select(cls, table_name, unit, pipe_uuid=None):
+        """
+        SELECT строк измерений одной широкой таблицы (UNION ALL по столбцам).
+        Трубка анализов зёрен берётся через grains -> samples.
+        """
+        table = Base.metadata.tables[table_name]
+        if "pipe_uuid" in table.c:
+            pipe = table.c.pipe_uuid
+            source = table
+        else:
+            grains = Grain.__table__
+            samples = Sample.__table__
+            pipe = samples.c.pipe_uuid
+            source = table.join(grains, grains.c.id == table.c.grain_id).join(
+                samples, samples.c.id == grains.c.sample_id
+            )
+        selects = []
+        for column in table.c:
+            analyte = analyte_formula(column.name)
+            if analyte is None or not isinstance(column.type, Float):
+                continue
+            query = select(
+                pipe,
+                literal(table_name, String),
+                table.c.id,
+                literal(analyte, String),
+                column,
+                literal(unit, String),
+            ).select_from(source).where(column.is_not(None))
+            if pipe_uuid is not None:
+                query = query.where(pipe == pipe_uuid)
+            selects.append(query)
+        return union_all(*selects)
+
+    @classmethod
+    def refresh(cls, connection, pipe_uuid=None, tables=None):
+        """
+        Пересобирает измерения трубки (или всех трубок) из широких таблиц.
+
+        Args:
+            connection: Connection в открытой транзакции.
+            pipe_uuid: UUID трубки; None - все трубки.
+            tables (list): Имена таблиц-источников; по умолчанию все SOURCES.
+
+        Returns:
+            int - количество записанных измерений
+        """
+        if isinstance(pipe_uuid, str):
+            pipe_uuid = uuid.UUID(pipe_uuid)
+        sources = [(t, u) for t, u in cls.SOURCES if tables is None or t in tables]
+        table = cls.__table__
+        stale = delete(table).where(
+            table.c.source_table.in_([t for t, _ in sources]))
+        if pipe_uuid is not None:
+            stale = stale.where(table.c.pipe_uuid == pipe_uuid)
+        connection.execute(stale)
+        columns = ["pipe_uuid", "source_table", "row_id", "analyte", "value", "unit"]
+        total = 0
+        for table_name, unit in sources:
+            result = connection.execute(
+                insert(table).from_select(
+                    columns, cls.source_select(table_name, unit, pipe_uuid))
+            )
+            total += result.rowcount
+        log.info("Обновлено %s измерений трубки %s", total, pipe_uuid or "*")
+        return total
+
+
+class PipeImport(Base):
+    """
+    Учёт импорта трубок: ревизия увеличивается при каждом импорте трубки.
+    По ревизиям читатели (alrosa_query) узнают, что их кэш устарел.
+    """
+
+    __tablename__ = "pipe_imports"
+
+    pipe_uuid = Column(UUID(as_uuid=True), primary_key=True)
+    revision = Column(Integer, nullable=False, default=1)
+    imported_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<PipeImport(pipe_uuid={self.pipe_uuid}, revision={self.revision})>"
+
+    @classmethod
+    def record(cls, connection, pipe_uuid):
+        """Отмечает импорт трубки в открытой транзакции."""
+        if isinstance(pipe_uuid, str):
+            pipe_uuid = uuid.UUID(pipe_uuid)
+        table = cls.__table__
+        now = datetime.datetime.now(datetime.timezone.utc)
+        stmt = dialect_insert(connection, table).values(
+            pipe_uuid=pipe_uuid, revision=1, imported_at=now)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.pipe_uuid],
+                set_={"revision": table.c.revision + 1, "imported_at": now},
+            )
+        )
+
+    @classmethod
+    def revisions(cls, connection):
+        """Сводка ревизий всех трубок: меняется после любого импорта."""
+        table = cls.__table__
+        return tuple(connection.execute(
+            select(func.count(), func.coalesce(func.sum(table.c.revision), 0))
+        ).one())
@@ -0,0 +1,268 @@
+"""
+Чтение данных трубок из SQL-хранилища.
+
+Запросы строятся SQLAlchemy Core и выполняются одним обращением к базе;
+строки результата сразу собираются в pandas DataFrame (или таблицу
+Arrow), объекты ORM не создаются.
+
+Фильтры (значение или список значений):
+- pipe - трубка: UUID или имя листа ('1_1');
+- sample - шашка (EPMA, LAM) или образец/проба (таблицы трубки);
+- grain - зерно (только EPMA, LAM);
+- analyte - элемент или оксид ('Ni', 'Cr2O3'), см. Measurement.
+
+Результаты кэшируются (common.ResultCache) по параметрам запроса. Импорт
+трубки увеличивает её ревизию в pipe_imports (PipeImport.record()); при
+изменении ревизий кэш очищается, поэтому ноутбуки и GraphQL-сервер не
+получают устаревших данных после повторного импорта.
+
+Читатель не выполняет миграций (DDL): схему создаёт и обновляет импортёр
+(schema.ensure_schema()) или ``python schema.py URL``.
+
+Пример использования:
+    store = AlrosaStore("sqlite:///tubes.db")
+    ni = store.measurements(analyte="Ni", pipe="1_1")
+    epma = store.analyses("epma_analyses", pipe="1_1", sample="ш-0")
+    table = store.measurements(analyte=["Cr2O3", "NiO"], format="arrow")
+"""
+
+import time
+import uuid
+
+import pandas as pd
+from sqlalchemy import String, create_engine, null, select, union_all
+from sqlalchemy.dialects.postgresql import UUID
+
+from alrosa_models import Base, Grain, Measurement, PipeImport, Sample
+from common import ResultCache
+from skolem import generate_deterministic_uuid
+
+FORMATS = ("pandas", "arrow")
+GRAIN_TABLES = ("epma_analyses", "lam_analyses")
+MEASUREMENT_COLUMNS = ["pipe_uuid", "source_table", "row_id", "sample", "grain",
+                       "analyte", "value", "unit"]
+
+
+def pipe_uuid(pipe):
+    """UUID трубки по UUID, его строке или имени трубки."""
+    if isinstance(pipe, uuid.UUID):
+        return pipe
+    try:
+        return uuid.UUID(str(pipe))
+    except ValueError:
+        return generate_deterministic_uuid(str(pipe))
+
+
+def as_tuple(value):
+    """Значение фильтра как кортеж (None - без фильтра)."""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(value)
+    return (value,)
+
+
+def where_in(query, column, values):
+    return query if values is None else query.where(column.in_(values))
+
+
+def to_arrow(df, uuid_columns):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("format='arrow' требует пакет pyarrow")
+    df = df.copy()
+    for name in uuid_columns:
+        df[name] = df[name].map(lambda v: None if v is None else str(v))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class AlrosaStore:
+    """
+    Запросы к SQL-хранилищу трубок с кэшем результатов.
+
+    Args:
+        connection_string (str): Строка подключения SQLAlchemy.
+        cache_size (int): Размер кэша (0 - кэш отключён).
+        ttl (float): Время жизни записи кэша в секундах (None - без ограничения).
+        check_interval (float): Как часто (в секундах) сверять ревизии
+            pipe_imports; 0 - перед каждым запросом. При большем значении
+            попадание в кэш не обращается к базе вовсе.
+    """
+
+    def __init__(self, connection_string="sqlite:///tubes.db", cache_size=128,
+                 ttl=None, check_interval=0.0):
+        self.engine = create_engine(connection_string)
+        self.cache = ResultCache(cache_size, ttl) if cache_size else None
+        self.check_interval = check_interval
+        self.revisions = None
+        self.checked = None
+
+    def invalidate(self):
+        """Сбрасывает кэш (следующий запрос перечитает ревизии)."""
+        if self.cache is not None:
+            self.cache.clear()
+        self.checked = None
+
+    def check_revisions(self):
+        now = time.monotonic()
+        if self.checked is not None and now - self.checked < self.check_interval:
+            return
+        with self.engine.connect() as connection:
+            revisions = PipeImport.revisions(connection)
+        self.checked = now
+        if revisions != self.revisions:
+            self.cache.clear()
+            self.revisions = revisions
+
+    def fetch(self, key, query, format):
+        """Результат запроса из кэша или из базы одним обращением."""
+        if format not in FORMATS:
+            raise ValueError("unknown format: {}".format(format))
+        key = key + (format,)
+        if self.cache is not None:
+            self.check_revisions()
+            result = self.cache.get(key)
+            if result is not None:
+                return result.copy() if format == "pandas" else result
+        if query is None:
+            df = pd.DataFrame(columns=MEASUREMENT_COLUMNS)
+        else:
+            with self.engine.connect() as connection:
+                rows = connection.execute(query)
+                df = pd.DataFrame.from_records(rows.fetchall(),
+                                               columns=list(rows.keys()))
+        if format == "arrow":
+            uuid_columns = [] if query is None else [
+                c.name for c in query.selected_columns if isinstance(c.type, UUID)]
+            result = to_arrow(df, uuid_columns)
+        else:
+            result = df
+        if self.cache is not None:
+            self.cache.put(key, result)
+            return result.copy() if format == "pandas" else result
+        return result
+
+    def measurements(self, pipe=None, sample=None, grain=None, analyte=None,
+                     source_table=None, format="pandas"):
+        """
+        Измерения в длинном формате (таблица measurements) с именами шашки
+        (образца) и зерна.
+
+        Returns:
+            DataFrame или pyarrow.Table со столбцами MEASUREMENT_COLUMNS
+        """
+        pipes = as_tuple(pipe)
+        pipes = None if pipes is None else tuple(pipe_uuid(p) for p in pipes)
+        samples = as_tuple(sample)
+        grains = as_tuple(grain)
+        analytes = as_tuple(analyte)
+        tables = as_tuple(source_table)
+        key = ("measurements", pipes, samples, grains, analytes, tables)
+        return self.fetch(
+            key,
+            self.measurement_query(pipes, samples, grains, analytes, tables),
+            format,
+        )
+
+    @staticmethod
+    def measurement_query(pipes, samples, grains, analytes, tables):
+        """UNION ALL по таблицам-источникам; None, если источников нет."""
+        m = Measurement.__table__
+        branches = []
+        for table_name, _ in Measurement.SOURCES:
+            if tables is not None and table_name not in tables:
+                continue
+            table = Base.metadata.tables[table_name]
+            source = m.join(table, table.c.id == m.c.row_id)
+            if table_name in GRAIN_TABLES:
+                grain_table = Grain.__table__
+                sample_table = Sample.__table__
+                source = source.join(
+                    grain_table, grain_table.c.id == table.c.grain_id
+                ).join(sample_table, sample_table.c.id == grain_table.c.sample_id)
+                sample_column = sample_table.c.sample_name
+                grain_column = grain_table.c.grain_name
+            elif grains is not None:
+                continue  # у таблиц трубки нет зёрен
+            else:
+                sample_column = table.c.sample_id
+                grain_column = null().cast(String)
+            query = (
+                select(
+                    m.c.pipe_uuid,
+                    m.c.source_table,
+                    m.c.row_id,
+                    sample_column.label("sample"),
+                    grain_column.label("grain"),
+                    m.c.analyte,
+                    m.c.value,
+                    m.c.unit,
+                )
+                .select_from(source)
+                .where(m.c.source_table == table_name)
+            )
+            query = where_in(query, m.c.analyte, analytes)
+            query = where_in(query, m.c.pipe_uuid, pipes)
+            query = where_in(query, sample_column, samples)
+            if table_name in GRAIN_TABLES:
+                query = where_in(query, grain_column, grains)
+            branches.append(query)
+        if not branches:
+            return None
+        return branches[0] if len(branches) == 1 else union_all(*branches)
+
+    def analyses(self, table_name, pipe=None, sample=None, grain=None,
+                 format="pandas"):
+        """
+        Строки таблицы анализов в широком формате; для EPMA и LAM - с
+        трубкой, шашкой и зерном.
+
+        Args:
+            table_name (str): Имя таблицы ('epma_analyses', 'oxides', ...).
+        """
+        if table_name not in Base.metadata.tables:
+            raise ValueError("unknown table: {}".format(table_name))
+        pipes = as_tuple(pipe)
+        pipes = None if pipes is None else tuple(pipe_uuid(p) for p in pipes)
+        samples = as_tuple(sample)
+        grains = as_tuple(grain)
+        table = Base.metadata.tables[table_name]
+        if table_name in GRAIN_TABLES:
+            grain_table = Grain.__table__
+            sample_table = Sample.__table__
+            query = (
+                select(
+                    sample_table.c.pipe_uuid,
+                    sample_table.c.sample_name.label("sample"),
+                    grain_table.c.grain_name.label("grain"),
+                    *table.c,
+                )
+                .join_from(table, grain_table, grain_table.c.id == table.c.grain_id)
+                .join(sample_table, sample_table.c.id == grain_table.c.sample_id)
+            )
+            query = where_in(query, sample_table.c.pipe_uuid, pipes)
+            query = where_in(query, sample_table.c.sample_name, samples)
+            query = where_in(query, grain_table.c.grain_name, grains)
+        elif "pipe_uuid" in table.c and "sample_id" in table.c:
+            if grains is not None:
+                raise ValueError("grain filter needs one of {}".format(GRAIN_TABLES))
+            query = select(table)
+            query = where_in(query, table.c.pipe_uuid, pipes)
+            query = where_in(query, table.c.sample_id, samples)
+        else:
+            raise ValueError("{} is not an analysis table".format(table_name))
+        key = ("analyses", table_name, pipes, samples, grains)
+        return self.fetch(key, query, format)
+
+    def pipes(self, format="pandas"):
+        """Импортированные трубки с ревизией и временем последнего импорта."""
+        query = select(PipeImport.__table__).order_by(
+            PipeImport.__table__.c.imported_at)
+        return self.fetch(("pipes",), query, format)
+
+    def cache_info(self):
+        if self.cache is None:
+            return None
+        return {"hits": self.cache.hits, "misses": self.cache.misses,
+                "size": len(self.cache)}
@@ -0,0 +1,335 @@
+"""
+Пакетная загрузка таблиц трубки в SQL без ORM.
+
+Строки DataFrame переводятся в значения столбцов модели (fields()),
+записываются во временную промежуточную таблицу и переносятся в таблицу
+модели одним INSERT ... SELECT. Шашки и зёрна анализов EPMA и LAM
+находятся по именам шашки и зерна в трубке тем же SQL (для EPMA
+недостающие создаются), без запросов на каждую строку. Анализы зёрен
+получают детерминированные id (AnalysisIds) и переносятся upsert'ом,
+как в import_from_dataframe() моделей.
+
+Запись в промежуточную таблицу:
+- PostgreSQL - COPY ... FROM STDIN в формате CSV (psycopg2 или psycopg 3);
+- остальные базы (SQLite) - один executemany.
+
+Результат совпадает с import_from_dataframe() моделей, кроме того, что
+нечисловые значения (NaN) записываются как NULL.
+
+Пример использования:
+    with create_engine(url).begin() as connection:
+        load_dataframe(connection, Oxides, df, pipe_uuid, if_exists="fail")
+
+Из командной строки импортёра:
+    python alrosa_importer.py --loader bulk
+"""
+
+import io
+import json
+import math
+import numbers
+import uuid
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    func,
+    literal,
+    select,
+)
+
+from alrosa_models import (
+    AnalysisIds,
+    EPMAAnalysis,
+    Grain,
+    LAMAnalysis,
+    PipeImport,
+    Sample,
+    delete_stale_analyses,
+    dialect_insert,
+    upsert_statement,
+)
+from logs import get_logger
+
+log = get_logger("bulk_load")
+
+LOADERS = ("orm", "bulk")
+
+# Столбцы промежуточной таблицы анализов зёрен помимо столбцов модели
+ORDINAL = "stage_ordinal"
+SAMPLE_NAME = "stage_sample_name"
+GRAIN_NAME = "stage_grain_name"
+SAMPLE_PREFIX = "stage_sample_"
+
+
+def default_loader(engine):
+    """COPY окупается на PostgreSQL; для SQLite остаётся ORM-импорт."""
+    return "bulk" if engine.dialect.name == "postgresql" else "orm"
+
+
+def new_uuid(connection):
+    """SQL-выражение нового случайного UUID в формате хранения диалекта."""
+    if connection.dialect.name == "postgresql":
+        return func.gen_random_uuid()
+    # UUID на SQLite хранится как 32 шестнадцатеричных символа
+    return func.lower(func.hex(func.randomblob(16)))
+
+
+def is_null(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def staging_table(name, columns):
+    """Временная таблица со столбцами тех же типов, все допускают NULL."""
+    return Table(
+        "stage_" + name,
+        MetaData(),
+        *[Column(c.name, c.type, nullable=True) for c in columns],
+        prefixes=["TEMPORARY"],
+    )
+
+
+def csv_field(value, column_type):
+    """
+    Значение в CSV для COPY: пустое без кавычек - NULL, строки в кавычках.
+
+    Числа NumPy приводятся к int/float Python: repr(np.float64(1.5)) в
+    NumPy 2 - 'np.float64(1.5)'.
+    """
+    if is_null(value):
+        return ""
+    if isinstance(column_type, JSON):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(column_type, Boolean):
+        return "t" if value else "f"
+    elif isinstance(value, numbers.Integral) and not isinstance(value, bool):
+        return str(int(value))
+    elif isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return str(float(value))
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def copy_rows(connection, table, rows):
+    """COPY строк в таблицу через соединение psycopg2 или psycopg 3."""
+    quote = connection.dialect.identifier_preparer.quote
+    names = [c.name for c in table.c]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(
+            ",".join(csv_field(row.get(n), table.c[n].type) for n in names))
+        buffer.write("\n")
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        quote(table.name), ", ".join(quote(n) for n in names))
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def write_rows(connection, table, rows):
+    if connection.dialect.name == "postgresql":
+        copy_rows(connection, table, rows)
+    else:
+        connection.execute(
+            table.insert(),
+            [{k: None if is_null(v) else v for k, v in row.items()}
+             for row in rows],
+        )
+
+
+def model_columns(model, fields):
+    """Столбцы таблицы по атрибутам модели из fields() (атрибут и столбец
+    могут называться по-разному: Geochemy.arsenic - столбец "as")."""
+    mapped = model.__mapper__.columns
+    missing = [name for name in fields if name not in mapped]
+    if missing:
+        raise KeyError("{}: нет столбцов {}".format(model.__tablename__, missing))
+    return {name: mapped[name] for name in fields}
+
+
+def column_values(columns, fields, prefix=""):
+    """Значения fields() по именам столбцов промежуточной таблицы."""
+    return {prefix + c.name: fields[name] for name, c in columns.items()}
+
+
+def load_dataframe(connection, model, df, pipe_uuid, if_exists="append"):
+    """
+    Загружает DataFrame в таблицу модели.
+
+    Args:
+        connection: Connection в открытой транзакции.
+        model: Модель alrosa_models с fields().
+        df (DataFrame): Канонический DataFrame таблицы трубки.
+        pipe_uuid: UUID трубки.
+        if_exists (str): Как в import_from_dataframe() моделей с pipe_uuid
+            ('fail', 'replace', 'append'); анализы зёрен всегда дописываются.
+
+    Импорт отмечается в той же транзакции (PipeImport.record()), как и
+    import_from_dataframe() моделей.
+
+    Returns:
+        int - количество загруженных записей
+    """
+    if isinstance(pipe_uuid, str):
+        pipe_uuid = uuid.UUID(pipe_uuid)
+    if model in (EPMAAnalysis, LAMAnalysis):
+        n = load_grain_analyses(connection, model, df, pipe_uuid)
+    else:
+        n = load_pipe_rows(connection, model, df, pipe_uuid, if_exists)
+    PipeImport.record(connection, pipe_uuid)
+    return n
+
+
+def load_pipe_rows(connection, model, df, pipe_uuid, if_exists):
+    table = model.__table__
+    existing = connection.execute(
+        select(func.count()).select_from(table).where(table.c.pipe_uuid == pipe_uuid)
+    ).scalar()
+    if existing:
+        if if_exists == "fail":
+            raise ValueError(
+                f"Данные для трубки {pipe_uuid} уже существуют ({existing} записей)"
+            )
+        elif if_exists == "replace":
+            connection.execute(delete(table).where(table.c.pipe_uuid == pipe_uuid))
+            log.info("Удалено %s существующих записей", existing)
+        elif if_exists != "append":
+            raise ValueError(f"Недопустимое значение if_exists: {if_exists}")
+
+    columns = model_columns(model, model.fields({}))
+    rows = [column_values(columns, model.fields(record))
+            for record in df.to_dict("records")]
+    if not rows:
+        return 0
+    columns = list(columns.values())
+    stage = staging_table(table.name, columns)
+    stage.create(connection)
+    try:
+        write_rows(connection, stage, rows)
+        query = select(
+            new_uuid(connection),
+            literal(pipe_uuid, table.c.pipe_uuid.type),
+            *stage.c,
+        )
+        result = connection.execute(
+            table.insert().from_select(
+                ["id", "pipe_uuid"] + [c.name for c in columns], query)
+        )
+    finally:
+        stage.drop(connection)
+    log.info("Импортировано %s записей %s для трубки %s",
+             result.rowcount, table.name, pipe_uuid)
+    return result.rowcount
+
+
+def grain_rows(model, df, pipe_uuid, with_samples):
+    """Строки анализов с id, именами шашки и зерна (и полями шашки для EPMA)."""
+    columns = model_columns(model, model.fields({}))
+    sample_columns = model_columns(Sample, Sample.fields({}))
+    ids = AnalysisIds(model.__tablename__, pipe_uuid)
+    rows = []
+    for ordinal, record in enumerate(df.to_dict("records")):
+        sample_name = record.get("шашка")
+        grain_name = record.get("зерно", "?" if with_samples else None)
+        if not sample_name or not grain_name:
+            continue
+        row = column_values(columns, model.fields(record))
+        row["id"] = ids.next(sample_name, grain_name)
+        row[ORDINAL] = ordinal
+        row[SAMPLE_NAME] = sample_name
+        row[GRAIN_NAME] = grain_name
+        if with_samples:
+            row.update(column_values(
+                sample_columns, Sample.fields(record), SAMPLE_PREFIX))
+        rows.append(row)
+    return rows
+
+
+def load_grain_analyses(connection, model, df, pipe_uuid):
+    """
+    Анализы зёрен: шашки и зёрна EPMA создаются по именам, анализы LAM
+    привязываются только к зёрнам, уже загруженным из EPMA.
+    """
+    table = model.__table__
+    samples = Sample.__table__
+    grains = Grain.__table__
+    with_samples = model is EPMAAnalysis
+    rows = grain_rows(model, df, pipe_uuid, with_samples)
+    if not rows:
+        return 0
+    columns = list(model_columns(model, model.fields({})).values())
+    sample_columns = list(model_columns(Sample, Sample.fields({})).values())
+    stage_columns = [table.c.id] + columns + [
+        Column(ORDINAL, Integer),
+        Column(SAMPLE_NAME, samples.c.sample_name.type),
+        Column(GRAIN_NAME, grains.c.grain_name.type),
+    ]
+    if with_samples:
+        stage_columns += [Column(SAMPLE_PREFIX + c.name, c.type) for c in sample_columns]
+    stage = staging_table(table.name, stage_columns)
+    stage.create(connection)
+    try:
+        write_rows(connection, stage, rows)
+        pipe = literal(pipe_uuid, samples.c.pipe_uuid.type)
+        if with_samples:
+            # Поля шашки - из её первой строки, как в Sample.import_from_dataframe()
+            first = select(func.min(stage.c[ORDINAL])).group_by(stage.c[SAMPLE_NAME])
+            query = select(
+                new_uuid(connection),
+                pipe,
+                stage.c[SAMPLE_NAME],
+                *[stage.c[SAMPLE_PREFIX + c.name] for c in sample_columns],
+            ).where(stage.c[ORDINAL].in_(first))
+            connection.execute(
+                dialect_insert(connection, samples)
+                .from_select(["id", "pipe_uuid", "sample_name"]
+                             + [c.name for c in sample_columns], query)
+                .on_conflict_do_nothing(index_elements=["pipe_uuid", "sample_name"])
+            )
+            names = select(stage.c[SAMPLE_NAME], stage.c[GRAIN_NAME]).distinct().subquery()
+            query = (
+                select(new_uuid(connection), samples.c.id, names.c[GRAIN_NAME])
+                .join_from(names, samples, samples.c.sample_name == names.c[SAMPLE_NAME])
+                .where(samples.c.pipe_uuid == pipe_uuid)
+            )
+            connection.execute(
+                dialect_insert(connection, grains)
+                .from_select(["id", "sample_id", "grain_name"], query)
+                .on_conflict_do_nothing(index_elements=["sample_id", "grain_name"])
+            )
+        query = (
+            select(stage.c.id, grains.c.id,
+                   *[stage.c[c.name] for c in columns])
+            .join_from(stage, samples, samples.c.sample_name == stage.c[SAMPLE_NAME])
+            .join(grains, (grains.c.sample_id == samples.c.id)
+                  & (grains.c.grain_name == stage.c[GRAIN_NAME]))
+            .where(samples.c.pipe_uuid == pipe_uuid)
+        )
+        # Загруженные - строки, которые нашли своё зерно в SELECT upsert'а;
+        # прежняя строка с тем же id, зерно которой больше не находится,
+        # удаляется как устаревшая
+        loaded = connection.execute(
+            query.with_only_columns(stage.c.id)).scalars().all()
+        names = ["grain_id"] + [c.name for c in columns]
+        result = connection.execute(
+            upsert_statement(connection, table, names, ["id"] + names, query))
+    finally:
+        stage.drop(connection)
+    delete_stale_analyses(connection, model, pipe_uuid, loaded)
+    log.info("Импортировано %s анализов %s для трубки %s (изменено %s)",
+             len(loaded), table.name, pipe_uuid, result.rowcount)
+    if len(rows) > len(loaded):
+        log.info("Пропущено %s записей (зерна не найдены в EPMA)",
+                 len(rows) - len(loaded))
+    return len(loaded)
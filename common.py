@@ -1,8 +1,13 @@
 from SPARQLWrapper import SPARQLWrapper, POST, JSON, CSV, RDF, RDFXML, N3, JSONLD, XML
 import requests as rq
+from requests.adapters import HTTPAdapter
 import os
 import pprint
-from collections import namedtuple
+import re
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     del os.environ["HTTP_PROXY"]
@@ -56,41 +61,417 @@ def conv(results):
         yield {k: v["value"] for k, v in e.items()}
 
 
+# Заголовок, которым Virtuoso отмечает ответ, урезанный до ResultSetMaxRows
+MAXROWS_HEADER = "X-SPARQL-MaxRows"
+
+COMMENT_RE = re.compile(r"(^|\s)#.*$", re.MULTILINE)
+SELECT_RE = re.compile(r"\bSELECT\s+(?:DISTINCT\s+|REDUCED\s+)?(.*?)\s*(?:\bFROM\b|\bWHERE\b|\{)",
+                       re.IGNORECASE | re.DOTALL)
+
+
+class TruncatedResult(Exception):
+    """Точка доступа вернула неполный результат запроса."""
+
+
+def select_variables(query):
+    """
+    Возвращает переменные проекции SELECT-запроса (без '?').
+
+    Комментарии запроса игнорируются. Для 'SELECT *' возвращается пустой
+    список.
+    """
+    m = SELECT_RE.search(COMMENT_RE.sub(r"\1", query))
+    if m is None:
+        return []
+    return re.findall(r"[?$](\w+)", m.group(1))
+
+
+TSV_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+TSV_ESCAPE_RE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+
+
+def _tsv_unescape(m):
+    e = m.group(1)
+    if e[0] in "uU" and len(e) > 1:
+        return chr(int(e[1:], 16))
+    return TSV_ESCAPES.get(e, e)
+
+
+def tsv_term(s):
+    """
+    Преобразует RDF-термин из ответа SPARQL TSV в строку.
+
+    Результат совпадает с полем "value" ответа SPARQL JSON: IRI без
+    угловых скобок, литерал без кавычек, языкового тега и типа данных.
+    Пустая строка (несвязанная переменная) даёт None.
+    """
+    if not s:
+        return None
+    if s[0] == "<" and s[-1] == ">":
+        return s[1:-1]
+    if s[0] == '"':
+        end = s.rfind('"')
+        body = s[1:end]
+        if "\\" in body:
+            body = TSV_ESCAPE_RE.sub(_tsv_unescape, body)
+        return body
+    if s.startswith("_:"):
+        return s[2:]
+    return s  # Числа и логические значения в сокращённой записи
+
+
+def tsv_lines(rc, chunk_size=65536):
+    """
+    Выдаёт строки потокового ответа TSV без символов конца строки.
+
+    Каждая запись TSV завершается переводом строки, поэтому пустые строки
+    внутри ответа - это записи (например, строка с единственной
+    несвязанной переменной); пропускается только пустой остаток после
+    последнего перевода строки. В отличие от Response.iter_lines(), "\\r\\n"
+    на границе блоков не даёт лишней пустой строки.
+    """
+    pending = b""
+    for chunk in rc.iter_content(chunk_size):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line[:-1] if line.endswith(b"\r") else line
+    if pending.rstrip(b"\r"):
+        yield pending.rstrip(b"\r")
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов запросов с ограничением по размеру и времени жизни.
+
+    Attributes:
+        maxsize (int): Максимальное число записей; старейшие вытесняются.
+        ttl (float): Время жизни записи в секундах (None - без ограничения).
+        hits, misses (int): Счётчики попаданий и промахов.
+    """
+
+    def __init__(self, maxsize=128, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                stamp, value = item
+                if self.ttl is None or time.monotonic() - stamp < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SPARQLClient:
+    """
+    HTTP-клиент SPARQL с постоянной сессией и кэшем результатов.
+
+    Одна сессия requests держит пул keep-alive соединений, поэтому серия
+    запросов к одной точке доступа не открывает TCP/TLS соединение заново.
+    Результаты SELECT-запросов (JSON) кэшируются по ключу
+    (точка доступа, текст запроса, параметры) только по запросу вызывающего
+    (select(cache=True), Query(cache=True)): данные точки доступа могут
+    измениться, и повторное чтение по умолчанию идёт на сервер.
+
+    Args:
+        pool_size (int): Размер пула соединений на хост; больше одновременных
+            запросов к хосту приводят к лишним соединениям.
+        cache_size (int): Размер кэша результатов (0 - кэш отключён).
+        ttl (float): Время жизни записи кэша в секундах.
+        timeout (float): Таймаут HTTP-запроса в секундах.
+    """
+
+    def __init__(self, pool_size=10, cache_size=128, ttl=300.0, timeout=300.0):
+        self.session = rq.Session()
+        # Прокси отключены так же, как и для SPARQLWrapper (см. выше)
+        self.session.trust_env = False
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+        self.cache = ResultCache(cache_size, ttl) if cache_size else None
+        self.timeout = timeout
+
+    def post(self, endpoint, query, accept="application/sparql-results+json",
+             stream=False):
+        """Отправляет запрос методом POST и возвращает ответ requests."""
+        rc = self.session.post(endpoint,
+                               data={"query": query},
+                               headers={"Accept": accept},
+                               timeout=self.timeout,
+                               stream=stream)
+        rc.raise_for_status()
+        return rc
+
+    def select(self, endpoint, query, args=None, cache=False):
+        """
+        Выполняет SELECT-запрос и возвращает разобранный SPARQL JSON.
+
+        Args:
+            endpoint (str): Точка доступа SPARQL.
+            query (str): Готовый текст запроса.
+            args (dict): Параметры, из которых получен запрос (часть ключа кэша).
+            cache (bool): Использовать кэш результатов (не старше ttl).
+        """
+        key = None
+        if cache and self.cache is not None:
+            key = (endpoint, query, tuple(sorted((args or {}).items(),
+                                                 key=lambda kv: kv[0])))
+            try:
+                hash(key)
+            except TypeError:
+                key = None  # Нехэшируемые параметры - без кэша
+            else:
+                rc = self.cache.get(key)
+                if rc is not None:
+                    return rc
+        rc = self.post(endpoint, query)
+        if MAXROWS_HEADER in rc.headers:
+            raise TruncatedResult(
+                "Результат урезан точкой доступа до {} строк; "
+                "используйте постраничную выборку (page_size)".format(
+                    rc.headers[MAXROWS_HEADER]))
+        rc = rc.json()
+        if key is not None:
+            self.cache.put(key, rc)
+        return rc
+
+    def update(self, endpoint, update):
+        """Выполняет запрос SPARQL UPDATE."""
+        rc = self.session.post(endpoint,
+                               data={"update": update},
+                               timeout=self.timeout)
+        rc.raise_for_status()
+        return rc
+
+    def select_rows(self, endpoint, query):
+        """
+        Выполняет SELECT-запрос с потоковым разбором ответа в формате TSV.
+
+        Строки разбираются по мере поступления данных, весь ответ в памяти
+        не хранится. Результаты не кэшируются.
+
+        Returns:
+            tuple: (список имён переменных, итератор списков значений)
+        """
+        rc = self.post(endpoint, query, accept="text/tab-separated-values",
+                       stream=True)
+        if MAXROWS_HEADER in rc.headers:
+            rc.close()
+            raise TruncatedResult(
+                "Результат урезан точкой доступа до {} строк; "
+                "используйте постраничную выборку (page_size)".format(
+                    rc.headers[MAXROWS_HEADER]))
+        lines = tsv_lines(rc)
+        try:
+            first = next(lines)
+        except StopIteration:
+            rc.close()
+            return [], iter(())
+        header = [h.strip().lstrip("?$") for h in first.decode("utf8").split("\t")]
+
+        def rows():
+            try:
+                for line in lines:
+                    if not line:
+                        # Единственная переменная строки не связана
+                        yield [None] * len(header)
+                        continue
+                    yield [tsv_term(v) for v in line.decode("utf8").split("\t")]
+            finally:
+                rc.close()
+
+        return header, rows()
+
+    def close(self):
+        self.session.close()
+
+
+CLIENT = SPARQLClient()
+
+
 class Query:
+    """
+    Параметризованный SELECT-запрос к точке доступа SPARQL.
+
+    При заданном page_size результат выбирается страницами
+    (ORDER BY/LIMIT/OFFSET), до workers страниц загружаются параллельно
+    и выдаются строго по порядку. Порядок задаётся order_by (по умолчанию -
+    переменные проекции запроса). Текст запроса не должен содержать
+    собственных ORDER BY/LIMIT/OFFSET.
+
+    Страницы загружаются в собственном пуле из workers потоков или в общем
+    executor, если он задан: так несколько одновременных запросов делят
+    ограниченное число соединений клиента.
+
+    При cache=True ответы JSON берутся из кэша клиента (не старше его
+    ttl); по умолчанию каждый запрос выполняется на сервере.
+    """
 
     _prefixes_ = PREFIXES
     _endpoint_ = ENDPOINT
+    _client_ = CLIENT
+    _stream_ = False
 
-    def __init__(self, query, graphIRI, endpoint=None, **args):
+    def __init__(self, query, graphIRI, endpoint=None, client=None,
+                 cache=False, stream=None, page_size=None, workers=4,
+                 order_by=None, executor=None, **args):
         self.query = query
         self.graphIRI = graphIRI
         self.args = args
         if endpoint is None:
             endpoint = self._endpoint_
         self.endpoint = endpoint
+        if client is None:
+            client = self._client_
+        self.client = client
+        self.cache = cache
+        if stream is None:
+            stream = self._stream_
+        self.stream = stream
+        self.page_size = page_size
+        self.workers = workers
+        self.order_by = order_by
+        self.executor = executor
         self.header = []
+        self._text = None
 
-    def results(self, debug=None):
-        # import pudb; pu.db
+    def text(self):
+        """Возвращает текст запроса с подставленными параметрами (один раз)."""
+        if self._text is None:
+            q = self._prefixes_ + "\n\n" + self.query
+            self._text = q.format(graph=self.graphIRI, **self.args)
+        return self._text
 
+    def _select(self, debug=None):
         if debug is None:
             debug = self.args.get("debug", False)
 
-        q = self._prefixes_ + "\n\n" + self.query
         if debug:
-            print(q)
+            print(self._prefixes_ + "\n\n" + self.query)
             print("Params are:", self.graphIRI, self.args)
-        q = q.format(graph=self.graphIRI, **self.args)
+        q = self.text()
         if debug:
             print(q)
-        sparql = SPARQLWrapper(self.endpoint)
-        sparql.setQuery(q)
-        sparql.setMethod(POST)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query()
-        rc = results.convert()
+        rc = self.client.select(self.endpoint, q,
+                                dict(self.args, graph=self.graphIRI),
+                                cache=self.cache)
         self.header = rc["head"]["vars"]
-        return conv(rc)
+        return rc
+
+    def _page(self, number):
+        """Страница результата: все её строки, разобранные из потока TSV."""
+        order = self.order_by
+        if order is None:
+            order = select_variables(self.query)
+            if not order:
+                raise ValueError(
+                    "Для постраничной выборки запроса SELECT * нужен order_by")
+        if not isinstance(order, str):
+            order = " ".join("?" + v for v in order)
+        q = "{}\nORDER BY {}\nLIMIT {} OFFSET {}".format(
+            self.text(), order, self.page_size, number * self.page_size)
+        header, rows = self.client.select_rows(self.endpoint, q)
+        return header, list(rows)
+
+    def pages(self, debug=None):
+        """
+        Выбирает результат страницами и выдаёт списки строк страниц по порядку.
+
+        Каждая страница разбирается потоково из TSV и не кэшируется; в
+        памяти одновременно не больше workers страниц. Страница проверяется
+        до выдачи: выборка заканчивается на первой неполной странице, а если
+        после неё точка доступа вернула непустую (или страница больше
+        LIMIT), результат считается урезанным (TruncatedResult) и строки
+        этой страницы не выдаются.
+        """
+        if debug is None:
+            debug = self.args.get("debug", False)
+        if debug:
+            print(self.text())
+        if self.executor is not None:
+            yield from self._pages(self.executor)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            yield from self._pages(ex)
+
+    def _pages(self, ex):
+        number = 0
+        while True:
+            window = [ex.submit(self._page, number + i)
+                      for i in range(self.workers)]
+            for i, f in enumerate(window):
+                header, rows = f.result()
+                size = len(rows)
+                if size > self.page_size:
+                    raise TruncatedResult(
+                        "Страница {} содержит {} строк при LIMIT {}".format(
+                            number + i, size, self.page_size))
+                if size < self.page_size:
+                    for later in window[i + 1:]:
+                        if later.result()[1]:
+                            raise TruncatedResult(
+                                "Неполная страница {} ({} из {} строк) "
+                                "перед непустой; уменьшите page_size".format(
+                                    number + i, size, self.page_size))
+                self.header = header
+                yield rows
+                if size < self.page_size:
+                    return
+            number += self.workers
+
+    def rows(self, debug=None):
+        """
+        Выполняет запрос и возвращает итератор списков значений.
+
+        Значения идут в порядке self.header. В постраничном режиме
+        (page_size) страницы выбираются параллельно и разбираются из TSV,
+        в потоковом (stream) ответ разбирается построчно из TSV, иначе - из
+        JSON (кэшируемого при cache=True).
+        """
+        if self.page_size:
+            return (r for rows in self.pages(debug) for r in rows)
+        if self.stream:
+            if debug or self.args.get("debug", False):
+                print(self.text())
+            self.header, rows = self.client.select_rows(self.endpoint,
+                                                        self.text())
+            return rows
+        rc = self._select(debug)
+        header = self.header
+        return ([b[v]["value"] if v in b else None for v in header]
+                for b in rc["results"]["bindings"])
+
+    def results(self, debug=None):
+        if self.page_size or self.stream:
+            rows = self.rows(debug=debug)
+            return (dict(zip(self.header, r)) for r in rows)
+        return conv(self._select(debug))
 
     def print(self):
         import pprint
@@ -98,11 +479,21 @@ class Query:
 
 
 class NTQuery(Query):
+    """
+    Запрос, возвращающий строки в виде namedtuple.
+
+    По умолчанию ответ разбирается потоково (TSV), поэтому большие
+    выборки не держатся в памяти целиком.
+    """
+
+    _stream_ = True
+
     def results(self, debug=False):
-        gen = super().results(debug=debug)
-        np = namedtuple('Row', self.header)
-        for a in gen:
-            yield np(**a)
+        make = None
+        for r in self.rows(debug=debug):
+            if make is None:  # Заголовок известен после первой страницы
+                make = namedtuple('Row', self.header)._make
+            yield make(r)
 
 
 def quicktest(query, graph, **args):
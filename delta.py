@@ -0,0 +1,189 @@
+"""
+Публикация изменений RDF-графа (дельты) относительно последней публикации.
+
+После каждой успешной публикации сохраняется снимок графа - отсортированный
+файл N-Triples со сколемизированными пустыми узлами (uploader.bnode_labels()).
+При следующей публикации новый граф разбирается потоком и записывается
+в такой же снимок внешней сортировкой, два снимка сравниваются слиянием
+(построчно, без загрузки в память), и в хранилище отправляются только различия запросами
+SPARQL UPDATE ``DELETE DATA``/``INSERT DATA`` пакетами.
+
+Если снимка ещё нет, граф в хранилище очищается (CLEAR SILENT GRAPH) и
+загружается целиком. При сбое снимок не обновляется; повторный запуск
+отправит ту же дельту (DELETE DATA и INSERT DATA идемпотентны).
+
+Пример использования:
+    publish_delta("alrosa.ttl", "http://crust.irk.ru/ontology/pollution/1.0/samples",
+                  "http://localhost:8890/sparql")
+
+Из командной строки:
+    python delta.py --update URL --graph IRI FILE [--snapshot FILE] [--dry-run]
+"""
+
+import os
+import os.path
+import time
+
+from common import SPARQLClient
+from uploader import SKOLEM_BASE, external_sort, ntriples_iter, ntriples_stream
+
+BATCH_TRIPLES = 10000
+
+
+def snapshot_path(filename):
+    """Имя файла снимка по умолчанию для опубликованного файла."""
+    return os.path.splitext(filename)[0] + ".published.nt"
+
+
+def make_snapshot(source, filename, skolem_base=SKOLEM_BASE, format=None):
+    """
+    Записывает снимок графа: отсортированный N-Triples без повторов.
+
+    Файл разбирается потоком (uploader.ntriples_stream()), без построения
+    графа: в памяти остаются только триплеты с пустыми узлами и фрагмент
+    внешней сортировки.
+
+    Args:
+        source: Имя RDF-файла или граф rdflib.
+    """
+    from rdflib import Graph
+
+    if isinstance(source, Graph):
+        lines = ntriples_iter(source, skolem_base)
+    else:
+        lines = ntriples_stream(source, skolem_base, format)
+    return external_sort(lines, filename)
+
+
+def diff_sorted(old, new):
+    """
+    Сравнивает два отсортированных файла слиянием.
+
+    Yields:
+        tuple: ('-', строка) для удалённых и ('+', строка) для добавленных.
+    """
+    with open(old, encoding="utf8") as a, open(new, encoding="utf8") as b:
+        x = a.readline()
+        y = b.readline()
+        while x or y:
+            if not y or (x and x < y):
+                yield "-", x
+                x = a.readline()
+            elif not x or y < x:
+                yield "+", y
+                y = b.readline()
+            else:
+                x = a.readline()
+                y = b.readline()
+
+
+def update_batches(diff, graph, batch_size=BATCH_TRIPLES):
+    """
+    Группирует дельту в запросы SPARQL UPDATE.
+
+    Снимки отсортированы и без повторов, поэтому каждая строка дельты
+    либо удалена, либо добавлена, и порядок запросов не важен; удаления и
+    добавления копятся в отдельных пакетах по batch_size триплетов.
+
+    Yields:
+        tuple: (операция '-'/'+', число триплетов, текст запроса).
+    """
+    ops = {"-": "DELETE DATA", "+": "INSERT DATA"}
+    bufs = {"-": [], "+": []}
+
+    def make(op):
+        buf = bufs[op]
+        q = "{} {{ GRAPH <{}> {{\n{}}} }}".format(ops[op], graph, "".join(buf))
+        n = len(buf)
+        buf.clear()
+        return op, n, q
+
+    for op, line in diff:
+        bufs[op].append(line)
+        if len(bufs[op]) >= batch_size:
+            yield make(op)
+    for op in ("-", "+"):
+        if bufs[op]:
+            yield make(op)
+
+
+def publish_delta(source, graph, update_url, snapshot=None,
+                  batch_size=BATCH_TRIPLES, client=None, dry_run=False):
+    """
+    Публикует изменения графа относительно последнего снимка.
+
+    Args:
+        source (str): RDF-файл с новой версией графа.
+        graph (str): IRI именованного графа в хранилище.
+        update_url (str): Точка доступа SPARQL UPDATE.
+        snapshot (str): Файл снимка (по умолчанию <source>.published.nt).
+        dry_run (bool): Только подсчитать дельту, ничего не отправляя.
+
+    Returns:
+        dict: Отчёт - число добавленных и удалённых триплетов, запросов, время.
+    """
+    start = time.perf_counter()
+    if snapshot is None:
+        snapshot = snapshot_path(source)
+    if client is None:
+        client = SPARQLClient(cache_size=0)
+    new = snapshot + ".new"
+    total = make_snapshot(source, new)
+
+    first = not os.path.exists(snapshot)
+    old = snapshot
+    if first:
+        old = new + ".empty"
+        open(old, "w").close()
+
+    report = {"graph": graph, "triples": total, "added": 0, "removed": 0,
+              "requests": 0, "full": first}
+    try:
+        if first and not dry_run:
+            client.update(update_url, "CLEAR SILENT GRAPH <{}>".format(graph))
+            report["requests"] += 1
+        for op, n, q in update_batches(diff_sorted(old, new), graph,
+                                       batch_size):
+            report["added" if op == "+" else "removed"] += n
+            if not dry_run:
+                client.update(update_url, q)
+                report["requests"] += 1
+    finally:
+        if first:
+            os.remove(old)
+    if dry_run:
+        os.remove(new)
+    else:
+        os.replace(new, snapshot)
+    report["time"] = time.perf_counter() - start
+    print("{}: {graph} +{added} -{removed} triples ({triples} total), "
+          "{requests} requests in {time:.1f}s".format(
+              "DRY RUN" if dry_run else "PUBLISHED", **report))
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from requests.auth import HTTPBasicAuth
+
+    parser = argparse.ArgumentParser(
+        description="Публикация изменений RDF-графа запросами SPARQL UPDATE")
+    parser.add_argument("file", help="RDF-файл с новой версией графа")
+    parser.add_argument("--update", required=True,
+                        help="Точка доступа SPARQL UPDATE")
+    parser.add_argument("--graph", required=True, help="IRI графа")
+    parser.add_argument("--snapshot", help="Файл снимка последней публикации")
+    parser.add_argument("--batch", type=int, default=BATCH_TRIPLES,
+                        help="Триплетов в одном запросе")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Только подсчитать изменения")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    client = SPARQLClient(cache_size=0)
+    if args.user:
+        client.session.auth = HTTPBasicAuth(args.user, args.password)
+    publish_delta(args.file, args.graph, args.update, args.snapshot,
+                  args.batch, client, args.dry_run)
@@ -0,0 +1,157 @@
+"""
+Таблица элементов и оксидов.
+
+Файл сгенерирован командой `python elements.py <PeriodicTable.owl>`,
+не редактируйте его вручную.
+"""
+
+VERSION = 1
+SOURCE = 'IUPAC 2001 standard atomic weights (initial table)'
+
+# символ -> (атомный номер, атомная масса)
+ELEMENTS = {'H': (1, 1.00794),
+ 'He': (2, 4.002602),
+ 'Li': (3, 6.941),
+ 'Be': (4, 9.012182),
+ 'B': (5, 10.811),
+ 'C': (6, 12.0107),
+ 'N': (7, 14.0067),
+ 'O': (8, 15.9994),
+ 'F': (9, 18.9984032),
+ 'Ne': (10, 20.1797),
+ 'Na': (11, 22.98977),
+ 'Mg': (12, 24.305),
+ 'Al': (13, 26.981538),
+ 'Si': (14, 28.0855),
+ 'P': (15, 30.973761),
+ 'S': (16, 32.065),
+ 'Cl': (17, 35.453),
+ 'Ar': (18, 39.948),
+ 'K': (19, 39.0983),
+ 'Ca': (20, 40.078),
+ 'Sc': (21, 44.95591),
+ 'Ti': (22, 47.867),
+ 'V': (23, 50.9415),
+ 'Cr': (24, 51.9961),
+ 'Mn': (25, 54.938049),
+ 'Fe': (26, 55.845),
+ 'Co': (27, 58.9332),
+ 'Ni': (28, 58.6934),
+ 'Cu': (29, 63.546),
+ 'Zn': (30, 65.409),
+ 'Ga': (31, 69.723),
+ 'Ge': (32, 72.64),
+ 'As': (33, 74.9216),
+ 'Se': (34, 78.96),
+ 'Br': (35, 79.904),
+ 'Kr': (36, 83.798),
+ 'Rb': (37, 85.4678),
+ 'Sr': (38, 87.62),
+ 'Y': (39, 88.90585),
+ 'Zr': (40, 91.224),
+ 'Nb': (41, 92.90638),
+ 'Mo': (42, 95.94),
+ 'Tc': (43, 98.0),
+ 'Ru': (44, 101.07),
+ 'Rh': (45, 102.9055),
+ 'Pd': (46, 106.42),
+ 'Ag': (47, 107.8682),
+ 'Cd': (48, 112.411),
+ 'In': (49, 114.818),
+ 'Sn': (50, 118.71),
+ 'Sb': (51, 121.76),
+ 'Te': (52, 127.6),
+ 'I': (53, 126.90447),
+ 'Xe': (54, 131.293),
+ 'Cs': (55, 132.90545),
+ 'Ba': (56, 137.327),
+ 'La': (57, 138.9055),
+ 'Ce': (58, 140.116),
+ 'Pr': (59, 140.90765),
+ 'Nd': (60, 144.24),
+ 'Pm': (61, 145.0),
+ 'Sm': (62, 150.36),
+ 'Eu': (63, 151.964),
+ 'Gd': (64, 157.25),
+ 'Tb': (65, 158.92534),
+ 'Dy': (66, 162.5),
+ 'Ho': (67, 164.93032),
+ 'Er': (68, 167.259),
+ 'Tm': (69, 168.93421),
+ 'Yb': (70, 173.04),
+ 'Lu': (71, 174.967),
+ 'Hf': (72, 178.49),
+ 'Ta': (73, 180.9479),
+ 'W': (74, 183.84),
+ 'Re': (75, 186.207),
+ 'Os': (76, 190.23),
+ 'Ir': (77, 192.217),
+ 'Pt': (78, 195.078),
+ 'Au': (79, 196.96655),
+ 'Hg': (80, 200.59),
+ 'Tl': (81, 204.3833),
+ 'Pb': (82, 207.2),
+ 'Bi': (83, 208.98038),
+ 'Po': (84, 209.0),
+ 'At': (85, 210.0),
+ 'Rn': (86, 222.0),
+ 'Fr': (87, 223.0),
+ 'Ra': (88, 226.0),
+ 'Ac': (89, 227.0),
+ 'Th': (90, 232.0381),
+ 'Pa': (91, 231.03588),
+ 'U': (92, 238.02891),
+ 'Np': (93, 237.0),
+ 'Pu': (94, 244.0),
+ 'Am': (95, 243.0),
+ 'Cm': (96, 247.0),
+ 'Bk': (97, 247.0),
+ 'Cf': (98, 251.0),
+ 'Es': (99, 252.0),
+ 'Fm': (100, 257.0),
+ 'Md': (101, 258.0),
+ 'No': (102, 259.0),
+ 'Lr': (103, 262.0)}
+
+# формула -> (элемент, атомов элемента, атомов O, мас. доля элемента)
+OXIDES = {'SiO2': ('Si', 1, 2, 0.467435),
+ 'TiO2': ('Ti', 1, 2, 0.599343),
+ 'Al2O3': ('Al', 2, 3, 0.529251),
+ 'Fe2O3': ('Fe', 2, 3, 0.699426),
+ 'FeO': ('Fe', 1, 1, 0.777305),
+ 'MnO': ('Mn', 1, 1, 0.774458),
+ 'MgO': ('Mg', 1, 1, 0.603036),
+ 'CaO': ('Ca', 1, 1, 0.714691),
+ 'Na2O': ('Na', 2, 1, 0.741857),
+ 'K2O': ('K', 2, 1, 0.830148),
+ 'P2O5': ('P', 2, 5, 0.436421),
+ 'Cr2O3': ('Cr', 2, 3, 0.684202),
+ 'NiO': ('Ni', 1, 1, 0.785797),
+ 'CoO': ('Co', 1, 1, 0.786483),
+ 'V2O3': ('V', 2, 3, 0.679758),
+ 'ZnO': ('Zn', 1, 1, 0.803467),
+ 'BaO': ('Ba', 1, 1, 0.895651),
+ 'SrO': ('Sr', 1, 1, 0.845595),
+ 'Ce2O3': ('Ce', 2, 3, 0.853767),
+ 'La2O3': ('La', 2, 3, 0.85268),
+ 'Nd2O3': ('Nd', 2, 3, 0.857351),
+ 'Nb2O5': ('Nb', 2, 5, 0.699044),
+ 'Ta2O5': ('Ta', 2, 5, 0.818967),
+ 'ThO2': ('Th', 1, 2, 0.878809),
+ 'SO3': ('S', 1, 3, 0.400496),
+ 'CO2': ('C', 1, 2, 0.272912),
+ 'H2O': ('H', 2, 1, 0.111898),
+ 'UO2': ('U', 1, 2, 0.881498),
+ 'ZrO2': ('Zr', 1, 2, 0.740318),
+ 'HfO2': ('Hf', 1, 2, 0.847979),
+ 'Y2O3': ('Y', 2, 3, 0.78744),
+ 'Sc2O3': ('Sc', 2, 3, 0.65196),
+ 'Rb2O': ('Rb', 2, 1, 0.914412),
+ 'Cs2O': ('Cs', 2, 1, 0.943226),
+ 'Li2O': ('Li', 2, 1, 0.46457),
+ 'BeO': ('Be', 1, 1, 0.36032),
+ 'B2O3': ('B', 2, 3, 0.310571),
+ 'CuO': ('Cu', 1, 1, 0.798865),
+ 'PbO': ('Pb', 1, 1, 0.928318),
+ 'SnO2': ('Sn', 1, 2, 0.787678),
+ 'Ga2O3': ('Ga', 2, 3, 0.743933)}
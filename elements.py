@@ -0,0 +1,193 @@
+"""
+Статическая таблица химических элементов и оксидов.
+
+Таблица ``element_table.py`` генерируется из онтологии
+``PeriodicTable.owl`` и хранится в репозитории, поэтому во время импорта
+не нужно разбирать OWL-файл: символ элемента, его IRI, атомная масса и
+коэффициенты пересчёта оксидов в элементы доступны сразу.
+
+Перегенерация таблицы из OWL:
+
+    python elements.py ../data/kg/PeriodicTable.owl
+
+Основные функции:
+- element_iri(): IRI элемента по символу
+- atomic_mass(): Атомная масса элемента
+- oxide_composition(): Разбор формулы оксида (элемент, число атомов)
+- oxide_factor(): Коэффициент пересчёта оксида в элемент (мас. доля)
+"""
+
+import argparse
+import hashlib
+import os.path
+import re
+from pprint import pformat
+
+from namespace import MT
+from element_table import ELEMENTS, OXIDES, SOURCE, VERSION
+from logs import get_logger
+
+log = get_logger("elements")
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "element_table.py")
+
+# Версия формата таблицы; увеличивается при изменении структуры
+TABLE_VERSION = 1
+
+
+def check_table(version=VERSION):
+    """
+    Проверяет, что element_table.py сгенерирована текущей версией генератора.
+
+    Устаревшая таблица не мешает перегенерации, поэтому выводится только
+    предупреждение.
+
+    Returns:
+        bool: True, если версия формата таблицы совпадает с TABLE_VERSION.
+    """
+    if version == TABLE_VERSION:
+        return True
+    log.warning("element_table.py has format version %s, expected %s; "
+                "regenerate it: python elements.py PeriodicTable.owl",
+                version, TABLE_VERSION)
+    return False
+
+
+check_table()
+
+# Оксиды, для которых рассчитываются коэффициенты пересчёта.
+# Список покрывает колонки моделей Oxides, Petrochemy, Phlogopite и EPMAAnalysis.
+OXIDE_FORMULAS = [
+    "SiO2", "TiO2", "Al2O3", "Fe2O3", "FeO", "MnO", "MgO", "CaO", "Na2O",
+    "K2O", "P2O5", "Cr2O3", "NiO", "CoO", "V2O3", "ZnO", "BaO", "SrO",
+    "Ce2O3", "La2O3", "Nd2O3", "Nb2O5", "Ta2O5", "ThO2", "SO3", "CO2",
+    "H2O", "UO2", "ZrO2", "HfO2", "Y2O3", "Sc2O3", "Rb2O", "Cs2O", "Li2O",
+    "BeO", "B2O3", "CuO", "PbO", "SnO2", "Ga2O3",
+]
+
+OXIDERE = re.compile(r"^([A-Z][a-z]?)(\d*)O(\d*)$")
+
+
+def element_iri(symbol):
+    """Возвращает IRI элемента по символу или None, если элемент неизвестен."""
+    if symbol in ELEMENTS:
+        return MT[symbol]
+    return None
+
+
+def atomic_mass(symbol):
+    """Возвращает атомную массу элемента или None, если элемент неизвестен."""
+    entry = ELEMENTS.get(symbol)
+    if entry is None:
+        return None
+    return entry[1]
+
+
+def oxide_composition(formula, elements=ELEMENTS):
+    """
+    Разбирает формулу простого оксида.
+
+    Args:
+        formula (str): Формула, например 'Al2O3'.
+
+    Returns:
+        tuple: (символ элемента, атомов элемента, атомов кислорода)
+               или None, если формула не является простым оксидом.
+    """
+    m = OXIDERE.match(formula)
+    if m is None:
+        return None
+    symbol, n_el, n_ox = m.groups()
+    if symbol not in elements or symbol == "O":
+        return None
+    return symbol, int(n_el or 1), int(n_ox or 1)
+
+
+def compute_oxide_factor(formula, elements=ELEMENTS):
+    """Рассчитывает массовую долю элемента в оксиде по атомным массам."""
+    comp = oxide_composition(formula, elements)
+    if comp is None:
+        return None
+    symbol, n_el, n_ox = comp
+    m_el = n_el * elements[symbol][1]
+    return m_el / (m_el + n_ox * elements["O"][1])
+
+
+def oxide_factor(formula):
+    """
+    Возвращает коэффициент пересчёта оксида в элемент (мас.% оксида * k = мас.% элемента).
+
+    Для оксидов из таблицы значение берётся из OXIDES, для остальных
+    простых оксидов рассчитывается по атомным массам.
+    """
+    entry = OXIDES.get(formula)
+    if entry is not None:
+        return entry[3]
+    return compute_oxide_factor(formula)
+
+
+def read_owl_elements(owl_path):
+    """
+    Читает элементы из онтологии периодической таблицы.
+
+    Returns:
+        dict: символ -> (атомный номер, атомная масса)
+    """
+    from rdflib import Graph, RDF
+
+    g = Graph()
+    g.parse(location=owl_path)
+    elements = {}
+    for el in g.subjects(RDF.type, MT.Element):
+        number = g.value(el, MT.atomicNumber)
+        weight = g.value(el, MT.atomicWeight)
+        if number is None or weight is None:
+            print("#! WARNING element {} has no number/weight".format(el))
+            continue
+        elements[el.fragment] = (int(number), float(weight))
+    return elements
+
+
+def write_table(elements, source, filename=TABLE_FILE):
+    """Записывает модуль таблицы элементов и оксидов."""
+    elements = dict(sorted(elements.items(), key=lambda kv: kv[1][0]))
+    oxides = {}
+    for formula in OXIDE_FORMULAS:
+        symbol, n_el, n_ox = oxide_composition(formula, elements)
+        factor = compute_oxide_factor(formula, elements)
+        oxides[formula] = (symbol, n_el, n_ox, round(factor, 6))
+
+    with open(filename, "w") as o:
+        o.write('"""\n'
+                "Таблица элементов и оксидов.\n\n"
+                "Файл сгенерирован командой `python elements.py <PeriodicTable.owl>`,\n"
+                "не редактируйте его вручную.\n"
+                '"""\n\n')
+        o.write("VERSION = {}\n".format(TABLE_VERSION))
+        o.write("SOURCE = {!r}\n\n".format(source))
+        o.write("# символ -> (атомный номер, атомная масса)\n")
+        o.write("ELEMENTS = {}\n\n".format(pformat(elements, sort_dicts=False)))
+        o.write("# формула -> (элемент, атомов элемента, атомов O, мас. доля элемента)\n")
+        o.write("OXIDES = {}\n".format(pformat(oxides, sort_dicts=False)))
+    print("WROTE: {} ({} elements, {} oxides)".format(filename, len(elements),
+                                                      len(oxides)))
+
+
+def generate(owl_path, filename=TABLE_FILE):
+    """Перегенерирует таблицу элементов из OWL-файла."""
+    with open(owl_path, "rb") as inp:
+        digest = hashlib.sha256(inp.read()).hexdigest()
+    elements = read_owl_elements(owl_path)
+    write_table(elements, "{} sha256:{}".format(os.path.basename(owl_path),
+                                                digest), filename)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Генерация таблицы элементов из PeriodicTable.owl")
+    parser.add_argument("owl", help="Путь к PeriodicTable.owl")
+    parser.add_argument("-o", "--output", default=TABLE_FILE,
+                        help="Файл таблицы (по умолчанию element_table.py)")
+    args = parser.parse_args()
+    generate(args.owl, args.output)
@@ -0,0 +1,249 @@
+"""
+Загрузка графов в хранилище по протоколу SPARQL 1.1 Graph Store HTTP.
+
+Сгенерированный A-Box (``a-box.ttl`` импортёра Alrosa, ``alrosa.ttl``
+импортёра i_pol) передаётся в именованные графы пакетами N-Triples:
+первый пакет - запросом PUT (замена графа) или POST (дополнение),
+остальные - запросами POST. Несколько графов загружаются параллельно,
+поэтому A-Box импортёра Alrosa загружается по графу на трубку
+(alrosa_importer.publish_shards(), фрагменты из --stream).
+После загрузки число триплетов в графе проверяется запросом COUNT.
+
+Пустые узлы сколемизируются (uploader.bnode_labels()), поэтому ссылки
+на них не теряются между пакетами.
+
+Адреса точек доступа:
+- Fuseki:    data_url=http://host:3030/ds/data, query_url=http://host:3030/ds/sparql
+- Oxigraph:  data_url=http://host:7878/store,   query_url=http://host:7878/query
+- Virtuoso:  data_url=http://host:8890/sparql-graph-crud-auth,
+             query_url=http://host:8890/sparql
+
+Пример использования:
+    store = GraphStore("http://localhost:3030/ds/data",
+                       "http://localhost:3030/ds/sparql")
+    store.load_all({"http://crust.irk.ru/ontology/pollution/1.0/samples":
+                    "alrosa.ttl"})
+
+Из командной строки:
+    python graph_store.py --data URL --query URL GRAPH=FILE [GRAPH=FILE ...]
+"""
+
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests as rq
+
+from common import SPARQLClient
+from uploader import (SKOLEM_BASE, Uploader, UploadError, external_sort,
+                      ntriples_lines, ntriples_stream)
+
+BATCH_TRIPLES = 50000
+NTRIPLES = "application/n-triples"
+
+QUERY_COUNT = """
+    SELECT (COUNT(*) AS ?n)
+    WHERE {{ GRAPH <{graph}> {{ ?s ?p ?o }} }}
+    """
+
+
+class LoadError(Exception):
+    """Число триплетов в графе после загрузки не совпало с ожидаемым."""
+
+
+def whole_body(data):
+    """
+    Тело запроса из байтов целиком.
+
+    Пакет уже находится в памяти, поэтому передаётся с Content-Length, а
+    не блоками (chunked) - это поддерживают все хранилища.
+    """
+    def body(counter):
+        counter[0] += len(data)
+        return data
+    return body
+
+
+def source_lines(source, skolem_base=SKOLEM_BASE):
+    """
+    Выдаёт отсортированные строки N-Triples источника без повторов.
+
+    Файл разбирается потоком (uploader.ntriples_stream()) и сортируется
+    на диске (uploader.external_sort()), поэтому весь A-Box в памяти не
+    хранится.
+
+    Args:
+        source: Имя RDF-файла (разбирается потоком, без графа) или
+            граф rdflib.
+    """
+    from rdflib import Graph
+
+    if isinstance(source, Graph):
+        yield from ntriples_lines(source, skolem_base)
+        return
+    fd, sorted_name = tempfile.mkstemp(suffix=".nt")
+    os.close(fd)
+    try:
+        external_sort(ntriples_stream(source, skolem_base), sorted_name)
+        with open(sorted_name, encoding="utf8") as lines:
+            yield from lines
+    finally:
+        os.remove(sorted_name)
+
+
+class GraphStore:
+    """
+    Клиент Graph Store Protocol.
+
+    Args:
+        data_url (str): Точка доступа Graph Store (параметр ?graph=).
+        query_url (str): Точка доступа SPARQL для проверки (None - без проверки).
+        auth: Авторизация requests.
+        workers (int): Число графов, загружаемых параллельно.
+        batch_size (int): Число триплетов в одном запросе.
+    """
+
+    def __init__(self, data_url, query_url=None, auth=None, workers=4,
+                 batch_size=BATCH_TRIPLES):
+        self.data_url = data_url
+        self.query_url = query_url
+        self.workers = workers
+        self.batch_size = batch_size
+        self.uploader = Uploader(auth=auth, workers=workers)
+        self.client = SPARQLClient(pool_size=workers, cache_size=0)
+        if auth is not None:
+            self.client.session.auth = auth
+
+    def count(self, graph):
+        """
+        Возвращает число триплетов в именованном графе.
+
+        Raises:
+            LoadError: Ответ на запрос COUNT не содержит числа.
+        """
+        rc = self.client.select(self.query_url,
+                                QUERY_COUNT.format(graph=graph),
+                                cache=False)
+        try:
+            return int(rc["results"]["bindings"][0]["n"]["value"])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise LoadError("{}: unexpected COUNT reply: {!r}".format(
+                graph, rc)) from e
+
+    def load(self, graph, source, replace=True, verify=True):
+        """
+        Загружает источник в именованный граф.
+
+        Args:
+            graph (str): IRI графа.
+            source: Имя RDF-файла или граф rdflib.
+            replace (bool): Заменить содержимое графа (иначе дополнить).
+            verify (bool): Проверить число триплетов запросом COUNT.
+
+        Returns:
+            dict: Отчёт - граф, число триплетов, пакетов, байт и время (с).
+        """
+        start = time.perf_counter()
+        before = 0
+        if verify and not replace and self.query_url:
+            before = self.count(graph)
+        lines = source_lines(source)
+        triples = 0
+        sent = 0
+        batches = 0
+        while True:
+            batch = list(itertools.islice(lines, self.batch_size))
+            # Первый пакет отправляется и пустым: PUT очищает граф
+            if not batch and batches:
+                break
+            triples += len(batch)
+            data = "".join(batch).encode("utf8")
+            method = "PUT" if replace and not batches else "POST"
+            sent += self.uploader.send(method, self.data_url,
+                                       whole_body(data), NTRIPLES,
+                                       params={"graph": str(graph)})
+            batches += 1
+            if len(batch) < self.batch_size:
+                break
+        report = {
+            "graph": str(graph),
+            "triples": triples,
+            "batches": batches,
+            "bytes": sent,
+            "time": time.perf_counter() - start,
+        }
+        if verify and self.query_url:
+            n = self.count(graph)
+            report["count"] = n
+            # При дополнении часть триплетов могла уже быть в графе
+            if (n != triples) if replace else not (
+                    max(before, triples) <= n <= before + triples):
+                raise LoadError("{}: {} triples in store, {} loaded".format(
+                    graph, n, triples))
+        return report
+
+    def load_all(self, graphs, replace=True, verify=True):
+        """
+        Загружает несколько графов параллельно.
+
+        Args:
+            graphs (dict): IRI графа -> имя файла или граф rdflib.
+
+        Returns:
+            list: Отчёты load() в порядке graphs (с полем error при ошибке).
+        """
+        def run(item):
+            graph, source = item
+            try:
+                return self.load(graph, source, replace, verify)
+            except (LoadError, UploadError, rq.RequestException) as e:
+                return {"graph": str(graph), "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            reports = list(ex.map(run, graphs.items()))
+        print_report(reports)
+        return reports
+
+
+def print_report(reports):
+    """Печатает итоги загрузки графов."""
+    for r in reports:
+        if "error" in r:
+            print("#!ERROR: {graph}: {error}".format(**r))
+            continue
+        print("LOADED: {} {} triples in {} batches, {:.1f} MiB, {:.1f}s{}".format(
+            r["graph"], r["triples"], r["batches"], r["bytes"] / 2**20,
+            r["time"],
+            ", verified" if "count" in r else ""))
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from requests.auth import HTTPBasicAuth
+
+    parser = argparse.ArgumentParser(
+        description="Загрузка RDF-файлов в именованные графы (Graph Store Protocol)")
+    parser.add_argument("graphs", nargs="+", metavar="GRAPH=FILE",
+                        help="IRI графа и файл для загрузки")
+    parser.add_argument("--data", required=True,
+                        help="Точка доступа Graph Store")
+    parser.add_argument("--query", help="Точка доступа SPARQL для проверки")
+    parser.add_argument("--append", action="store_true",
+                        help="Дополнить графы вместо замены")
+    parser.add_argument("-j", "--jobs", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=BATCH_TRIPLES,
+                        help="Триплетов в одном запросе")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    auth = HTTPBasicAuth(args.user, args.password) if args.user else None
+    store = GraphStore(args.data, args.query, auth=auth, workers=args.jobs,
+                       batch_size=args.batch)
+    graphs = dict(item.split("=", 1) for item in args.graphs)
+    reports = store.load_all(graphs, replace=not args.append)
+    sys.exit(1 if any("error" in r for r in reports) else 0)
@@ -14,6 +14,8 @@
 Основные функции:
 - parse_xl(): Парсинг Excel-файла с использованием указанного обработчика
 - upload(): Загрузка сгенерированного RDF-файла на сервер
+- publish(): Загрузка RDF-файла в именованный граф (Graph Store Protocol)
+- delta.publish_delta(): Публикация только изменений графа (--delta)
 - normURI(): Нормализация строк для URI
 - elem(): Получение IRI элемента по символу
 
@@ -37,26 +39,35 @@
     parse_xl("filename.xls", (Yarki, ["Локация"]))
     upload("output.ttl")
 
+Табличный вывод измерений (помимо RDF, за тот же проход):
+    table = MeasurementTable()
+    parse_xl("filename.xls", (Yarki, ["Локация"]), sink=table)
+    table.write("measurements.parquet")
+
 """
 
 # import pandas as pd
 import xlrd
 from rdflib import (Graph, Namespace, FOAF, XSD, RDF, RDFS, DCTERMS, URIRef,
-                    Literal, BNode)
+                    Literal)
 from rdflib.namespace import WGS, SDO
 import os.path
 import unicodedata
 from enum import Enum
 import re
-import requests as rq
-from requests.auth import HTTPBasicAuth
 import base64
 import os
 from namespace import PT, P, SCHEMA, BIBO, MT, GS, CGI, DBP, DBP_OWL
+from elements import ELEMENTS
+from skolem import skolem_iri
+from instrument import TRACER, count, span
+from logs import add_arguments, get_logger, print_summary, setup_from_args
+# normalization, transforms (numpy, pandas), загрузка и публикация
+# (requests) импортируются в функциях, которые их используют: разбор
+# листов и запуск импортёра не должны ждать их загрузки
+import pickle
 from pprint import pprint
 
-import pudb
-
 try:
     del os.environ["HTTP_PROXY"]
     del os.environ["HTTPS_PROXY"]
@@ -77,12 +88,10 @@ TARGETMT = "PeriodicTable.ttl"
 EQUIPMENT = "S8 Tiger"
 EQUIPMENT_TYPE = "X-Ray fluorescence analysis"
 
+PERIODIC_TABLE = os.path.join(ONTODIR, "PeriodicTable.owl")
+
 G = Graph(bind_namespaces="rdflib")
 GMT = Graph(bind_namespaces="rdflib")
-try:
-    GMT.parse(location=os.path.join(ONTODIR, 'PeriodicTable.owl'))
-except FileNotFoundError:
-    pass
 GS = [G, GMT]
 
 COMPRE = re.compile(r"^(([A-Z][A-Za-z]{,2}\d{,2})+)(.*?)$")
@@ -106,7 +115,57 @@ DEGRE = re.compile(r"^(\d{,3})(\D)(\d{,2})(\D)(\d{,2}(\.\d{,2})?)(\D)(.*)$")
 # print(spl)
 # # quit()
 
-COMPOUNDS = {}
+log = get_logger("i_pol")
+
+
+class DetectionLimitRegistry:
+    """
+    Таблица интернирования пределов обнаружения.
+
+    Один узел pt:DetectionLimit создаётся на каждый различный ключ
+    (набор данных, элемент или соединение, значение, единица); все
+    цензурированные измерения ("<x") с тем же ключом ссылаются на него.
+    Реестр принадлежит обработчику листа (ImpState): узлы существуют только
+    в его графе, поэтому разбор в другой граф начинается с пустого реестра.
+
+    Attributes:
+        nodes (dict): Ключ -> узел предела обнаружения.
+        reused (int): Число измерений, получивших уже существующий узел.
+        declared (int): Число измерений, получивших предел из строки DETLIM.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.reused = 0
+        self.declared = 0
+
+    @staticmethod
+    def key(dataset, name, value, unit):
+        """Строит ключ; числовые значения сравниваются как числа ('0,5' == 0.5)."""
+        try:
+            value = float(str(value).replace(",", "."))
+        except ValueError:
+            value = str(value).strip()
+        return dataset, name, value, unit
+
+    def get(self, key):
+        """Возвращает узел для ключа или None; учитывает повторное использование."""
+        node = self.nodes.get(key)
+        if node is not None:
+            self.reused += 1
+        return node
+
+    def register(self, key, node):
+        self.nodes[key] = node
+
+    def stats(self):
+        """Статистика: число различных пределов и повторных ссылок на них."""
+        return {
+            "detection_limits": len(self.nodes),
+            "reused": self.reused,
+            "declared": self.declared,
+            "censored_measurements": len(self.nodes) + self.reused + self.declared,
+        }
 
 for _ in GS:
     _.bind("pt", PT)
@@ -120,7 +179,8 @@ for _ in GS:
     _.bind("wgs", WGS)
     # _.bind('geo', GEO)
 
-ElToIRI = {}
+# Символ -> IRI элемента из статической таблицы (см. elements.py)
+ElToIRI = {symbol: MT[symbol] for symbol in ELEMENTS}
 GeoSite = PT.Site
 DataSheet = PT.DataSheet
 GeoSample = PT.Sample
@@ -136,10 +196,62 @@ IgnitionLosses = PT.IgnitionLosses
 G.add((PT.PPM, RDFS.label, Literal("мг/кг", lang="ru")))
 G.add((PT.Percent, RDFS.label, Literal("Процент", lang="ru")))
 
-for el in GMT.subjects(RDF.type, MT.Element):
-    ElToIRI[el.fragment] = el
 
-# print(ElToIRI)
+
+def cached_triples(path, format=None):
+    """Возвращает список триплетов онтологии, используя бинарный снимок.
+
+    Рядом с исходным файлом хранится pickle-снимок (``<path>.pkl``) с уже
+    разобранными триплетами. Снимок считается устаревшим, если исходный
+    файл новее него; тогда файл разбирается заново и снимок обновляется.
+
+    Args:
+        path (str): Путь к файлу онтологии (OWL, TTL и т.п.).
+        format (str): Формат файла для rdflib, если его нужно указать явно.
+
+    Returns:
+        list: Список триплетов.
+
+    Raises:
+        FileNotFoundError: Если исходный файл отсутствует.
+    """
+    snapshot = path + ".pkl"
+    mtime = os.path.getmtime(path)
+    try:
+        if os.path.getmtime(snapshot) >= mtime:
+            with open(snapshot, "rb") as inp:
+                return pickle.load(inp)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    graph = Graph()
+    graph.parse(location=path, format=format)
+    triples = list(graph)
+    try:
+        with open(snapshot, "wb") as o:
+            pickle.dump(triples, o, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # Каталог онтологий только для чтения - работаем без снимка
+    return triples
+
+
+def load_periodic_table(graph=None, path=PERIODIC_TABLE):
+    """Загружает онтологию периодической таблицы в граф (по умолчанию GMT).
+
+    Загрузка выполняется один раз; повторные вызовы ничего не делают.
+
+    Returns:
+        Graph: Граф с периодической таблицей.
+    """
+    if graph is None:
+        graph = GMT
+    if len(graph) == 0:
+        try:
+            for triple in cached_triples(path):
+                graph.add(triple)
+        except FileNotFoundError:
+            pass
+    return graph
 
 
 def load_lithology_ontology(graph=None,
@@ -164,7 +276,8 @@ def load_lithology_ontology(graph=None,
 
     try:
         # Загружаем онтологию литологии
-        graph.parse(location=ttl_path, format="turtle")
+        for triple in cached_triples(ttl_path, format="turtle"):
+            graph.add(triple)
         print(f"✓ Онтология литологии загружена из: {ttl_path}")
         print(f"✓ Триплетов в графе после загрузки: {len(graph)}")
 
@@ -180,7 +293,15 @@ def load_lithology_ontology(graph=None,
     return graph
 
 
-load_lithology_ontology(G)
+_lithology_loaded = False
+
+
+def ensure_lithology_ontology():
+    """Однократно загружает онтологию литологии в выходной граф G."""
+    global _lithology_loaded
+    if not _lithology_loaded:
+        load_lithology_ontology(G)
+        _lithology_loaded = True
 
 
 def snake_to_camel(snake_str: str, capitalize_first: bool = False) -> str:
@@ -301,21 +422,32 @@ PPM_TO_PERCENT = 0.0001  # 1 PPM = 0.0001%
 
 def convert_units(value, from_unit, to_unit='%'):
     """
-    Конвертирует значения между единицами измерения
+    Конвертирует значения между единицами измерения.
+
+    Скалярная обёртка над normalization.unit_factors(); для столбцов
+    значений используйте normalization.normalize().
     """
     if from_unit == to_unit:
         return value
 
-    conversion_factors = {
-        ('PPM', '%'): PPM_TO_PERCENT,
-        ('%', 'PPM'): 1 / PPM_TO_PERCENT,
-    }
+    import numpy as np
+    from normalization import unit_factors
 
-    factor = conversion_factors.get((from_unit, to_unit))
-    if factor:
-        return value * factor
-    else:
+    factor = unit_factors(from_unit, to_unit)[0]
+    if np.isnan(factor):
         return value  # Если конвертация невозможна, возвращаем исходное значение
+    return value * factor
+
+
+def unit_kind(rupper, fieldname):
+    """Определяет тип единицы измерения поля: 'PPM', 'INT', '%' или None."""
+    if "PPM" in rupper:
+        return 'PPM'
+    if "INT" in rupper:
+        return 'INT'
+    if "%" in fieldname:
+        return '%'
+    return None
 
 
 # Словарь для отображения текстур на IRI онтологии
@@ -472,7 +604,10 @@ class ImpState:
         locations (list): Список локаций.
         sample_col (int): Номер колонки с образцами.
         loc_fence (int): Граница для локаций.
-        dlims (dict): Словарь пределов обнаружения.
+        dlims (dict): Пределы обнаружения из строки DETLIM по элементам.
+        detection_limits (DetectionLimitRegistry): Пределы обнаружения
+            цензурированных значений листа.
+        compounds (dict): Узлы соединений, уже записанные в граф.
 
     Methods:
         proc_comp: Обрабатывает химическое соединение или элемент.
@@ -505,11 +640,16 @@ class ImpState:
         self.proc_locs(locations)
         self.loc_fence = len(self.locations)
         self.dlims = {}
+        self.detection_limits = DetectionLimitRegistry()
+        self.compounds = {}
         self.kwargs = kwargs
         self.non_iso = {}
         self.measurements = {}
         self.analysis = None
         self.fls = {}
+        self.to_normalize = []
+        # Табличный приёмник измерений (см. measurement_table.py)
+        self.sink = kwargs.get("sink")
 
     def proc_value(self, value):
         if isinstance(value, str):
@@ -524,7 +664,14 @@ class ImpState:
         # print("T:{}".format(triple))
         self.g.add(triple)
 
-    def proc_comp(self, names, value, delim=False):
+    def point_coordinate(self, subject, rel, value):
+        """Записывает координату (wgs:lat или wgs:long) в узел wgs:Point субъекта."""
+        point = skolem_iri(subject, "point")
+        self.add((subject, WGS.location, point))
+        self.add((point, RDF.type, WGS.Point))
+        self.add((point, rel, Literal(value)))
+
+    def proc_comp(self, names, value, delim=False, col=None):
         """
         Обрабатывает химическое соединение или элемент с 	сохранением оригинальных значений
         и добавлением нормализованных (PPM -> %)
@@ -533,6 +680,7 @@ class ImpState:
         - names: Кортеж (поле, имя_поля)
         - value: Значение ячейки
         - delim: Флаг предела обнаружения
+        - col: Номер столбца (различает столбцы с одинаковыми заголовками)
                 """
 
         uvalue = str(value).upper().strip()
@@ -608,11 +756,10 @@ class ImpState:
             # Определяем единицы измерения
             if unit_type == 'PPM':
                 add((m, PT.unit, PPM))
-                # 🔥 ДОБАВЛЯЕМ НОРМАЛИЗОВАННОЕ ЗНАЧЕНИЕ (PPM -> %)
+                # 🔥 Нормализованное значение (PPM -> %) добавляется пакетно
+                # в flush_normalized() после обработки листа
                 if not delim and isinstance(measurement_value, (int, float)):
-                    normalized_value = measurement_value * 0.0001  # PPM to %
-                    add((m, PT.normalizedValue, Literal(normalized_value)))
-                    add((m, PT.normalizedUnit, Percent))
+                    self.to_normalize.append((m, measurement_value, unit_type))
             elif unit_type == '%':
                 add((m, PT.unit, Percent))
             elif unit_type == 'INT':
@@ -624,22 +771,28 @@ class ImpState:
             value = int(value)
         if name in ["ППП", "ппп"]:
             rel = PT.il  # ignition losses
-            m = BNode()
+            m = skolem_iri(self.analysis, "measurement",
+                           field=fieldname, column=col)
             add((self.analysis, PT.measurement, m))
             add((m, PT.value, Literal(value)))
             add((m, RDF.type, GeoMeasure))
             add((m, RDF.type, IgnitionLosses))
             u = name.upper()
             unit(m, u)
+            if self.sink is not None:
+                self.sink.add(self.dsiri, self.sample, self.analysis, None,
+                              "LOI", value, unit_kind(u, fieldname))
             return
 
         if mo is None:
-            if name == "с_ш":
-                rel = Lat
-                ovalue = degs(ovalue)
-            if name == "в_д":
-                rel = Long
-                ovalue = degs(ovalue)
+            if name in ("с_ш", "в_д"):
+                # Координаты записываются сразу в узел wgs:Point, без
+                # последующей перестройки графа (см. update())
+                if self.analysis and not delim:
+                    self.point_coordinate(self.sample or self.analysis,
+                                          Lat if name == "с_ш" else Long,
+                                          degs(ovalue))
+                return
             if name in ["sku", "номер"]:
                 rel = SDO.sku
                 if isinstance(ovalue, float):
@@ -665,8 +818,8 @@ class ImpState:
                     f(self, value, names=names, delim=delim)
             return
 
-        def make_detlim():
-            m = BNode()
+        def make_detlim(**parts):
+            m = skolem_iri(self.dsiri, "detection-limit", **parts)
             add((self.dsiri, PT.detectionLimit, m))
             add((m, RDF.type, PT.DetectionLimit))
             return m
@@ -674,13 +827,15 @@ class ImpState:
         m = None
 
         if self.analysis and not delim:
-            m = BNode()
+            m = skolem_iri(self.analysis, "measurement",
+                           field=fieldname, column=col)
             add((self.analysis, PT.measurement, m))
             add((m, RDF.type, GeoMeasure))
         if delim:
-            m = make_detlim()
+            m = make_detlim(field=fieldname)
 
         rupper = rest.upper()
+        unit_type = unit_kind(rupper, fieldname)
 
         if dl is None:
             add((m, PT.value, Literal(value)))
@@ -693,30 +848,37 @@ class ImpState:
             if delim:
                 self.dlims[e] = m
             if dl is not None:
+                limits = self.detection_limits
+                # Предел, объявленный строкой DETLIM, имеет приоритет
                 dlm = self.dlims.get(e, None)
                 if dlm is not None:
-                    add((m, PT.value, dlm))
+                    limits.declared += 1
                 else:
+                    key = limits.key(self.dsiri, e, value, unit_type)
+                    dlm = limits.get(key)
+                if dlm is None:
                     # m is description, connected to a sample
-                    md = make_detlim()
+                    dlm = make_detlim(key=key)
                     # Для пределов обнаружения тоже добавляем нормализацию
-                    add((md, PT.value, Literal(value)))
-                    add((md, RDF.type, GeoMeasure))
-                    unit(md, rupper)
+                    add((dlm, PT.value, Literal(value)))
+                    add((dlm, RDF.type, GeoMeasure))
+                    unit(dlm, rupper)
                     create_measurement_with_normalization(
-                        md, value, unit_type, rupper)
-                    self.dlims[e] = md
-                    add((m, PT.value, md))
+                        dlm, value, unit_type, rupper)
+                    limits.register(key, dlm)
+                add((m, PT.value, dlm))
 
+        compound = None
         if len(rc) > 1 or el1 != el:  # Compound, e.g. oxide
+            compound = comp
             compname = "compound-" + normURI(comp)
-            cb = COMPOUNDS.get(compname, None)
+            cb = self.compounds.get(compname, None)
             if cb is None:
                 cb = PT[compname]
                 add((cb, RDF.type, PT.Compound))
                 add((cb, PT.Formula, Literal(comp)))
                 add((cb, RDFS.label, Literal(comp)))
-                COMPOUNDS[compname] = cb
+                self.compounds[compname] = cb
             add((m, PT.compound, cb))
 
             finish_dl(comp, m)
@@ -729,9 +891,41 @@ class ImpState:
                 rc, el1, el, eliri))
             quit()
 
+        if self.sink is not None and not delim:
+            self.sink.add(self.dsiri,
+                          self.sample,
+                          self.analysis,
+                          eliri if compound is None else None,
+                          compound,
+                          value,
+                          unit_type,
+                          censored=dl is not None,
+                          detection_limit=dl)
+
         if "TOT" in rupper or "ОБЩ" in rupper:
             add((m, PT.total, Literal(True)))
 
+    def flush_normalized(self):
+        """
+        Добавляет нормализованные значения (в %) для накопленных измерений.
+
+        Пересчёт выполняется одним векторным вызовом normalization.normalize()
+        для всех измерений листа.
+        """
+        if not self.to_normalize:
+            return
+        import numpy as np
+        from normalization import PERCENT, normalize
+
+        nodes, values, units = zip(*self.to_normalize)
+        normalized = normalize(values, units, PERCENT)
+        add = self.add
+        for m, value in zip(nodes, normalized):
+            if not np.isnan(value):
+                add((m, PT.normalizedValue, Literal(float(value))))
+                add((m, PT.normalizedUnit, Percent))
+        self.to_normalize = []
+
     def proc_locs(self, locations):
         if locations is None:
             return
@@ -793,9 +987,9 @@ class ImpState:
                        rx,
                        self.sample_col,
                        sheet_row=row,
-                       detlim=delim)
+                       detlim=detlim)
             for i, cell in enumerate(row):
-                self.c(cell, rx, i, detlim=delim, sheet_row=row)
+                self.c(cell, rx, i, detlim=detlim, sheet_row=row)
             return
 
         if self.state == State.HEADER:
@@ -823,8 +1017,8 @@ class ImpState:
         try:
             field, fieldname = self.header[col]
         except KeyError as k:
-            print("#! ERROR header key {} not in {} row: {}".format(
-                k, self.header, row))
+            log.warning("header key %s not in header of %s columns, row %s",
+                        k, len(self.header), row)
             # quit()
             return
 
@@ -856,9 +1050,11 @@ class ImpState:
             # add((self.sample, RDF.type, SpatialThing))
             self.belongs(self.sample)
         elif self.sample is not None:
-            self.proc_comp((field + prt, fieldname + prt), cell.value)
+            self.proc_comp((field + prt, fieldname + prt), cell.value,
+                           col=col)
         elif detlim:
-            self.proc_comp((field + prt, fieldname + prt), cell.value, detlim)
+            self.proc_comp((field + prt, fieldname + prt), cell.value,
+                           detlim, col=col)
         else:
             print("#! ERROR: nowhere to store {} R:{} C:{}\n#!{}".format(
                 cell, row, col, self.header))
@@ -926,7 +1122,7 @@ class Alrosa(ImpState):
             for i, cell in enumerate(row):
                 self.h(cell, rx, i)
             self.state = State.DATA
-            print("HEADER:{}".format(self.header))
+            log.info("HEADER:%s", self.header)
             return
         c0 = row[0]
         v0 = str(c0.value).strip()
@@ -955,8 +1151,8 @@ class Alrosa(ImpState):
         try:
             field, fieldname = self.header[col]
         except KeyError as k:
-            print("#! ERROR header key {} not in {} row: {}".format(
-                k, self.header, row))
+            log.warning("header key %s not in header of %s columns, row %s",
+                        k, len(self.header), row)
             # quit()
             return
 
@@ -1026,15 +1222,16 @@ class Alrosa(ImpState):
 
             for location in locations:
                 if location not in self.fls:
-                    location_bnode = BNode(
-                    )  # Создаем BNode для каждой локации
+                    # Узел для каждой локации (IRI выводится из названия)
+                    location_bnode = skolem_iri(self.dsiri, "location",
+                                                label=location)
                     self.fls[location] = location_bnode
 
                     # Добавляем основную информацию о локации
                     add((location_bnode, RDF.type, SCHEMA.Place))
                     add((location_bnode, RDFS.label, Literal(location)))
 
-                    # 🔥 Добавляем географические координаты в BNode
+                    # 🔥 Добавляем географические координаты в узел локации
                     self._add_location_metadata(location_bnode, sheet_row)
                 else:
                     location_bnode = self.fls[location]
@@ -1052,7 +1249,7 @@ class Alrosa(ImpState):
 
         # 🔥 НОВОЕ: Обработка текстовых свойств
         elif field == "LOCATION_COMMENT":
-            # Сохраняем для последующего добавления в BNode локации
+            # Сохраняем для последующего добавления в узел локации
             self._current_location_comment = val
 
         elif field == "LAND_SEA_SAMPLING":
@@ -1095,9 +1292,11 @@ class Alrosa(ImpState):
             self._process_rim_core_mineral_grains(val)
         # Обработка химических данных (существующий код)
         elif self.sample is not None:
-            self.proc_comp((field + prt, fieldname + prt), cell.value)
+            self.proc_comp((field + prt, fieldname + prt), cell.value,
+                           col=col)
         elif detlim:
-            self.proc_comp((field + prt, fieldname + prt), cell.value, detlim)
+            self.proc_comp((field + prt, fieldname + prt), cell.value,
+                           detlim, col=col)
         else:
             value = self.proc_value(cell.value)
             if value is not None and self.kwargs['sheetName'] != 'References':
@@ -1137,7 +1336,7 @@ class Alrosa(ImpState):
         self.add((self.analysis, PT.analysisSpot, PT[val]))
 
     def _add_location_metadata(self, location_bnode, row):
-        """Добавляет метаданные локации в BNode"""
+        """Добавляет метаданные локации в узел локации"""
         add = self.add
 
         # Собираем все координатные данные из строки
@@ -1181,13 +1380,13 @@ class Alrosa(ImpState):
         """Создает геометрический объект для локации с правильной онтологией"""
         add = self.add
 
-        # 🔥 Указываем тип для BNode локации
+        # 🔥 Указываем тип для узла локации
         add((location_bnode, RDF.type, PT.GeoBounds))
 
         # Если есть и min и max координаты - создаем bounding box
         if all(k in location_data
                for k in ['lat_min', 'lat_max', 'long_min', 'long_max']):
-            bbox = BNode()
+            bbox = skolem_iri(location_bnode, "geo-shape")
             add((location_bnode, SCHEMA.geo, bbox))
             add((bbox, RDF.type, SCHEMA.GeoShape))
             add((bbox, SCHEMA.box,
@@ -1198,7 +1397,7 @@ class Alrosa(ImpState):
 
         # Если только одна пара координат - создаем точку
         elif 'lat_min' in location_data and 'long_min' in location_data:
-            point = BNode()
+            point = skolem_iri(location_bnode, "point")
             add((location_bnode, WGS.location, point))
             add((point, RDF.type, WGS.Point))
             add((point, WGS.lat, Literal(location_data['lat_min'])))
@@ -1358,33 +1557,58 @@ FILES = {
 }
 
 
-def parse_sheet(sh, sheetIRI, sheetName, comp):
+def parse_sheet(sh, sheetIRI, sheetName, comp, sink=None, graph=None):
+    """
+    Разбирает лист в граф (по умолчанию в общий граф G).
+
+    Returns:
+        ImpState - обработчик листа (пределы обнаружения, измерения)
+    """
     # print("Cell D30 is {0}".format(sh.cell_value(rowx=29, colx=3)))
+    g = G if graph is None else graph
     constr, locs = comp
-    st = constr(G, sheetIRI, locations=locs, sheetName=sheetName, sheet=sh)
-    G.add((sheetIRI, RDF.type, DataSheet))
+    st = constr(g,
+                sheetIRI,
+                locations=locs,
+                sheetName=sheetName,
+                sheet=sh,
+                sink=sink)
+    g.add((sheetIRI, RDF.type, DataSheet))
     sheetName = sheetName.replace(".xls_", ", ")
-    G.add((sheetIRI, RDFS.label, Literal(sheetName)))
+    g.add((sheetIRI, RDFS.label, Literal(sheetName)))
     print("Parsing sheet: {}".format(sheetName))
-    for rx in range(sh.nrows):
-        st.row(sh.row(rx), rx)
+    before = len(g)
+    with span("rows"):
+        for rx in range(sh.nrows):
+            st.row(sh.row(rx), rx)
+    with span("normalize"):
+        st.flush_normalized()
+    for name, n in st.detection_limits.stats().items():
+        count(name, n)
+    count("rows", sh.nrows)
+    count("cells", sh.nrows * sh.ncols)
+    count("triples", len(g) - before)
     #print("PROBLEMATICS:")
     #pprint(st.non_iso)
+    return st
 
 
-def parse_xl(file, comp):
+def parse_xl(file, comp, sink=None):
     """
     Конвертирует указанный Excel-файл.
 
     Аргументы:
     - file: Имя файла для обработки
     - comp: Кортеж (класс-обработчик, список_локаций)
+    - sink: MeasurementTable для табличного вывода измерений (опционально)
     """
 
     print("# FILE: {} at {}".format(file, SUBDIR))
+    ensure_lithology_ontology()
     pathfile = os.path.join(SUBDIR, file)
     # df = pd.read_excel(pathfile)
-    wb = xlrd.open_workbook(pathfile)
+    with span("extract", file=file):
+        wb = xlrd.open_workbook(pathfile)
     print("# Sheet names: {}".format(wb.sheet_names()))
     for sheet_no, sheet in enumerate(wb.sheet_names()):
         print("# Wb: {}, sheet: {}".format(file, sheet))
@@ -1393,53 +1617,26 @@ def parse_xl(file, comp):
         print("{0} {1} {2}".format(sh.name, sh.nrows, sh.ncols))
         constr, _ = comp
         whole_name = file + "_" + sheet
-        if hasattr(constr, '_sheet_names_'):
-            if sheet in constr._sheet_names_:
-                parse_sheet(sh, P[sheetname], whole_name, comp)
-            elif sheet_no in constr._sheet_names_:
-                parse_sheet(sh, P[sheetname], whole_name, comp)
-        else:
-            parse_sheet(sh, P[sheetname], whole_name, comp)
+        if hasattr(constr, '_sheet_names_') and not (
+                sheet in constr._sheet_names_
+                or sheet_no in constr._sheet_names_):
+            continue
+        with span("sheet", group=whole_name):
+            parse_sheet(sh, P[sheetname], whole_name, comp, sink)
 
 
 def update(g):
-    # qres=g.query('''
-    # PREFIX pt: <http://crust.irk.ru/ontology/pollution/terms/1.0/>
-    # PREFIX p: <http://crust.irk.ru/ontology/pollution/1.0/>
-    # PREFIX mt: <http://www.daml.org/2003/01/periodictable/PeriodicTable#>
-    # PREFIX wgs: <https://www.w3.org/2003/01/geo/wgs84_pos#>
-    # SELECT ?sample
-    # WHERE {
-    #     ?sample a pt:GeologicalSample .
-    #     ?sample wgs:long ?long .
-    #     ?sample wgs:lat ?lat .
-    # }
-    # ''')
-    # for row in qres:
-    #     print(row)
-
-    g.update("""
-    PREFIX pt: <http://crust.irk.ru/ontology/pollution/terms/1.0/>
-    PREFIX p: <http://crust.irk.ru/ontology/pollution/1.0/>
-    PREFIX mt: <http://www.daml.org/2003/01/periodictable/PeriodicTable#>
-    PREFIX wgs: <https://www.w3.org/2003/01/geo/wgs84_pos#>
-    DELETE {
-        ?sample a wgs:SpatialThing .
-        ?sample wgs:long ?long .
-        ?sample wgs:lat ?lat .
-    }
-    INSERT {
-        ?sample wgs:location _:l .
-        _:l a wgs:Point .
-        _:l wgs:long ?long .
-        _:l wgs:lat ?lat .
-    }
-    WHERE {
-        ?sample a pt:Sample .
-        ?sample wgs:long ?long .
-        ?sample wgs:lat ?lat .
-    }
-    """)
+    """
+    Переносит координаты образцов в узлы wgs:Point.
+
+    Раньше выполнялось запросом SPARQL UPDATE (см.
+    transforms.LOCATION_UPDATE); проход transforms.location_points() делает
+    то же без движка SPARQL. Новые данные импортёр записывает сразу в
+    узлы точек, поэтому проход нужен только для графов старого вида.
+    """
+    from transforms import location_points, run_passes
+
+    return run_passes(g, [location_points])
 
 
 PUTURL = "http://ktulhu.isclan.ru:8890/DAV/home/{user}/rdf_sink/{name}"
@@ -1447,69 +1644,134 @@ USER = base64.b64decode("bG9hZGVyCg==").decode("utf8").strip()
 CRED = base64.b64decode("bG9hZGVyMzEyCg==").decode("utf8").strip()
 
 
-def upload(filename, name=None):
+def upload(filename, name=None, compress=False, triples_per_chunk=None,
+           workers=4):
     """
     Загружает RDF-файл на сервер.
 
+    Файл передаётся потоково, с повторами при сбоях (см. uploader).
+
     Аргументы:
     - filename: Локальное имя файла
     - name: Имя файла на сервере (опционально)
+    - compress: Сжимать передаваемые данные gzip
+    - triples_per_chunk: Разбить граф на части N-Triples такого размера и
+      загрузить их параллельно (возобновляемо)
+    - workers: Число параллельных загрузок частей
     """
+    from requests.auth import HTTPBasicAuth
+
+    from uploader import Uploader
+
     if name is None:
         name = filename
-    with open(filename, "rb") as inp:
-        basic = HTTPBasicAuth(USER, CRED)
-        URL = PUTURL.format(user=USER, filename=filename, name=name)
-        print("URL:{}".format(URL))
-        # files = {"file": (filename, inp, "text/turtle")}
-        rc = rq.put(
-            URL,
-            # files=files,
-            data=inp.read(),
-            auth=basic,
-        )
-        print("RC:", rc)
+    up = Uploader(auth=HTTPBasicAuth(USER, CRED), workers=workers,
+                  compress=compress)
+    if triples_per_chunk:
+        up.upload_chunks(filename, PUTURL, user=USER, name=name,
+                         triples_per_chunk=triples_per_chunk)
         return
+    URL = PUTURL.format(user=USER, filename=filename, name=name)
+    print("URL:{}".format(URL))
+    up.upload_file(filename, URL)
 
-        sg = str(P.samples)
-        print("URL:", sg)
-        data = ({
-            "new_name":
-            sg,
-            "graph_name":
-            "http://localhost:8890/DAV/home/loader/rdf_sink/import.ttl",
-        }, )
-        files = {
-            "new_name": (None, sg),
-            "graph_name": (
-                None,
-                "http://localhost:8890/DAV/home/loader/rdf_sink/import.ttl",
-            ),
-        }
-        rc = rq.post(
-            "http://ktulhu.isclan.ru:8890/conductor/graphs_page.vspx?page=1",
-            files=files,
-            # auth=basic
-        )
-        print("RC:", rc)
+
+def publish(filename, data_url, query_url=None, graph=str(P.samples),
+            replace=True):
+    """
+    Загружает RDF-файл в именованный граф по протоколу Graph Store.
+
+    Аргументы:
+    - filename: Локальное имя файла
+    - data_url: Точка доступа Graph Store
+    - query_url: Точка доступа SPARQL для проверки числа триплетов
+    - graph: IRI графа
+    - replace: Заменить содержимое графа (иначе дополнить)
+    """
+    from requests.auth import HTTPBasicAuth
+
+    from graph_store import GraphStore
+
+    store = GraphStore(data_url, query_url, auth=HTTPBasicAuth(USER, CRED))
+    return store.load_all({graph: filename}, replace=replace)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    import profiling
+    from measurement_table import MeasurementTable, check_parquet
+
+    parser = argparse.ArgumentParser(
+        description="Импорт геохимических данных из XLS в RDF")
+    parser.add_argument(
+        "--table",
+        help="Записать измерения также в таблицу (.parquet, .sqlite, .csv)")
+    parser.add_argument(
+        "--store",
+        help="Загрузить результат в граф по протоколу Graph Store (URL)")
+    parser.add_argument("--query",
+                        help="Точка доступа SPARQL для проверки загрузки")
+    parser.add_argument(
+        "--delta",
+        help="Опубликовать только изменения запросами SPARQL UPDATE (URL)")
+    parser.add_argument("--graph", default=str(P.samples),
+                        help="IRI графа для загрузки")
+    parser.add_argument("--report", default="i_pol-run.json",
+                        help="JSON-отчёт о времени этапов и счётчиках")
+    parser.add_argument(
+        "--trace",
+        help="Трасса этапов (Chrome Trace Event, открывается в speedscope)")
+    add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
+    profiler = profiling.setup_from_args(args)
+    if args.table and args.table.lower().endswith(".parquet"):
+        try:
+            check_parquet()
+        except ImportError as e:
+            raise SystemExit("#!ERROR: --table {}: {}".format(args.table, e))
+    sink = MeasurementTable() if args.table else None
+
     if 1:
         for file, comp in FILES.items():
-            parse_xl(file, comp)
+            parse_xl(file, comp, sink)
             break
         # update(G)
         target = os.path.join(ONTODIR, TARGET)
-        with open(target, "w") as o:
+        with open(target, "w") as o, span("serialize", file=target):
 
             # TODO: Shift location to a BNode using SPARQL.
             # o.write(G.serialize(format='turtle'))
             o.write(G.serialize(format="turtle"))
             print("WROTE: {}".format(target))
+        if sink is not None:
+            with span("table", file=args.table):
+                sink.write(args.table)
+        if args.store:
+            with span("publish"):
+                publish(target, args.store, args.query, args.graph)
+        if args.delta:
+            from requests.auth import HTTPBasicAuth
+
+            from common import SPARQLClient
+            from delta import publish_delta
+
+            client = SPARQLClient(cache_size=0)
+            client.session.auth = HTTPBasicAuth(USER, CRED)
+            with span("publish"):
+                publish_delta(target, args.graph, args.delta, client=client)
+        print_summary()
+        TRACER.print_summary()
+        TRACER.write_report(args.report)
+        if args.trace:
+            TRACER.write_trace(args.trace)
+        if profiler is not None:
+            profiler.dump()
     # upload(TARGET, "samples.ttl")
     if 0:
         targetmt = os.path.join(ONTODIR, TARGETMT)
         with open(targetmt, "w") as o:
-            o.write(GMT.serialize(format="turtle"))
+            o.write(load_periodic_table().serialize(format="turtle"))
     print("#!INFO: Normal exit")
@@ -0,0 +1,199 @@
+"""
+Замер времени этапов импорта и счётчики.
+
+Этапы размечаются контекстными менеджерами span(), объём работы -
+счётчиками count(). Вложенные этапы и счётчики относятся к группе
+ближайшего внешнего этапа с параметром group (трубка Alrosa, лист i_pol),
+поэтому отчёт показывает, какая трубка и какой этап занимают время.
+
+Отчёт записывается в JSON (write_report()), трасса - в формате
+Chrome Trace Event (write_trace()); её открывают chrome://tracing,
+Perfetto и speedscope.
+
+Пример использования:
+    with span("pipe", group=tube_name):
+        with span("rdf"):
+            convert_features_to_rdf(...)
+        count("triples", n)
+    TRACER.write_report("run.json")
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+GROUP = "group"
+
+
+def stage_name(name, attrs):
+    """Имя этапа в отчёте: sql:oxides для span("sql", table="oxides")."""
+    table = attrs.get("table")
+    return name if table is None else "{}:{}".format(name, table)
+
+
+class Tracer:
+    """
+    Накопитель этапов и счётчиков одного запуска.
+
+    Attributes:
+        spans (list): Завершённые этапы (имя, параметры, начало, длительность,
+            поток, группа).
+        counters (dict): (группа, имя) -> значение.
+        profiler: Профилировщик этапов (profiling.StageProfiler) или None.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.started = time.time()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profiler = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def group(self):
+        """Текущая группа (трубка, лист) или None."""
+        for name, attrs in reversed(self._stack()):
+            if GROUP in attrs:
+                return attrs[GROUP]
+        return None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Замеряет время этапа name; параметры попадают в отчёт и трассу."""
+        stack = self._stack()
+        stack.append((name, attrs))
+        group = self.group()
+        profiled = (self.profiler is not None and GROUP not in attrs
+                    and self.profiler.begin(stage_name(name, attrs)))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiled:
+                self.profiler.end(stage_name(name, attrs))
+            stack.pop()
+            with self._lock:
+                self.spans.append((name, attrs, start - self.start, elapsed,
+                                   threading.get_ident(), group))
+
+    def count(self, name, n=1, group=None):
+        """Увеличивает счётчик name текущей (или указанной) группы."""
+        if group is None:
+            group = self.group()
+        key = (group, name)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def report(self):
+        """
+        Сводка запуска.
+
+        Returns:
+            dict: Общее время, время и число вызовов по этапам, и то же
+            по группам вместе со счётчиками.
+        """
+        stages = {}
+        groups = {}
+        for name, attrs, _, elapsed, _, group in self.spans:
+            key = stage_name(name, attrs)
+            targets = [stages]
+            if group is not None and GROUP not in attrs:
+                g = groups.setdefault(group, {"stages": {}, "counters": {}})
+                targets.append(g["stages"])
+            if GROUP in attrs:
+                g = groups.setdefault(attrs[GROUP],
+                                      {"stages": {}, "counters": {}})
+                g["time"] = g.get("time", 0.0) + elapsed
+            for t in targets:
+                s = t.setdefault(key, {"calls": 0, "time": 0.0})
+                s["calls"] += 1
+                s["time"] += elapsed
+        totals = {}
+        for (group, name), n in self.counters.items():
+            totals[name] = totals.get(name, 0) + n
+            if group is not None:
+                g = groups.setdefault(group, {"stages": {}, "counters": {}})
+                g["counters"][name] = n
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S",
+                                     time.localtime(self.started)),
+            "elapsed": time.perf_counter() - self.start,
+            "stages": stages,
+            "counters": totals,
+            "groups": groups,
+        }
+
+    def write_report(self, filename):
+        """Записывает сводку запуска в JSON."""
+        with open(filename, "w") as o:
+            json.dump(self.report(), o, indent=2, ensure_ascii=False)
+        print("WROTE: {}".format(filename))
+
+    def write_trace(self, filename):
+        """Записывает этапы в формате Chrome Trace Event (ph='X')."""
+        pid = os.getpid()
+        events = []
+        for name, attrs, start, elapsed, tid, group in self.spans:
+            args = {k: str(v) for k, v in attrs.items()}
+            if group is not None:
+                args.setdefault(GROUP, str(group))
+            events.append({
+                "name": stage_name(name, attrs),
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": elapsed * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        events.sort(key=lambda e: e["ts"])
+        with open(filename, "w") as o:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, o,
+                      ensure_ascii=False)
+        print("WROTE: {}".format(filename))
+
+    def print_summary(self, limit=10):
+        """Печатает самые долгие этапы."""
+        rep = self.report()
+        print("#!INFO: run {:.2f}s".format(rep["elapsed"]))
+        for key, s in sorted(rep["stages"].items(),
+                             key=lambda kv: -kv[1]["time"])[:limit]:
+            print("#!INFO:   {:<24} {:>6} calls {:>9.3f}s".format(
+                key, s["calls"], s["time"]))
+        if rep["counters"]:
+            print("#!INFO:   counters: {}".format(rep["counters"]))
+
+
+TRACER = Tracer()
+span = TRACER.span
+count = TRACER.count
+
+
+def count_sql_round_trips():
+    """
+    Считает запросы к БД (счётчик db_round_trips) для всех движков SQLAlchemy.
+
+    Вызывается один раз; запросы относятся к группе текущего этапа.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if getattr(count_sql_round_trips, "installed", False):
+        return
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        TRACER.count("db_round_trips")
+
+    count_sql_round_trips.installed = True
@@ -0,0 +1,162 @@
+"""
+Журнал импорта на основе logging с ограничением повторов и сводкой.
+
+Сообщения в циклах по столбцам, строкам и ячейкам (переименования
+столбцов, нераспознанные заголовки, пустые значения) пишутся в журнал,
+а не в stdout. Сообщения группируются по шаблону (``record.msg`` до
+подстановки аргументов, поэтому шаблоны пишутся с %s, а не f-строками):
+
+- на консоль выводятся первые limit сообщений каждого шаблона уровня
+  не ниже заданного (по умолчанию WARNING);
+- все сообщения считаются, и в конце запуска print_summary() печатает
+  "N occurrences of X" по шаблонам;
+- при указании файла сообщения пишутся в него построчно в JSON
+  (время, уровень, журнал, шаблон, текст, трубка или лист из
+  instrument.TRACER).
+
+Пример использования:
+    log = get_logger(__name__)
+    log.info("%s: '%s' -> '%s'", table_name, original, col_str)
+
+    setup_logging("WARNING", jsonl="import.log.jsonl")
+    ...
+    print_summary()
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+from instrument import TRACER
+
+ROOT = "crust"
+LIMIT = 5  # Сообщений одного шаблона на консоли
+
+
+def get_logger(name):
+    """Журнал модуля name (дочерний для общего журнала импорта)."""
+    return logging.getLogger("{}.{}".format(ROOT, name))
+
+
+def template_key(record):
+    return record.name, record.levelname, str(record.msg)
+
+
+class RateLimit(logging.Filter):
+    """Пропускает первые limit сообщений каждого шаблона."""
+
+    def __init__(self, limit=LIMIT):
+        super().__init__()
+        self.limit = limit
+        self.seen = Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = template_key(record)
+        with self._lock:
+            self.seen[key] += 1
+            n = self.seen[key]
+        return n <= self.limit
+
+
+class SummaryHandler(logging.Handler):
+    """Считает сообщения по шаблонам для итоговой сводки."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.counts = Counter()
+        self.example = {}
+
+    def emit(self, record):
+        key = template_key(record)
+        self.counts[key] += 1
+        if key not in self.example:
+            self.example[key] = record.getMessage()
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись журнала - одна строка JSON."""
+
+    def format(self, record):
+        item = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S",
+                                  time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": str(record.msg),
+            "message": record.getMessage(),
+        }
+        group = TRACER.group()
+        if group is not None:
+            item["group"] = str(group)
+        if record.exc_info:
+            item["exception"] = self.formatException(record.exc_info)
+        return json.dumps(item, ensure_ascii=False)
+
+
+SUMMARY = SummaryHandler()
+
+
+def setup_logging(level="WARNING", jsonl=None, limit=LIMIT):
+    """
+    Настраивает журнал импорта.
+
+    Args:
+        level (str): Уровень сообщений на консоли.
+        jsonl (str): Файл для всех сообщений в JSON (None - не писать).
+        limit (int): Сообщений одного шаблона на консоли (0 - без ограничения).
+    """
+    root = logging.getLogger(ROOT)
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        if h is not SUMMARY:
+            h.close()
+    root.setLevel(logging.DEBUG if jsonl else logging.INFO)
+    root.propagate = False
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter("#!%(levelname)s: %(message)s"))
+    if limit:
+        console.addFilter(RateLimit(limit))
+    root.addHandler(console)
+    root.addHandler(SUMMARY)
+    if jsonl:
+        sink = logging.FileHandler(jsonl, "w", encoding="utf8")
+        sink.setFormatter(JSONFormatter())
+        root.addHandler(sink)
+    return root
+
+
+def print_summary(limit=20):
+    """Печатает число сообщений по шаблонам, самые частые первыми."""
+    counts = SUMMARY.counts
+    if not counts:
+        return
+    print("#!INFO: log summary: {} messages, {} kinds".format(
+        sum(counts.values()), len(counts)))
+    for key, n in counts.most_common(limit):
+        name, level, _ = key
+        print("#!INFO:   {:>7} occurrences of {} {}: {}".format(
+            n, level, name[len(ROOT) + 1:], SUMMARY.example[key]))
+    if len(counts) > limit:
+        print("#!INFO:   ... {} more kinds".format(len(counts) - limit))
+
+
+def add_arguments(parser):
+    """Добавляет параметры журнала в argparse."""
+    parser.add_argument("--log-level", default="WARNING",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Уровень сообщений на консоли")
+    parser.add_argument("--log-json",
+                        help="Записать все сообщения в файл (JSON Lines)")
+    parser.add_argument("--log-limit", type=int, default=LIMIT,
+                        help="Сообщений одного вида на консоли (0 - все)")
+
+
+def setup_from_args(args):
+    """Настраивает журнал по параметрам add_arguments()."""
+    return setup_logging(args.log_level, args.log_json, args.log_limit)
@@ -0,0 +1,111 @@
+"""
+Табличный приёмник измерений.
+
+Импортёр i_pol, помимо RDF-графа, может записывать те же измерения в
+«длинную» таблицу (одна строка - одно измерение) за тот же проход по
+листу. Таблица предназначена для численного анализа без обращения к
+RDF; граф остаётся источником связей между сущностями.
+
+Поддерживаемые форматы определяются по расширению файла:
+- .parquet - Parquet (требуется pyarrow или fastparquet)
+- .sqlite, .db - таблица ``measurements`` в SQLite
+- .csv - CSV
+
+Пример использования:
+    table = MeasurementTable()
+    parse_xl("filename.xls", comp, sink=table)
+    table.write("measurements.parquet")
+"""
+
+import importlib.util
+import os.path
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from normalization import PERCENT, normalize, to_numeric
+
+TABLE_NAME = "measurements"
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+def check_parquet():
+    """Проверяет наличие движка Parquet до записи таблицы."""
+    if not any(importlib.util.find_spec(e) for e in PARQUET_ENGINES):
+        raise ImportError("запись .parquet требует пакет pyarrow или fastparquet")
+
+
+class MeasurementTable:
+    """
+    Накопитель строк измерений.
+
+    Attributes:
+        rows (list): Кортежи значений в порядке COLUMNS.
+    """
+
+    COLUMNS = (
+        "dataset",
+        "sample",
+        "analysis",
+        "element",
+        "compound",
+        "value",
+        "unit",
+        "censored",
+        "detection_limit",
+    )
+
+    def __init__(self):
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, dataset, sample, analysis, element, compound, value, unit,
+            censored=False, detection_limit=None):
+        """Добавляет одно измерение; IRI сохраняются строками."""
+        self.rows.append((
+            str(dataset) if dataset is not None else None,
+            str(sample) if sample is not None else None,
+            str(analysis) if analysis is not None else None,
+            str(element) if element is not None else None,
+            compound,
+            None if censored else value,
+            unit,
+            censored,
+            detection_limit,
+        ))
+
+    def to_frame(self):
+        """
+        Возвращает таблицу измерений как DataFrame.
+
+        Значения и пределы обнаружения приводятся к float, добавляется
+        столбец ``normalized_value`` (в процентах).
+        """
+        df = pd.DataFrame(self.rows, columns=list(self.COLUMNS))
+        df["value"] = to_numeric(df["value"])
+        df["detection_limit"] = to_numeric(df["detection_limit"])
+        df["censored"] = df["censored"].astype(bool)
+        df["normalized_value"] = normalize(df["value"], df["unit"], PERCENT)
+        return df
+
+    def write(self, filename):
+        """Записывает таблицу в файл; формат определяется расширением."""
+        ext = os.path.splitext(filename)[1].lower()
+        if ext == ".parquet":
+            check_parquet()
+        df = self.to_frame()
+        if ext == ".parquet":
+            df.to_parquet(filename, index=False)
+        elif ext in (".sqlite", ".db"):
+            # with sqlite3.connect() только фиксирует транзакцию, не закрывая
+            with closing(sqlite3.connect(filename)) as con, con:
+                df.to_sql(TABLE_NAME, con, if_exists="replace", index=False)
+        elif ext == ".csv":
+            df.to_csv(filename, index=False)
+        else:
+            raise ValueError("Неизвестный формат таблицы: {}".format(filename))
+        print("WROTE: {} ({} measurements)".format(filename, len(df)))
+        return df
@@ -0,0 +1,102 @@
+"""
+Контроль памяти при потоковом импорте.
+
+MemoryBudget.check() вызывается после каждой трубки: собирает мусор,
+измеряет RSS процесса, записывает его в счётчики instrument и, если RSS
+превышает бюджет, возбуждает MemoryBudgetExceeded.
+
+По умолчанию измеряется только RSS: tracemalloc замедляет каждое
+выделение памяти в разы. С trace=True (--trace-memory импортёра)
+дополнительно отслеживается память tracemalloc (текущая и пиковая с
+прошлой проверки), а при превышении в журнал пишутся места выделения
+памяти. Отчёты пишутся в журнал logs.get_logger("memory"): замеры после
+трубок - на уровне INFO, места выделения - WARNING.
+
+Пример использования:
+    budget = MemoryBudget(2048)
+    for tube in tubes:
+        ...
+        budget.check(tube_name)
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+from instrument import TRACER
+from logs import get_logger
+
+log = get_logger("memory")
+
+MiB = 2 ** 20
+
+
+class MemoryBudgetExceeded(Exception):
+    """RSS процесса превысил заданный бюджет."""
+
+
+def rss():
+    """Текущий RSS процесса в байтах (пиковый, если текущий недоступен)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryBudget:
+    """
+    Бюджет памяти импорта.
+
+    Args:
+        limit_mb (float): Допустимый RSS в МиБ (None - только отчёт).
+        trace (bool): Отслеживать выделения памяти через tracemalloc
+            (медленно; по умолчанию только RSS).
+        top (int): Число мест выделения памяти в отчёте о превышении.
+    """
+
+    def __init__(self, limit_mb=None, trace=False, top=10):
+        self.limit = limit_mb * MiB if limit_mb else None
+        self.top = top
+        self.peak_rss = 0
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def check(self, where):
+        """Измеряет память после этапа where; при превышении - исключение."""
+        gc.collect()
+        current = rss()
+        self.peak_rss = max(self.peak_rss, current)
+        TRACER.count("rss_bytes", current, group=where)
+        if tracemalloc.is_tracing():
+            traced, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            TRACER.count("traced_peak_bytes", peak, group=where)
+            log.info("memory after %s: RSS %.0f MiB, traced %.0f MiB "
+                     "(peak %.0f MiB)", where, current / MiB, traced / MiB,
+                     peak / MiB)
+        else:
+            log.info("memory after %s: RSS %.0f MiB", where, current / MiB)
+        if self.limit is not None and current > self.limit:
+            self.log_sites()
+            raise MemoryBudgetExceeded(
+                "RSS {:.0f} MiB after {} exceeds budget {:.0f} MiB".format(
+                    current / MiB, where, self.limit / MiB))
+
+    def log_sites(self):
+        """Пишет в журнал места, где выделено больше всего живой памяти."""
+        if not tracemalloc.is_tracing():
+            log.warning("allocation sites are not traced "
+                        "(rerun with --trace-memory)")
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        # Одним сообщением: иначе консоль урезала бы список (logs.RateLimit)
+        sites = "".join("\n  {:>10.1f} KiB {}".format(stat.size / 1024,
+                                                      stat.traceback)
+                        for stat in snapshot.statistics("lineno")[:self.top])
+        log.warning("top %s allocation sites:%s", self.top, sites)
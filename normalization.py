@@ -0,0 +1,211 @@
+"""
+Векторная нормализация единиц измерения для элементов и оксидов.
+
+Модуль работает с целыми столбцами измерений (NumPy-массивы, списки,
+столбцы pandas) вместо поштучного пересчёта значений. Используется
+импортёром i_pol (нормализованные значения PPM -> %) и SQL-импортом
+Alrosa (приведение столбцов анализов к единицам хранения), а также может
+вызываться напрямую при анализе данных:
+
+    >>> normalize([1200, 0.5], ["PPM", "%"])
+    array([0.12, 0.5 ])
+    >>> oxide_to_element([10.0], "Al2O3")
+    array([5.29251])
+
+Основные функции:
+- canonical_unit(): Приведение обозначения единицы к каноническому виду
+- unit_factors(): Множители пересчёта вектора единиц в целевую единицу
+- to_numeric(): Преобразование столбца в float (NaN для нечисловых значений)
+- normalize(): Пересчёт столбца значений с вектором единиц
+- oxide_to_element(), element_to_oxide(): Стехиометрический пересчёт
+- normalize_frame(): Нормализация столбцов анализов в DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+from elements import ELEMENTS, oxide_composition, oxide_factor
+
+PERCENT = "%"
+PPM = "PPM"
+PPB = "PPB"
+
+# Множитель пересчёта единицы в проценты (мас.%)
+UNIT_TO_PERCENT = {
+    PERCENT: 1.0,
+    PPM: 1e-4,
+    PPB: 1e-7,
+}
+
+# Элементы, столбцы которых считаются анализами. Ограничение природными
+# элементами исключает совпадения со служебными столбцами ('No' - номер).
+ANALYTE_ELEMENTS = frozenset(
+    symbol for symbol, (number, _) in ELEMENTS.items() if number <= 92)
+
+UNIT_ALIASES = {
+    "WT%": PERCENT,
+    "МАС.%": PERCENT,
+    "МАС%": PERCENT,
+    "PERCENT": PERCENT,
+    "МГ/КГ": PPM,
+    "Г/Т": PPM,
+    "ГР/Т": PPM,
+    "UG/G": PPM,
+    "МКГ/КГ": PPB,
+    "МГ/Т": PPB,
+}
+
+
+def canonical_unit(unit):
+    """
+    Приводит обозначение единицы к каноническому виду ('%', 'PPM', 'PPB').
+
+    Returns:
+        str: Каноническое обозначение или None, если единица неизвестна.
+    """
+    if unit is None:
+        return None
+    u = str(unit).strip().upper().replace(" ", "")
+    if u in UNIT_TO_PERCENT:
+        return u
+    return UNIT_ALIASES.get(u)
+
+
+def unit_factors(units, to_unit=PERCENT):
+    """
+    Возвращает вектор множителей пересчёта единиц в целевую единицу.
+
+    Args:
+        units: Одна единица или последовательность единиц.
+        to_unit (str): Целевая единица.
+
+    Returns:
+        numpy.ndarray: Множители; NaN для неизвестных единиц.
+    """
+    target = UNIT_TO_PERCENT[canonical_unit(to_unit)]
+    if isinstance(units, str) or units is None:
+        units = [units]
+    # Уникальных единиц обычно единицы, поэтому пересчёт идёт через них
+    codes, uniques = pd.factorize(pd.Series(units, dtype=object))
+    table = np.array([
+        UNIT_TO_PERCENT.get(canonical_unit(u), np.nan) / target
+        for u in uniques
+    ] + [np.nan])
+    return table[codes]
+
+
+def to_numeric(values):
+    """
+    Преобразует столбец значений в массив float.
+
+    Строки с десятичной запятой распознаются; пустые, нечисловые и
+    цензурированные ('<0.1') значения превращаются в NaN.
+    """
+    s = pd.Series(values, dtype=object) if not isinstance(
+        values, pd.Series) else values
+    if s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+        s = s.where(~s.map(lambda v: isinstance(v, str)),
+                    s.astype(str).str.strip().str.replace(",", ".",
+                                                          regex=False))
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+
+
+def normalize(values, units, to_unit=PERCENT):
+    """
+    Пересчитывает столбец значений в целевую единицу.
+
+    Args:
+        values: Значения измерений.
+        units: Единица для всего столбца или вектор единиц той же длины.
+        to_unit (str): Целевая единица ('%', 'PPM', 'PPB').
+
+    Returns:
+        numpy.ndarray: Нормализованные значения; NaN, если значение
+        нечисловое или единица неизвестна.
+    """
+    v = to_numeric(values)
+    f = unit_factors(units, to_unit)
+    return v * f
+
+
+def oxide_to_element(values, formula):
+    """Пересчитывает содержание оксида в содержание элемента (в тех же единицах)."""
+    factor = oxide_factor(formula)
+    if factor is None:
+        raise ValueError("Не простой оксид: {}".format(formula))
+    return to_numeric(values) * factor
+
+
+def element_to_oxide(values, formula):
+    """Пересчитывает содержание элемента в содержание оксида (в тех же единицах)."""
+    factor = oxide_factor(formula)
+    if factor is None:
+        raise ValueError("Не простой оксид: {}".format(formula))
+    return to_numeric(values) / factor
+
+
+def analyte_columns(df):
+    """Возвращает столбцы DataFrame, названные символом элемента или формулой оксида."""
+    return [
+        col for col in df.columns
+        if isinstance(col, str) and (col in ANALYTE_ELEMENTS
+                                     or oxide_composition(col) is not None)
+    ]
+
+
+def normalize_frame(df, unit, to_unit=None, columns=None, as_elements=False):
+    """
+    Нормализует столбцы анализов DataFrame.
+
+    Args:
+        df (DataFrame): Исходная таблица (не изменяется).
+        unit: Единица исходных данных - одна на всю таблицу, словарь
+              {столбец: единица} или вектор единиц по строкам (список,
+              ndarray или Series той же длины; тогда to_unit обязателен).
+              Столбцы, отсутствующие в словаре, только приводятся к float.
+        to_unit (str): Целевая единица; по умолчанию совпадает с исходной,
+              и выполняется только приведение значений к float.
+        columns (list): Столбцы для нормализации; по умолчанию все столбцы
+              элементов и оксидов (см. analyte_columns()).
+        as_elements (bool): Пересчитать оксиды в элементы и переименовать
+              столбцы в символы элементов (если такого столбца ещё нет).
+
+    Returns:
+        DataFrame: Копия таблицы с нормализованными столбцами.
+    """
+    vector = not (unit is None or isinstance(unit, (str, dict)))
+    if vector:
+        if to_unit is None:
+            raise ValueError("Для вектора единиц по строкам нужна to_unit")
+        if isinstance(unit, pd.Series):
+            unit = unit.reindex(df.index)
+        unit = np.asarray(unit, dtype=object)
+        if unit.shape != (len(df),):
+            raise ValueError("Длина вектора единиц {} не совпадает с числом "
+                             "строк {}".format(unit.shape, len(df)))
+    df = df.copy()
+    if columns is None:
+        columns = analyte_columns(df)
+    renames = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        col_unit = unit.get(col) if isinstance(unit, dict) else unit
+        if vector:
+            values = normalize(df[col], col_unit, to_unit)
+        elif (to_unit is None or col_unit is None
+              or canonical_unit(col_unit) == canonical_unit(to_unit)):
+            values = to_numeric(df[col])
+        else:
+            values = normalize(df[col], col_unit, to_unit)
+        if as_elements:
+            comp = oxide_composition(col)
+            if comp is not None:
+                values = values * oxide_factor(col)
+                symbol = comp[0]
+                if symbol not in df.columns and symbol not in renames.values():
+                    renames[col] = symbol
+        df[col] = values
+    if renames:
+        df.rename(columns=renames, inplace=True)
+    return df
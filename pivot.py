@@ -0,0 +1,156 @@
+"""
+Сводные таблицы «образец x элемент» из длинных строк измерений.
+
+Строки (участок, образец, элемент, значение), полученные из SPARQL,
+накапливаются в типизированных массивах, а широкая таблица строится
+одним векторным присваиванием NumPy. Порядок столбцов элементов
+стабилен: по атомному номеру, прочие столбцы - по алфавиту.
+
+Отсутствующее измерение и цензурированное (значение ниже предела
+обнаружения) различаются: первое остаётся пустым, второе заполняется
+значением censored_value (по умолчанию 0.0).
+
+Пример использования:
+    table = PivotTable()
+    for row in pollution_data(query_sample_data, site):
+        table.add(row.site_name, row.uri, row.sample_name,
+                  row.element, row.value)
+    table.write("site.xlsx")
+"""
+
+import csv
+import os.path
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from elements import ELEMENTS
+
+INDEX_COLUMNS = ["sample", "site"]
+
+
+def column_name(iri):
+    """Возвращает имя столбца по IRI элемента (фрагмент или последний сегмент)."""
+    iri = str(iri)
+    for sep in ("#", "/"):
+        if sep in iri:
+            return iri.rsplit(sep, 1)[1]
+    return iri
+
+
+def column_key(name):
+    """Ключ сортировки столбцов: элементы по атомному номеру, затем прочие."""
+    entry = ELEMENTS.get(name)
+    if entry is not None:
+        return (0, entry[0], name)
+    return (1, 0, name)
+
+
+def parse_value(value):
+    """
+    Преобразует значение измерения в float.
+
+    Returns:
+        tuple: (значение, признак цензурирования). Значение, не являющееся
+        числом (узел предела обнаружения, строка '<0.1'), считается
+        цензурированным.
+    """
+    try:
+        return float(str(value).replace(",", ".")), False
+    except ValueError:
+        return np.nan, True
+
+
+class PivotTable:
+    """
+    Накопитель измерений для сводной таблицы.
+
+    Args:
+        censored_value (float): Значение для цензурированных измерений.
+        missing_value (float): Значение для отсутствующих измерений
+            (NaN - пустая ячейка).
+    """
+
+    def __init__(self, censored_value=0.0, missing_value=np.nan):
+        self.censored_value = censored_value
+        self.missing_value = missing_value
+        self.samples = {}  # ключ образца -> номер строки
+        self.sample_index = []  # (образец, участок) по номеру строки
+        self.columns = {}  # имя столбца -> номер
+        self.rows = array("l")
+        self.cols = array("l")
+        self.values = array("d")
+        self.censored = array("b")
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, site, key, sample, element, value):
+        """
+        Добавляет одно измерение.
+
+        Args:
+            site: Название участка.
+            key: Уникальный ключ образца (IRI).
+            sample: Название образца.
+            element: IRI элемента или имя столбца.
+            value: Значение измерения.
+        """
+        row = self.samples.get(key)
+        if row is None:
+            row = self.samples[key] = len(self.sample_index)
+            self.sample_index.append((sample, site))
+        name = column_name(element)
+        col = self.columns.get(name)
+        if col is None:
+            col = self.columns[name] = len(self.columns)
+        v, censored = parse_value(value)
+        self.rows.append(row)
+        self.cols.append(col)
+        self.values.append(v)
+        self.censored.append(censored)
+
+    def to_frame(self):
+        """
+        Строит широкую таблицу.
+
+        Повторное измерение того же элемента в образце заменяет предыдущее.
+
+        Returns:
+            DataFrame: Столбцы sample, site и элементы в стабильном порядке.
+        """
+        names = sorted(self.columns, key=column_key)
+        order = np.empty(len(self.columns), dtype=np.intp)
+        for i, name in enumerate(names):
+            order[self.columns[name]] = i
+
+        rows = np.frombuffer(self.rows, dtype=self.rows.typecode)
+        cols = order[np.frombuffer(self.cols, dtype=self.cols.typecode)]
+        values = np.frombuffer(self.values, dtype=float).copy()
+        censored = np.frombuffer(self.censored, dtype=np.int8).astype(bool)
+        values[censored] = self.censored_value
+
+        matrix = np.full((len(self.sample_index), len(names)),
+                         self.missing_value, dtype=float)
+        matrix[rows, cols] = values
+
+        index = pd.DataFrame(self.sample_index, columns=INDEX_COLUMNS)
+        data = pd.DataFrame(matrix, columns=names)
+        return pd.concat([index, data], axis=1)
+
+    def write(self, filename):
+        """Записывает таблицу в файл; формат определяется расширением."""
+        df = self.to_frame()
+        ext = os.path.splitext(filename)[1].lower()
+        if ext == ".parquet":
+            df.to_parquet(filename, index=False)
+        elif ext == ".xlsx":
+            df.to_excel(filename, index=False)
+        elif ext == ".csv":
+            df.to_csv(filename, index=False, quoting=csv.QUOTE_NONNUMERIC)
+        else:
+            raise ValueError("Неизвестный формат таблицы: {}".format(filename))
+        print("WROTE: {} ({} samples, {} columns)".format(
+            filename, len(df), len(df.columns) - len(INDEX_COLUMNS)))
+        return df
@@ -0,0 +1,170 @@
+"""
+Профилирование импорта по этапам.
+
+Профилировщик подключается к instrument.TRACER и включается на время
+каждого этапа (span), кроме группирующих (трубка, лист) и вложенных в уже
+профилируемый этап. Повторные вызовы одного этапа (например, импорт
+таблицы oxides для каждой трубки) накапливаются в одном профиле.
+
+Виды профилирования:
+- cprofile: <этап>.prof (pstats, snakeviz) и самые затратные функции;
+- pyinstrument: <этап>.html (нужен пакет pyinstrument);
+- tracemalloc: <этап>.txt - места выделения памяти за время этапа.
+
+Результаты записываются в каталог запуска вместе с отчётом instrument.
+
+Из командной строки импортёров:
+    python alrosa_importer.py --profile cprofile [--profile-dir DIR] [--profile-top N]
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from collections import Counter
+
+from instrument import TRACER
+
+KINDS = ("cprofile", "pyinstrument", "tracemalloc")
+TOP = 20
+
+
+def stage_filename(stage):
+    return re.sub(r"[^\w.-]+", "-", stage)
+
+
+class StageProfiler:
+    """
+    Профили этапов одного запуска.
+
+    Args:
+        kind (str): Вид профилирования (см. KINDS).
+        run_dir (str): Каталог для результатов.
+        top (int): Число строк в итоговых списках.
+    """
+
+    def __init__(self, kind, run_dir, top=TOP):
+        if kind not in KINDS:
+            raise ValueError("unknown profiler: {}".format(kind))
+        if kind == "pyinstrument":
+            import pyinstrument  # noqa: F401 Проверка наличия до начала работы
+        self.kind = kind
+        self.run_dir = run_dir
+        self.top = top
+        self.stages = {}
+        self.active = None
+        self._snapshot = None
+        os.makedirs(run_dir, exist_ok=True)
+        if kind == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self, stage):
+        """Включает профиль этапа; False, если уже профилируется другой."""
+        if self.active is not None:
+            return False
+        self.active = stage
+        if self.kind == "cprofile":
+            self.stages.setdefault(stage, cProfile.Profile()).enable()
+        elif self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self.stages.setdefault(stage, Profiler()).start()
+        else:
+            self._snapshot = self.snapshot()
+        return True
+
+    def end(self, stage):
+        if self.kind == "cprofile":
+            self.stages[stage].disable()
+        elif self.kind == "pyinstrument":
+            self.stages[stage].stop()
+        else:
+            diff = self.snapshot().compare_to(self._snapshot, "lineno")
+            sizes = self.stages.setdefault(stage, Counter())
+            for stat in diff:
+                if stat.size_diff > 0:
+                    sizes[str(stat.traceback)] += stat.size_diff
+            self._snapshot = None
+        self.active = None
+
+    @staticmethod
+    def snapshot():
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    def dump(self):
+        """Записывает профили этапов в каталог запуска и печатает итоги."""
+        getattr(self, "dump_" + self.kind)()
+        TRACER.write_report(os.path.join(self.run_dir, "report.json"))
+        print("#!INFO: profiles written to {}".format(self.run_dir))
+
+    def dump_cprofile(self):
+        merged = None
+        for stage, prof in self.stages.items():
+            prof.dump_stats(os.path.join(self.run_dir,
+                                         stage_filename(stage) + ".prof"))
+            stats = pstats.Stats(prof)
+            print("#!INFO: stage {}: {:.3f}s".format(stage, stats.total_tt))
+            if merged is None:
+                merged = stats
+            else:
+                merged.add(stats)
+        if merged is None:
+            return
+        out = io.StringIO()
+        merged.stream = out
+        merged.sort_stats("tottime").print_stats(self.top)
+        print("#!INFO: top {} functions by own time:".format(self.top))
+        print(out.getvalue())
+
+    def dump_pyinstrument(self):
+        for stage, prof in self.stages.items():
+            with open(os.path.join(self.run_dir,
+                                   stage_filename(stage) + ".html"), "w") as o:
+                o.write(prof.output_html())
+        if not self.stages:
+            return
+        slowest = max(self.stages,
+                      key=lambda s: self.stages[s].last_session.duration)
+        print("#!INFO: slowest stage {}:".format(slowest))
+        print(self.stages[slowest].output_text(unicode=True, color=False))
+
+    def dump_tracemalloc(self):
+        total = Counter()
+        for stage, sizes in self.stages.items():
+            total.update(sizes)
+            with open(os.path.join(self.run_dir,
+                                   stage_filename(stage) + ".txt"), "w") as o:
+                for site, size in sizes.most_common():
+                    o.write("{:>12} {}\n".format(size, site))
+        current, peak = tracemalloc.get_traced_memory()
+        print("#!INFO: traced memory {:.1f} MiB, peak {:.1f} MiB".format(
+            current / 2**20, peak / 2**20))
+        print("#!INFO: top {} allocation sites:".format(self.top))
+        for site, size in total.most_common(self.top):
+            print("#!INFO:   {:>10.1f} KiB {}".format(size / 1024, site))
+
+
+def add_arguments(parser):
+    """Добавляет параметры профилирования в argparse."""
+    parser.add_argument("--profile", choices=KINDS,
+                        help="Профилировать этапы импорта")
+    parser.add_argument("--profile-dir",
+                        help="Каталог для профилей (по умолчанию profile-<время>)")
+    parser.add_argument("--profile-top", type=int, default=TOP,
+                        help="Число функций или мест выделения памяти в итогах")
+
+
+def setup_from_args(args):
+    """Подключает профилировщик к TRACER по параметрам add_arguments()."""
+    if not args.profile:
+        return None
+    run_dir = args.profile_dir or time.strftime("profile-%Y%m%d-%H%M%S")
+    try:
+        TRACER.profiler = StageProfiler(args.profile, run_dir, args.profile_top)
+    except ImportError as e:
+        raise SystemExit("#!ERROR: --profile {}: {}".format(args.profile, e))
+    return TRACER.profiler
@@ -1,11 +1,12 @@
 #!/bin/env python
-from common import NTQuery, SAMPLEGRAPH, quicktest
-from rdflib import URIRef
+import os.path
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import CLIENT, NTQuery, SAMPLEGRAPH, quicktest
 from namespace import PT, P, MT
-from collections import namedtuple
-import pprint
-import csv
-import sys
+from pivot import PivotTable
 
 query_sample_data = """
     # SELECT *
@@ -59,18 +60,118 @@ query_sample_data_with_coords = """
 """
 
 
-def pollution_data(query, site, element=None):
+query_root_sites = """
+    SELECT DISTINCT ?name
+    FROM <{graph}>
+    WHERE {{
+       ?site a pt:Site .
+       ?site rdfs:label ?name .
+       FILTER (lang(?name) = "ru")
+       FILTER NOT EXISTS {{
+          ?site pt:location ?parent .
+          ?parent a pt:Site .
+       }}
+    }}
+    """
+
+# Размер страницы выборки; меньше ResultSetMaxRows точки доступа Virtuoso
+PAGE_SIZE = 5000
+
+
+def pollution_data(query, site, element=None, page_size=PAGE_SIZE,
+                   executor=None):
     samples = query
 
     if element is not None:
-        qs = NTQuery(samples, SAMPLEGRAPH, site=site, element=element.n3())
+        qs = NTQuery(samples, SAMPLEGRAPH, site=site, element=element.n3(),
+                     page_size=page_size, executor=executor)
     else:
-        qs = NTQuery(samples, SAMPLEGRAPH, site=site, element=None)
+        qs = NTQuery(samples, SAMPLEGRAPH, site=site, element=None,
+                     page_size=page_size, executor=executor)
 
     # qs.print()
     return qs.results()
 
 
+def discover_sites():
+    """Возвращает названия корневых участков (pt:Site, не входящих в другой участок)."""
+    qs = NTQuery(query_root_sites, SAMPLEGRAPH, page_size=PAGE_SIZE)
+    return sorted(row.name for row in qs.results())
+
+
+def site_filename(site, outdir, ext):
+    """Имя файла выгрузки участка; недопустимые в имени символы заменяются на '_'."""
+    name = re.sub(r"[^\w.-]+", "_", site).strip("_") or "site"
+    return os.path.join(outdir, name + ext)
+
+
+def export_site(site, filename, censored_value=0.0, executor=None):
+    """
+    Выгружает сводную таблицу одного участка в файл.
+
+    executor - общий пул для загрузки страниц (см. export_sites()).
+
+    Returns:
+        dict: Отчёт - участок, файл, число строк и образцов, время (с).
+    """
+    start = time.perf_counter()
+    table = PivotTable(censored_value=censored_value)
+    for row in pollution_data(query_sample_data, site, None,
+                              executor=executor):
+        table.add(row.site_name, row.uri, row.sample_name,
+                  row.element, row.value)
+    fetched = time.perf_counter()
+    if len(table):
+        table.write(filename)
+    return {
+        "site": site,
+        "file": filename if len(table) else None,
+        "rows": len(table),
+        "samples": len(table.sample_index),
+        "query": fetched - start,
+        "total": time.perf_counter() - start,
+    }
+
+
+def export_sites(sites, outdir, ext=".csv", jobs=4, censored_value=0.0):
+    """
+    Выгружает участки параллельно, каждый в свой файл.
+
+    Не более jobs участков запрашиваются одновременно; ошибка одного
+    участка не прерывает остальные. Страницы всех участков загружаются в
+    одном пуле размером с пул соединений клиента (CLIENT.pool_size), поэтому
+    одновременных запросов не больше, чем соединений.
+
+    Returns:
+        list: Отчёты export_site() в порядке sites (с полем error при ошибке).
+    """
+    os.makedirs(outdir, exist_ok=True)
+
+    def run(site):
+        try:
+            return export_site(site, site_filename(site, outdir, ext),
+                               censored_value, pages)
+        except Exception as e:
+            return {"site": site, "file": None, "rows": 0, "samples": 0,
+                    "query": 0.0, "total": 0.0, "error": repr(e)}
+
+    with ThreadPoolExecutor(max_workers=CLIENT.pool_size) as pages, \
+            ThreadPoolExecutor(max_workers=jobs) as ex:
+        return list(ex.map(run, sites))
+
+
+def print_report(reports, elapsed):
+    """Печатает время и число строк по участкам."""
+    print("{:<40} {:>8} {:>8} {:>9} {:>9}".format(
+        "site", "rows", "samples", "query,s", "total,s"))
+    for r in reports:
+        print("{:<40} {:>8} {:>8} {:>9.2f} {:>9.2f}{}".format(
+            r["site"], r["rows"], r["samples"], r["query"], r["total"],
+            "  ERROR " + r["error"] if "error" in r else ""))
+    print("{} sites, {} rows in {:.2f}s".format(
+        len(reports), sum(r["rows"] for r in reports), elapsed))
+
+
 # quicktest("""
 #     SELECT *
 #     FROM <{graph}>
@@ -86,52 +187,54 @@ def pollution_data(query, site, element=None):
 # quicktest(query_sample_data, SAMPLEGRAPH, site="Бураевская площадь",
 #          element = MT.Ga.n3(), debug=True)
 
+def export_sites_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="q_test.py export-sites",
+        description="Параллельная выгрузка участков, каждый в свой файл")
+    parser.add_argument("sites", nargs="*",
+                        help="Названия участков (по умолчанию все корневые)")
+    parser.add_argument("-d", "--outdir", default=".",
+                        help="Каталог выгрузки")
+    parser.add_argument("-f", "--format", default="csv",
+                        choices=["csv", "parquet", "xlsx"])
+    parser.add_argument("-j", "--jobs", type=int, default=4,
+                        help="Число одновременно выгружаемых участков")
+    parser.add_argument("--censored", type=float, default=0.0,
+                        help="Значение для измерений ниже предела обнаружения")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sites = args.sites or discover_sites()
+    print("Exporting {} sites".format(len(sites)))
+    reports = export_sites(sites, args.outdir, "." + args.format, args.jobs,
+                           args.censored)
+    print_report(reports, time.perf_counter() - start)
+
+
 if __name__ == "__main__":
-    tbl = {}
-    headers = set(['sample', 'site'])
-
-    def u(s):
-        if s.startswith("http"):
-            return URIRef(s)
-        return s
-#    for row in pollution_data(query_sample_data,
-#                              "Бураевская площадь", None):
-
-    for row in pollution_data(query_sample_data, sys.argv[1], None):
-        sample = u(row.uri)
-        element = u(row.element)
-        headers.add(element)
-        s = tbl.setdefault(sample, {
-            "sample": row.sample_name,
-            "site": row.site_name
-        })
-        try:
-            s[element] = float(row.value)
-        except ValueError:
-            s[element] = 0.0
+    import argparse
+    import sys
+
+    if sys.argv[1:2] == ["export-sites"]:
+        export_sites_main(sys.argv[2:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(
+        description="Выгрузка сводной таблицы образцов по участкам")
+    parser.add_argument("sites", nargs="+", help="Названия участков")
+    parser.add_argument("output",
+                        help="Файл таблицы (.csv, .parquet или .xlsx)")
+    parser.add_argument("--censored", type=float, default=0.0,
+                        help="Значение для измерений ниже предела обнаружения")
+    args = parser.parse_args()
+
+    table = PivotTable(censored_value=args.censored)
+    for site in args.sites:
+        for row in pollution_data(query_sample_data, site, None):
+            table.add(row.site_name, row.uri, row.sample_name,
+                      row.element, row.value)
         # Row(uri='http://crust.irk.ru/ontology/pollution/1.0/2464-1', site_name='Ивановский', sample_name='2464-1', element='http://www.daml.org/2003/01/periodictable/PeriodicTable#V', value='4.2999999999999998224', unitid='http://crust.irk.ru/ontology/pollution/terms/1.0/PPM', unit='мг/кг')
 
-    with open(sys.argv[2], "w") as o:
-        wr = csv.writer(o, quotechar='"', quoting=csv.QUOTE_STRINGS)
-
-        def fr(row):
-            for e in row:
-                # print(e, type(e))
-                if isinstance(e, URIRef):
-                    yield e.fragment
-                else:
-                    yield e
-
-        h = fr(headers)
-        # wr.writerow(headers)
-        wr.writerow(h)
-
-        def g(headers, row):
-            for h in headers:
-                if h in row:
-                    yield row[h]
-                else:
-                    yield 0.0
-
-        for sample, row in tbl.items():
-            wr.writerow(g(headers, row))
+    table.write(args.output)
@@ -0,0 +1,287 @@
+"""
+Версии схемы SQL-хранилища трубок и планы типичных запросов.
+
+Схема описывается моделями alrosa_models; индексы объявлены в их
+__table_args__. create_all() создаёт индексы только вместе с новой
+таблицей, поэтому базы, созданные до появления индекса, дополняются
+миграциями. Применённые миграции записываются в таблицу
+schema_migrations; upgrade() применяет недостающие по порядку номеров.
+
+Новая миграция добавляется в конец MIGRATIONS функцией от соединения,
+ранее выпущенные миграции не изменяются.
+
+Индексы под типичные запросы (ANALYTIC_QUERIES):
+- (pipe_uuid, sample_id) - строки пробы в таблицах по трубке;
+- grains(sample_id, grain_name) - уникальное ограничение uix_sample_grain
+  (в SQLite - sqlite_autoindex_grains_2), отдельный индекс по sample_id
+  не нужен;
+- epma_analyses(grain_id), lam_analyses(grain_id) - анализы зерна;
+- epma_analyses(mineral), oxides(pipe_uuid, mineral) - фильтр минерала;
+- частичные индексы epma_analyses по cr2o3 (Gar, Chr) и mgo (Ilm) -
+  условие запроса должно буквально совпадать с условием индекса;
+- measurements(analyte, pipe_uuid, value) - значения элемента по всем
+  таблицам анализов одним проходом по индексу.
+
+Таблица measurements (alrosa_models.Measurement) обновляется импортом
+для каждой трубки; после ручных правок широких таблиц её пересобирают:
+    python schema.py sqlite:///tubes.db --refresh-measurements [--pipe UUID]
+
+Планы SQLite (python schema.py sqlite:///tubes.db):
+
+    garnets_cr2o3
+      SEARCH e USING INDEX ix_epma_garnet_cr2o3 (cr2o3>?)
+      SEARCH g USING INDEX sqlite_autoindex_grains_1 (id=?)
+      SEARCH s USING INDEX sqlite_autoindex_samples_1 (id=?)
+    chromites_cr2o3
+      SEARCH epma_analyses USING INDEX ix_epma_chromite_cr2o3 (cr2o3>?)
+    oxides_by_sample
+      SEARCH oxides USING INDEX ix_oxides_pipe_sample (pipe_uuid=? AND sample_id=?)
+    minerals_by_pipe
+      SEARCH oxides USING COVERING INDEX ix_oxides_pipe_mineral (pipe_uuid=?)
+    grains_by_sample
+      SEARCH grains USING INDEX sqlite_autoindex_grains_2 (sample_id=?)
+    epma_by_grain
+      SEARCH epma_analyses USING INDEX ix_epma_grain_id (grain_id=?)
+    lam_by_grain
+      SEARCH lam_analyses USING INDEX ix_lam_grain_id (grain_id=?)
+    analyte_by_pipe
+      SEARCH measurements USING INDEX ix_measurements_analyte_pipe (analyte=? AND pipe_uuid=?)
+    analyte_values
+      SEARCH measurements USING COVERING INDEX ix_measurements_analyte_pipe (analyte=?)
+
+В PostgreSQL планы зависят от статистики (ANALYZE): на малых таблицах
+планировщик предпочитает Seq Scan.
+"""
+
+import argparse
+import datetime
+import uuid
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    select,
+    text,
+)
+from sqlalchemy.engine import Engine
+
+from alrosa_models import CHROMITE, GARNET, Base, Measurement, PipeImport
+from logs import get_logger
+
+log = get_logger("schema")
+
+# Отдельные метаданные: таблица версий не входит в модели.
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def create_tables(connection):
+    """Таблицы моделей (существующие не изменяются)."""
+    Base.metadata.create_all(connection)
+
+
+def create_indexes(connection):
+    """Индексы моделей в таблицах, созданных до их объявления."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def create_measurements(connection):
+    """Таблица измерений в длинном формате, заполненная из широких таблиц."""
+    Measurement.__table__.create(connection, checkfirst=True)
+    for index in Measurement.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    Measurement.refresh(connection)
+
+
+def create_pipe_imports(connection):
+    """Учёт импорта трубок для сброса кэшей читателей (alrosa_query)."""
+    PipeImport.__table__.create(connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "fk, composite and partial indexes", create_indexes),
+    (3, "measurements fact table", create_measurements),
+    (4, "pipe import bookkeeping", create_pipe_imports),
+]
+
+
+def applied_versions(connection):
+    metadata.create_all(connection)
+    return {
+        row.version for row in connection.execute(schema_migrations.select())
+    }
+
+
+def upgrade(engine):
+    """
+    Применяет недостающие миграции.
+
+    Args:
+        engine: Engine или строка подключения.
+
+    Returns:
+        list - номера применённых миграций
+    """
+    if not isinstance(engine, Engine):
+        engine = create_engine(engine)
+    applied = []
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            log.info("schema migration %s: %s", version, name)
+            migrate(connection)
+            connection.execute(
+                schema_migrations.insert().values(
+                    version=version,
+                    name=name,
+                    applied_at=datetime.datetime.now(datetime.timezone.utc),
+                )
+            )
+            applied.append(version)
+    return applied
+
+
+_UPGRADED = set()
+
+
+def ensure_schema(connection_string):
+    """upgrade() один раз за процесс для каждой базы."""
+    if connection_string not in _UPGRADED:
+        upgrade(connection_string)
+        _UPGRADED.add(connection_string)
+
+
+# Типичные аналитические запросы; параметры - для EXPLAIN.
+ANALYTIC_QUERIES = {
+    "garnets_cr2o3": (
+        "SELECT s.sample_name, g.grain_name, e.cr2o3 "
+        "FROM epma_analyses e "
+        "JOIN grains g ON g.id = e.grain_id "
+        "JOIN samples s ON s.id = g.sample_id "
+        "WHERE s.pipe_uuid = :pipe AND e.mineral = '{}' AND e.cr2o3 > :x".format(GARNET)
+    ),
+    "chromites_cr2o3": (
+        "SELECT grain_id, cr2o3 FROM epma_analyses "
+        "WHERE mineral = '{}' AND cr2o3 > :x".format(CHROMITE)
+    ),
+    "oxides_by_sample": (
+        "SELECT * FROM oxides WHERE pipe_uuid = :pipe AND sample_id = :sample"
+    ),
+    "minerals_by_pipe": (
+        "SELECT mineral, count(*) FROM oxides WHERE pipe_uuid = :pipe "
+        "GROUP BY mineral"
+    ),
+    "grains_by_sample": (
+        "SELECT id, grain_name FROM grains WHERE sample_id = :sample_uuid"
+    ),
+    "epma_by_grain": "SELECT * FROM epma_analyses WHERE grain_id = :grain",
+    "lam_by_grain": "SELECT * FROM lam_analyses WHERE grain_id = :grain",
+    "analyte_by_pipe": (
+        "SELECT source_table, value, unit FROM measurements "
+        "WHERE analyte = :analyte AND pipe_uuid = :pipe"
+    ),
+    "analyte_values": (
+        "SELECT pipe_uuid, value FROM measurements WHERE analyte = :analyte"
+    ),
+}
+
+EXAMPLE_PARAMETERS = {
+    "pipe": uuid.UUID(int=0).hex,
+    "sample": "1",
+    "sample_uuid": uuid.UUID(int=0).hex,
+    "grain": uuid.UUID(int=0).hex,
+    "x": 5.0,
+    "analyte": "Ni",
+}
+
+
+def explain(engine, queries=ANALYTIC_QUERIES, analyze=True):
+    """
+    Планы выполнения запросов.
+
+    При analyze=True сначала собирается статистика (ANALYZE): без неё
+    SQLite выбирает индекс по mineral вместо частичного.
+
+    Returns:
+        dict - имя запроса -> список строк плана
+    """
+    if not isinstance(engine, Engine):
+        engine = create_engine(engine)
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    plans = {}
+    if analyze:
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+    with engine.connect() as connection:
+        for name, sql in queries.items():
+            rows = connection.execute(text(prefix + sql), EXAMPLE_PARAMETERS)
+            plans[name] = [row[-1] for row in rows]
+    return plans
+
+
+def refresh_measurements(engine, pipe_uuid=None):
+    """
+    Пересобирает таблицу measurements (аналог REFRESH MATERIALIZED VIEW).
+
+    Ревизии пересобранных трубок увеличиваются (PipeImport.record()),
+    чтобы кэш читателей (alrosa_query) устарел.
+    """
+    if not isinstance(engine, Engine):
+        engine = create_engine(engine)
+    with engine.begin() as connection:
+        n = Measurement.refresh(connection, pipe_uuid)
+        if pipe_uuid is not None:
+            pipes = [pipe_uuid]
+        else:
+            table = Measurement.__table__
+            pipes = connection.execute(
+                select(table.c.pipe_uuid).distinct()).scalars().all()
+        for pipe in pipes:
+            PipeImport.record(connection, pipe)
+        return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Миграции схемы хранилища трубок, обновление measurements "
+        "и планы запросов"
+    )
+    parser.add_argument("url", nargs="?", default="sqlite:///tubes.db",
+                        help="Строка подключения SQLAlchemy")
+    parser.add_argument("--no-upgrade", action="store_true",
+                        help="Только показать планы, не применяя миграции")
+    parser.add_argument("--refresh-measurements", action="store_true",
+                        help="Пересобрать таблицу measurements из таблиц анализов")
+    parser.add_argument("--pipe", help="UUID трубки для --refresh-measurements")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    if not args.no_upgrade:
+        print("#!INFO: applied migrations: {}".format(upgrade(engine) or "none"))
+    if args.refresh_measurements:
+        n = refresh_measurements(engine, args.pipe)
+        print("#!INFO: {} measurements refreshed".format(n))
+    for name, plan in explain(engine).items():
+        print(name)
+        for line in plan:
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    main()
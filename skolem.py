@@ -0,0 +1,60 @@
+"""
+Детерминированные IRI вместо пустых узлов (сколемизация).
+
+Узлы измерений, пределов обнаружения, локаций и разделов описания трубок
+раньше создавались как BNode() со случайными идентификаторами, поэтому
+повторный импорт тех же данных давал другой граф. Здесь идентификатор
+узла выводится из его содержимого (родительский узел, вид узла, раздел,
+столбец и т.п.) через UUID v5, и повторный импорт даёт тот же граф.
+Такие узлы можно заменять на месте при инкрементальной загрузке.
+
+IRI имеют вид .well-known/genid/<вид>/<uuid> (RDF 1.1, раздел 3.5).
+
+Пример использования:
+    m = skolem_iri(analysis, "measurement", field="SiO2")
+"""
+
+import uuid
+
+from rdflib import URIRef
+
+SKOLEM_BASE = "http://crust.irk.ru/.well-known/genid/"
+
+
+def generate_deterministic_uuid(
+    pipe_name: str = "",
+    namespace: str = "http://crust.irk.ru/ontology/contents/1.0/",
+    pipe_uuid: str = "",
+    **kwargs,
+) -> uuid.UUID:
+    """
+    Генерирует детерминированный UUID v5 на основе имени трубки (и/или UUID) и дополнительных данных
+    """
+    # Создаем UUID v5 на основе пространства имен и имени
+    namespace_uuid = uuid.NAMESPACE_DNS  # Или можно создать свой
+    uuid_additional_data = ""
+    for key, value in kwargs.items():
+        uuid_additional_data += f"{str(key)}:{str(value)}"
+    new_pipe_uuid = uuid.uuid5(
+        namespace_uuid, f"{namespace}{pipe_name}{str(pipe_uuid)}{uuid_additional_data}"
+    )
+    return new_pipe_uuid
+
+
+def skolem_iri(parent, kind, **parts):
+    """
+    Возвращает детерминированный IRI узла.
+
+    Args:
+        parent: Узел, к которому относится новый (IRI или строка).
+        kind (str): Вид узла, например 'measurement', 'location'.
+        **parts: Значения, отличающие узел от других узлов того же вида
+            у того же родителя (раздел, столбец, значение).
+
+    Returns:
+        URIRef: SKOLEM_BASE + kind + '/' + UUID v5.
+    """
+    node_uuid = generate_deterministic_uuid(str(parent),
+                                            namespace=SKOLEM_BASE + kind,
+                                            **parts)
+    return URIRef("{}{}/{}".format(SKOLEM_BASE, kind, node_uuid))
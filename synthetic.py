@@ -0,0 +1,318 @@
+"""
+Синтетические данные для замеров производительности импорта.
+
+Реальные таблицы (``tubes.xlsx``, листы GEOROC) в репозиторий не входят,
+поэтому здесь генерируются книги той же структуры заданного размера:
+
+- tube_workbook(): книга openpyxl с листами трубок в том виде, который
+  разбирает alrosa_importer.import_excel_table_into_dict() - заголовки
+  разделов в столбце A ("Целевой показатель", "Геология",
+  "Оливины I-генерации", "алмазная ассоциация"), табличные разделы
+  (флогопит, изотопия, EPMA, LAM ICP, МИКРОАЛМАЗЫ, МИКРООКСИДЫ) и
+  транспонированные (Петрохимия, Геохимия); плюс лист "ценник".
+- georock_rows(): строки листа в стиле GEOROC для i_pol (SAMPLE_NAME,
+  LOCATION, координаты, оксиды в WT%, элементы в PPM, LOI).
+- SyntheticSheet: эти строки как лист xlrd (sh.row(), nrows, ncols) без
+  записи файла; write_georock_xls() записывает их в .xls (нужен xlwt).
+
+Значения псевдослучайные с фиксированным seed, поэтому при тех же
+параметрах данные одинаковы.
+
+Из командной строки:
+    python synthetic.py tubes.xlsx --tubes 20 --samples 200
+    python synthetic.py georock.xls --georock 5000
+"""
+
+import random
+
+import xlrd
+
+# Названия признаков в разделах трубки
+TARGET = ["A", "B", "C", "D", "E"]
+GEOLOGY = ["Форма тела", "Возраст, млн лет", "Перекрытие", "Площадь", "Размер"]
+OLIVINE = ["1-2 мм", "2-4 мм", "4-8 мм", "8-16 мм"]
+ASSOC = [
+    "алмазная ассоциация gar (по Соболев 1974) % от перидотитовых gar (по Shulze 2003)",
+    "G10 %",
+    "G10D %",
+    "G3D %",
+    "G4D %",
+    "G5D %",
+    "Cr2O3 > 5 мас.% %",
+]
+
+OXIDES = ["SiO2", "TiO2", "Al2O3", "FeO", "MgO", "CaO", "Na2O", "K2O", "MnO",
+          "P2O5", "Cr2O3", "NiO"]
+TRACES = ["Rb", "Sr", "Ba", "Zr", "Hf", "Nb", "Ta", "Th", "U", "La", "Ce",
+          "Nd", "Sm", "Eu", "Yb", "Lu", "Sc", "V", "Cr", "Co", "Ni", "Y"]
+DIAMOND_FRACTIONS = ["75", "100/75", "150/100", "250/150", "500/250"]
+
+# Табличные разделы: заголовок -> столбцы
+PHLOGOPITE = ["Образец", "точки", "минерал", "Источник", "Порода"] + OXIDES + [
+    "BaO", "F", "Total"]
+ISOTOPIC = ["Образец", "Источник", "Rb ppm", "Sr ppm", "Sm ppm", "Nd ppm",
+            "87Sr/86Sr", "2σ", "143Nd/144Nd", "2σ", "Возраст, млн"]
+EPMA = ["Лаборатория", "шашка", "зерно", "Порода", "минерал", "глубина",
+        "класс"] + OXIDES + ["Сумма"]
+LAM = ["шашка", "зерно", "порода"] + TRACES
+DIAMONDS = ["пробы", "скважина", "порода", "Интервал", "Исход вес, кг",
+            "Выход кислотного концентрата, кг", "Выход тяжелой фракции, г"
+            ] + DIAMOND_FRACTIONS
+MICROOXIDES = ["Образец", "точки", "минерал", "Источник", "Порода"] + OXIDES + [
+    "V2O3", "ZnO", "Total"]
+# Транспонированные разделы: строки-параметры
+PETROCHEMY = ["Образец", "Скважина", "Порода", "Источник"] + OXIDES + [
+    "Fe2O3", "H2O", "Ппп", "Сумма"]
+GEOCHEMY = ["Образец", "Скважина", "Порода", "Источник"] + TRACES
+
+GEOROC_HEADER = (["SAMPLE_NAME", "LOCATION", "LATITUDE_MIN", "LONGITUDE_MIN"]
+                 + ["{}(WT%)".format(o.upper()) for o in OXIDES]
+                 + ["{}(PPM)".format(e.upper()) for e in TRACES
+                    if e not in ("Cr", "Ni")]
+                 + ["CR(PPM)", "NI(PPM)", "LOI(WT%)"])
+GEOROC_LOCATIONS = ["Udachnaya", "Udachnaya / Mir", "Mir", "Internatsionalnaya"]
+
+
+class TubeGenerator:
+    """
+    Генератор листов трубок.
+
+    Args:
+        samples (int): Число строк в табличных разделах (и образцов в
+            транспонированных).
+        grains (int): Число зёрен на шашку в EPMA/LAM.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+
+    def __init__(self, samples=50, grains=5, seed=0):
+        self.samples = samples
+        self.grains = grains
+        self.rng = random.Random(seed)
+
+    def value(self, name, i):
+        """Значение столбца name для i-й строки."""
+        r = self.rng
+        if name in ("Образец", "пробы"):
+            return "obr-{}".format(i)
+        if name in ("Порода", "порода"):
+            return r.choice(["кимберлит", "автолит", "ксенолит"])
+        if name in ("Скважина", "скважина"):
+            return "скв. {}".format(100 + i % 17)
+        if name in ("Источник", "Лаборатория"):
+            return "ЦАЛ"
+        if name in ("минерал",):
+            return r.choice(["Gar", "Chr", "Ilm", "Cpx"])
+        if name == "точки":
+            return i % 10 + 1
+        if name == "Интервал":
+            return "{}-{}".format(10 * i, 10 * i + 10)
+        if name == "класс":
+            return "-1+0,5"
+        if name == "глубина":
+            return round(r.uniform(50, 900), 1)
+        if name in OXIDES or name in ("BaO", "F", "Fe2O3", "H2O", "V2O3",
+                                      "ZnO", "Ппп"):
+            v = round(r.uniform(0.01, 45), 2)
+            # Цензурированные значения и десятичная запятая, как в исходных
+            # таблицах
+            if i % 23 == 5:
+                return "<0,01"
+            if i % 11 == 3:
+                return str(v).replace(".", ",")
+            return v
+        if name in TRACES or name.endswith("ppm"):
+            return round(r.lognormvariate(3, 1.5), 3)
+        if name in ("Total", "Сумма"):
+            return round(r.uniform(98, 101), 2)
+        if name in DIAMOND_FRACTIONS:
+            return r.choice([None, None, 1, 2, 3])
+        if name == "2σ":
+            return round(r.uniform(1e-6, 1e-4), 7)
+        if name.startswith("87Sr") or name.startswith("143Nd"):
+            return round(r.uniform(0.5, 0.71), 6)
+        return round(r.uniform(0, 100), 2)
+
+    def features(self, ws, row):
+        """Разделы-признаки; возвращает номер следующей свободной строки."""
+        r = self.rng
+        sections = [
+            ("Целевой показатель", TARGET,
+             [round(r.uniform(0, 10), 2) for _ in TARGET[:-1]] + ["E-класс"]),
+            ("Геология", GEOLOGY,
+             ["трубка", round(r.uniform(340, 380), 1), r.randint(0, 80),
+              round(r.uniform(1, 50), 1), "{} {}".format(r.randint(100, 900),
+                                                         r.randint(100, 900))]),
+            ("Оливины I-генерации", OLIVINE,
+             [round(r.uniform(0, 40), 1) for _ in OLIVINE]),
+        ]
+        for title, names, values in sections:
+            ws.cell(row=row, column=1, value=title)
+            for col, (name, value) in enumerate(zip(names, values), 1):
+                ws.cell(row=row + 1, column=col, value=name)
+                ws.cell(row=row + 2, column=col, value=value)
+            row += 4
+        # Алмазная ассоциация: названия в строке заголовка раздела
+        for col, name in enumerate(ASSOC, 1):
+            ws.cell(row=row, column=col, value=name)
+            ws.cell(row=row + 1, column=col, value=round(r.uniform(0, 30), 1))
+        return row + 3
+
+    def table(self, ws, row, title, columns, rows):
+        """Табличный раздел: заголовок, строка столбцов, строки данных."""
+        ws.cell(row=row, column=1, value=title)
+        for col, name in enumerate(columns, 1):
+            ws.cell(row=row + 1, column=col, value=name)
+        for i, values in enumerate(rows):
+            for col, value in enumerate(values, 1):
+                if value is not None:
+                    ws.cell(row=row + 2 + i, column=col, value=value)
+        return row + len(rows) + 3
+
+    def transposed(self, ws, row, title, parameters):
+        """Транспонированный раздел: параметры в строках, образцы в столбцах."""
+        ws.cell(row=row, column=1, value=title)
+        for j, name in enumerate(parameters):
+            ws.cell(row=row + 1 + j, column=1, value=name)
+            for i in range(self.samples):
+                ws.cell(row=row + 1 + j, column=2 + i, value=self.value(name, i))
+        return row + len(parameters) + 2
+
+    def rows(self, columns, n):
+        return [[self.value(name, i) for name in columns] for i in range(n)]
+
+    def grain_rows(self, columns):
+        """Строки EPMA/LAM: одинаковые пары (шашка, зерно) в обоих разделах."""
+        out = []
+        for i in range(self.samples):
+            values = [self.value(name, i) for name in columns]
+            values[columns.index("шашка")] = "ш-{}".format(i // self.grains)
+            values[columns.index("зерно")] = "з-{}".format(i % self.grains + 1)
+            out.append(values)
+        return out
+
+    def fill(self, ws):
+        """Заполняет лист трубки всеми разделами."""
+        n = self.samples
+        row = self.features(ws, 1)
+        row = self.table(ws, row, "Состав флогопита из основной массы",
+                         PHLOGOPITE, self.rows(PHLOGOPITE, n))
+        row = self.table(ws, row, "Изотопный состав", ISOTOPIC,
+                         self.rows(ISOTOPIC, n))
+        row = self.table(ws, row, "EPMA составы минералов", EPMA,
+                         self.grain_rows(EPMA))
+        row = self.table(ws, row, "LAM ICP составы гранатов", LAM,
+                         self.grain_rows(LAM))
+        row = self.table(ws, row, "МИКРОАЛМАЗЫ", DIAMONDS,
+                         self.rows(DIAMONDS, n))
+        row = self.table(ws, row, "МИКРООКСИДЫ", MICROOXIDES,
+                         self.rows(MICROOXIDES, n))
+        row = self.transposed(ws, row, "Петрохимия", PETROCHEMY)
+        row = self.transposed(ws, row, "Геохимия", GEOCHEMY)
+        return ws
+
+
+def tube_workbook(tubes=3, samples=50, grains=5, seed=0):
+    """
+    Книга openpyxl с листами трубок "1_1", "1_2", ... и листом "ценник".
+
+    Returns:
+        openpyxl.Workbook
+    """
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    price = wb.active
+    price.title = "ценник"
+    price.cell(row=1, column=1, value="Цена с НДС")
+    for t in range(tubes):
+        ws = wb.create_sheet("{}_{}".format(t // 10 + 1, t % 10 + 1))
+        TubeGenerator(samples, grains, seed + t).fill(ws)
+    return wb
+
+
+def georock_rows(n, seed=0):
+    """Строки листа в стиле GEOROC: заголовок и n образцов."""
+    r = random.Random(seed)
+    out = [list(GEOROC_HEADER)]
+    for i in range(n):
+        row = ["S-{}".format(i), GEOROC_LOCATIONS[i % len(GEOROC_LOCATIONS)],
+               round(66.4 + r.uniform(-0.5, 0.5), 4),
+               round(112.3 + r.uniform(-0.5, 0.5), 4)]
+        for name in GEOROC_HEADER[4:]:
+            if name == "LOI(WT%)":
+                row.append(round(r.uniform(0, 8), 2))
+            elif name.endswith("(WT%)"):
+                row.append(round(r.uniform(0.01, 45), 2))
+            elif i % 7 == 0:
+                row.append("<5")  # Ниже предела обнаружения
+            else:
+                row.append(round(r.lognormvariate(3, 1.5), 2))
+        out.append(row)
+    return out
+
+
+class SyntheticSheet:
+    """
+    Лист xlrd из списка строк, без файла.
+
+    Поддерживает то, что использует i_pol: name, nrows, ncols, row(),
+    cell_value().
+    """
+
+    def __init__(self, rows, name="Sheet1"):
+        self.name = name
+        self.nrows = len(rows)
+        self.ncols = max(len(r) for r in rows) if rows else 0
+        self._rows = [[self.make_cell(v) for v in r] for r in rows]
+
+    @staticmethod
+    def make_cell(value):
+        if value is None or value == "":
+            return xlrd.sheet.Cell(xlrd.XL_CELL_EMPTY, "")
+        if isinstance(value, (int, float)):
+            return xlrd.sheet.Cell(xlrd.XL_CELL_NUMBER, float(value))
+        return xlrd.sheet.Cell(xlrd.XL_CELL_TEXT, str(value))
+
+    def row(self, rowx):
+        return self._rows[rowx]
+
+    def cell_value(self, rowx, colx):
+        return self._rows[rowx][colx].value
+
+
+def write_georock_xls(filename, sheets=1, samples=1000, seed=0):
+    """Записывает книгу .xls в стиле GEOROC (нужен пакет xlwt)."""
+    import xlwt
+
+    wb = xlwt.Workbook()
+    for s in range(sheets):
+        ws = wb.add_sheet("Sheet{}".format(s + 1))
+        for rx, row in enumerate(georock_rows(samples, seed + s)):
+            for cx, value in enumerate(row):
+                ws.write(rx, cx, value)
+    wb.save(filename)
+    print("WROTE: {}".format(filename))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Синтетические книги для замеров импорта")
+    parser.add_argument("output", help="Файл .xlsx (трубки) или .xls (GEOROC)")
+    parser.add_argument("--tubes", type=int, default=3, help="Число трубок")
+    parser.add_argument("--samples", type=int, default=50,
+                        help="Строк в разделе трубки")
+    parser.add_argument("--grains", type=int, default=5,
+                        help="Зёрен на шашку в EPMA/LAM")
+    parser.add_argument("--georock", type=int, metavar="N",
+                        help="Записать лист GEOROC из N образцов (.xls)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.georock:
+        write_georock_xls(args.output, samples=args.georock, seed=args.seed)
+    else:
+        tube_workbook(args.tubes, args.samples, args.grains,
+                      args.seed).save(args.output)
+        print("WROTE: {}".format(args.output))
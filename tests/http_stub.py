@@ -0,0 +1,96 @@
+"""
+Локальный приёмник запросов PUT/POST для тестов (http.server).
+
+Принимает тела запросов (в том числе с Transfer-Encoding: chunked и
+Content-Encoding: gzip) и запоминает их по пути и строке запроса.
+Первые ответы на заданные пути можно сделать ошибочными, чтобы проверить
+повторы.
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class HTTPStub:
+    """
+    Args:
+        failures (dict): Путь -> число первых запросов, на которые
+            отвечать кодом status.
+        status (int): Код ошибочного ответа.
+    """
+
+    def __init__(self, failures=None, status=503):
+        self.failures = dict(failures or {})
+        self.status = status
+        self.requests = []  # (метод, путь с запросом, заголовки, тело)
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_PUT(self):
+                stub.handle(self)
+
+            def do_POST(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def read_body(request):
+        if request.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(request.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    request.rfile.readline()
+                    break
+                chunks.append(request.rfile.read(size))
+                request.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = request.rfile.read(int(request.headers.get("Content-Length", 0)))
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def bodies(self, path=None):
+        """Тела успешно принятых запросов (для заданного пути)."""
+        return [body for method, p, headers, body in self.requests
+                if path is None or p == path]
+
+    def handle(self, request):
+        body = self.read_body(request)
+        path = request.path.split("?")[0]
+        with self.lock:
+            fail = self.failures.get(path, 0)
+            if fail:
+                self.failures[path] = fail - 1
+            else:
+                self.requests.append((request.command, request.path,
+                                      dict(request.headers), body))
+        self.respond(request, self.status if fail else 201)
+
+    def respond(self, request, status, body=b"", content_type="text/plain"):
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
@@ -0,0 +1,121 @@
+"""
+Локальная точка доступа SPARQL для тестов (http.server).
+
+Отвечает на любой SELECT одной и той же таблицей строк в формате SPARQL
+JSON или TSV (по заголовку Accept), учитывая LIMIT/OFFSET запроса.
+Запоминает запросы, их заголовки Accept, порты клиентских соединений и
+наибольшее число одновременно обрабатываемых запросов.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)(?:\s+OFFSET\s+(\d+))?", re.IGNORECASE)
+
+
+class SPARQLStub:
+    """
+    Args:
+        variables (list): Имена переменных результата.
+        rows (list): Строки результата (списки строковых значений).
+        max_rows (int): Предел строк ответа; урезанный ответ помечается
+            заголовком X-SPARQL-MaxRows, как в Virtuoso.
+        silent (bool): Урезать ответ до max_rows без заголовка.
+        ignore_limit (bool): Не учитывать LIMIT/OFFSET запроса.
+        delay (float): Задержка ответа в секундах.
+    """
+
+    def __init__(self, variables, rows, max_rows=None, silent=False,
+                 ignore_limit=False, delay=0.0):
+        self.variables = variables
+        self.rows = rows
+        self.max_rows = max_rows
+        self.silent = silent
+        self.ignore_limit = ignore_limit
+        self.delay = delay
+        self.queries = []
+        self.accepts = []
+        self.ports = set()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:{}/sparql".format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.ports.add(request.client_address[1])
+        try:
+            length = int(request.headers.get("Content-Length", 0))
+            form = parse_qs(request.rfile.read(length).decode("utf8"))
+            query = form["query"][0]
+            accept = request.headers.get("Accept", "")
+            self.queries.append(query)
+            self.accepts.append(accept)
+            if self.delay:
+                time.sleep(self.delay)
+            rows = self.rows
+            m = LIMIT_RE.search(query)
+            if m is not None and not self.ignore_limit:
+                offset = int(m.group(2) or 0)
+                rows = rows[offset:offset + int(m.group(1))]
+            headers = {}
+            if self.max_rows is not None and len(rows) > self.max_rows:
+                rows = rows[:self.max_rows]
+                if not self.silent:
+                    headers["X-SPARQL-MaxRows"] = str(self.max_rows)
+            if "tab-separated" in accept:
+                body, content_type = self.tsv(rows), "text/tab-separated-values"
+            else:
+                body, content_type = self.json(rows), "application/sparql-results+json"
+        finally:
+            with self.lock:
+                self.active -= 1
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            request.send_header(k, v)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def json(self, rows):
+        bindings = [{v: {"type": "literal", "value": x}
+                     for v, x in zip(self.variables, row) if x is not None}
+                    for row in rows]
+        return json.dumps({"head": {"vars": self.variables},
+                           "results": {"bindings": bindings}}).encode("utf8")
+
+    def tsv(self, rows):
+        lines = ["\t".join("?" + v for v in self.variables)]
+        lines += ["\t".join("" if x is None else '"{}"'.format(x) for x in row)
+                  for row in rows]
+        return ("\n".join(lines) + "\n").encode("utf8")
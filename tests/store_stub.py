@@ -0,0 +1,73 @@
+"""
+Локальное хранилище RDF для тестов - заменитель Fuseki/Oxigraph.
+
+Данные хранятся в rdflib Dataset. Поддерживаются:
+- /data?graph=IRI - SPARQL 1.1 Graph Store HTTP: PUT (замена графа) и
+  POST (дополнение) телом N-Triples или Turtle;
+- /sparql - SELECT (параметр query) и UPDATE (параметр update).
+"""
+
+from urllib.parse import parse_qs, urlsplit
+
+from rdflib import Dataset, URIRef
+
+from http_stub import HTTPStub
+
+FORMATS = {"application/n-triples": "nt", "text/turtle": "turtle"}
+
+
+class StoreStub(HTTPStub):
+    """
+    Args:
+        ignore_post (bool): Отвечать на POST в /data успехом, не сохраняя
+            данные (хранилище, теряющее пакеты).
+    """
+
+    def __init__(self, ignore_post=False, **kwargs):
+        super().__init__(**kwargs)
+        self.ignore_post = ignore_post
+        self.dataset = Dataset()
+        self.updates = []
+        self.data_url = self.url + "/data"
+        self.query_url = self.url + "/sparql"
+
+    def graph(self, iri):
+        """Именованный граф хранилища."""
+        return self.dataset.graph(URIRef(iri))
+
+    def handle(self, request):
+        body = self.read_body(request)
+        url = urlsplit(request.path)
+        with self.lock:
+            fail = self.failures.get(url.path, 0)
+            if fail:
+                self.failures[url.path] = fail - 1
+                self.respond(request, self.status)
+                return
+            self.requests.append((request.command, request.path,
+                                  dict(request.headers), body))
+            if url.path == "/data":
+                self.graph_store(request, url, body)
+            else:
+                self.sparql(request, parse_qs(body.decode("utf8")))
+
+    def graph_store(self, request, url, body):
+        graph = self.graph(parse_qs(url.query)["graph"][0])
+        if request.command == "PUT":
+            graph.remove((None, None, None))
+        elif self.ignore_post:
+            self.respond(request, 204)
+            return
+        ctype = request.headers["Content-Type"].split(";")[0]
+        graph.parse(data=body.decode("utf8"), format=FORMATS[ctype])
+        self.respond(request, 201 if request.command == "PUT" else 204)
+
+    def sparql(self, request, form):
+        if "update" in form:
+            self.updates.append(form["update"][0])
+            self.dataset.update(form["update"][0])
+            self.respond(request, 204)
+            return
+        result = self.dataset.query(form["query"][0])
+        self.respond(request, 200, result.serialize(format="json"),
+                     "application/sparql-results+json")
@@ -0,0 +1,71 @@
+"""Чтение хранилища трубок с кэшем результатов (alrosa_query)."""
+
+import uuid
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from alrosa_models import Oxides
+from alrosa_query import AlrosaStore
+from bulk_load import load_dataframe
+from schema import ensure_schema, refresh_measurements
+
+PIPE = uuid.uuid4()
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = "sqlite:///{}".format(tmp_path / "tubes.db")
+    ensure_schema(url)
+    return url
+
+
+def oxides(sio2):
+    return pd.DataFrame({"Образец": ["1", "2"], "SiO2": sio2})
+
+
+def sio2(store):
+    return sorted(store.analyses("oxides", pipe=PIPE)["sio2"])
+
+
+def test_reader_runs_no_ddl(tmp_path):
+    url = "sqlite:///{}".format(tmp_path / "empty.db")
+    AlrosaStore(url)
+    assert inspect(create_engine(url)).get_table_names() == []
+
+
+def test_direct_reimport_invalidates_cache(url):
+    store = AlrosaStore(url)
+    Oxides.import_from_dataframe(oxides([40.0, 41.0]), PIPE, url)
+    assert sio2(store) == [40.0, 41.0]
+    assert sio2(store) == [40.0, 41.0]
+    assert store.cache.hits == 1
+    Oxides.import_from_dataframe(oxides([40.0, 45.0]), PIPE, url,
+                                 if_exists="replace")
+    assert sio2(store) == [40.0, 45.0]
+
+
+def test_bulk_reimport_invalidates_cache(url):
+    store = AlrosaStore(url)
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        load_dataframe(connection, Oxides, oxides([40.0, 41.0]), PIPE)
+    assert sio2(store) == [40.0, 41.0]
+    with engine.begin() as connection:
+        load_dataframe(connection, Oxides, oxides([40.0, 46.0]), PIPE,
+                       if_exists="replace")
+    assert sio2(store) == [40.0, 46.0]
+    engine.dispose()
+
+
+@pytest.mark.parametrize("pipe", [PIPE, None], ids=["pipe", "all"])
+def test_refresh_measurements_invalidates_cache(url, pipe):
+    store = AlrosaStore(url)
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        load_dataframe(connection, Oxides, oxides([40.0, 41.0]), PIPE)
+    assert store.measurements(analyte="SiO2").empty
+    assert refresh_measurements(engine, pipe) == 2
+    assert sorted(store.measurements(analyte="SiO2")["value"]) == [40.0, 41.0]
+    engine.dispose()
@@ -0,0 +1,182 @@
+"""
+Замеры этапов импорта на синтетических книгах (pytest-benchmark).
+
+Каждый этап замеряется отдельно и целиком: разбор листов трубок,
+приведение к каноническому виду, преобразование признаков в RDF, импорт
+таблиц в SQLite (ORM и bulk_load), запросы alrosa_query (без кэша и из
+кэша), запись графа; для i_pol - разбор листа GEOROC в граф
+в памяти. Пропускная способность (строк/с, триплетов/с) записывается в
+extra_info.
+
+Размер данных задаётся переменными окружения BENCH_TUBES, BENCH_SAMPLES,
+BENCH_GEOROC. Регрессии ловятся сравнением с сохранённым прогоном:
+    pytest tests/test_benchmarks.py --benchmark-autosave
+    pytest tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+
+import copy
+import os
+
+import pytest
+from rdflib import Graph
+from sqlalchemy import create_engine, func, select
+
+pytest.importorskip("pytest_benchmark")
+
+import alrosa_importer  # noqa: E402
+import i_pol  # noqa: E402
+import synthetic  # noqa: E402
+from alrosa_convert_features import convert_features_to_rdf  # noqa: E402
+from alrosa_models import EPMAAnalysis  # noqa: E402
+from alrosa_query import AlrosaStore  # noqa: E402
+from bulk_load import LOADERS  # noqa: E402
+from logs import setup_logging  # noqa: E402
+from skolem import generate_deterministic_uuid  # noqa: E402
+
+TUBES = int(os.environ.get("BENCH_TUBES", 2))
+SAMPLES = int(os.environ.get("BENCH_SAMPLES", 50))
+GEOROC = int(os.environ.get("BENCH_GEOROC", 500))
+ROUNDS = 3
+
+
+@pytest.fixture(scope="module", autouse=True)
+def quiet_log():
+    setup_logging("ERROR")
+
+
+@pytest.fixture(scope="module")
+def workbook_file(tmp_path_factory):
+    filename = tmp_path_factory.mktemp("bench") / "tubes.xlsx"
+    synthetic.tube_workbook(TUBES, SAMPLES).save(filename)
+    return filename
+
+
+@pytest.fixture(scope="module")
+def raw_tubes(workbook_file):
+    return extract(workbook_file)
+
+
+@pytest.fixture(scope="module")
+def canonic_tubes(raw_tubes):
+    return [alrosa_importer.convert_to_canonic_form(copy.deepcopy(t))
+            for t in raw_tubes]
+
+
+def extract(filename):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(filename, data_only=True)
+    tubes = []
+    for name in wb.sheetnames:
+        _, data = alrosa_importer.import_excel_table_into_dict(wb, name)
+        if data is not None:
+            tubes.append((name, data))
+    return tubes
+
+
+def frame_rows(tubes):
+    return sum(len(df) for _, data in tubes for df in data["frames"].values())
+
+
+def features_graph(tubes):
+    g = Graph()
+    for name, data in tubes:
+        convert_features_to_rdf(g, (name, data["features"]),
+                                alrosa_importer.P[name])
+    return g
+
+
+def test_extract(benchmark, workbook_file):
+    tubes = benchmark.pedantic(extract, args=(workbook_file,), rounds=ROUNDS)
+    assert len(tubes) == TUBES
+    benchmark.extra_info["rows"] = frame_rows(tubes)
+
+
+def test_canonicalize(benchmark, raw_tubes):
+    def setup():
+        return (copy.deepcopy(raw_tubes),), {}
+
+    def run(tubes):
+        return [alrosa_importer.convert_to_canonic_form(t) for t in tubes]
+
+    tubes = benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    assert all(set(data["frames"]) >= {"epma", "lam"} for _, data in tubes)
+    benchmark.extra_info["rows"] = frame_rows(tubes)
+
+
+def test_rdf(benchmark, canonic_tubes):
+    def setup():
+        return (copy.deepcopy(canonic_tubes),), {}
+
+    g = benchmark.pedantic(features_graph, setup=setup, rounds=ROUNDS)
+    assert len(g) > 0
+    benchmark.extra_info["triples"] = len(g)
+
+
+@pytest.mark.parametrize("loader", LOADERS)
+def test_sql(benchmark, canonic_tubes, tmp_path, loader):
+    databases = iter(range(ROUNDS + 1))
+
+    def setup():
+        url = "sqlite:///{}".format(tmp_path / "run{}.db".format(next(databases)))
+        return (copy.deepcopy(canonic_tubes), url), {}
+
+    def run(tubes, url):
+        for name, data in tubes:
+            alrosa_importer.convert_dataframes_to_sql(
+                data["frames"], url, generate_deterministic_uuid(name), loader)
+        return url
+
+    url = benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    with create_engine(url).connect() as connection:
+        analyses = connection.execute(
+            select(func.count()).select_from(EPMAAnalysis.__table__)).scalar()
+    assert analyses == sum(len(data["frames"]["epma"]) for _, data in canonic_tubes)
+    benchmark.extra_info["rows"] = frame_rows(canonic_tubes)
+
+
+@pytest.fixture(scope="module")
+def database(canonic_tubes, tmp_path_factory):
+    url = "sqlite:///{}".format(tmp_path_factory.mktemp("query") / "tubes.db")
+    for name, data in copy.deepcopy(canonic_tubes):
+        alrosa_importer.convert_dataframes_to_sql(
+            data["frames"], url, generate_deterministic_uuid(name))
+    return url
+
+
+@pytest.mark.parametrize("cache_size", [0, 128], ids=["uncached", "cached"])
+def test_query(benchmark, canonic_tubes, database, cache_size):
+    store = AlrosaStore(database, cache_size=cache_size)
+    pipe = canonic_tubes[0][0]
+    df = benchmark.pedantic(store.measurements, kwargs={"analyte": "Ni",
+                                                        "pipe": pipe},
+                            rounds=ROUNDS * 10)
+    assert len(df) > 0 and set(df.analyte) == {"Ni"}
+    benchmark.extra_info["rows"] = len(df)
+
+
+def test_serialize(benchmark, canonic_tubes, tmp_path):
+    g = features_graph(copy.deepcopy(canonic_tubes))
+    target = tmp_path / "a-box.ttl"
+    benchmark.pedantic(g.serialize, kwargs={"destination": str(target),
+                                            "format": "turtle"},
+                       rounds=ROUNDS)
+    assert target.stat().st_size > 0
+    benchmark.extra_info["triples"] = len(g)
+
+
+def test_georock_sheet(benchmark):
+    sheet = synthetic.SyntheticSheet(synthetic.georock_rows(GEOROC))
+
+    def setup():
+        return (Graph(),), {}
+
+    def run(g):
+        i_pol.parse_sheet(sheet, i_pol.P["bench"], "bench.xls_Sheet1",
+                          (i_pol.Alrosa_Xenolites, {"pages": ()}), graph=g)
+        return g
+
+    g = benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    assert len(g) > GEOROC
+    benchmark.extra_info["rows"] = GEOROC
+    benchmark.extra_info["triples"] = len(g)
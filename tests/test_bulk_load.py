@@ -0,0 +1,176 @@
+"""Пакетная загрузка таблиц трубки (bulk_load)."""
+
+import csv
+import io
+import logging
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import (JSON, Boolean, Column, Float, Integer, MetaData,
+                        String, Table, create_engine, select, update)
+from sqlalchemy.dialects import postgresql
+
+from alrosa_models import EPMAAnalysis, Grain, LAMAnalysis
+from bulk_load import copy_rows, csv_field, load_dataframe
+from schema import ensure_schema
+
+TABLE = Table(
+    "stage_oxides",
+    MetaData(),
+    Column("n", Integer),
+    Column("value", Float),
+    Column("user", String),  # зарезервированное слово - в кавычках
+    Column("flag", Boolean),
+    Column("extra", JSON),
+)
+
+ROWS = [
+    {"n": np.int64(3), "value": np.float64(1.5), "user": 'say "hi", ok',
+     "flag": True, "extra": {"a": "б"}},
+    {"n": 7, "value": float("nan"), "user": None, "flag": np.bool_(False)},
+    {"n": None, "value": 0.1, "user": "", "flag": None, "extra": [1, 2]},
+]
+
+PAYLOAD = ('3,1.5,"say ""hi"", ok",t,"{""a"": ""б""}"\n'
+           '7,,,f,\n'
+           ',0.1,"",,"[1, 2]"\n')
+
+
+class Psycopg2Cursor:
+    def copy_expert(self, sql, file):
+        self.sql = sql
+        self.data = file.read()
+
+    def close(self):
+        self.closed = True
+
+
+class Psycopg3Cursor:
+    def copy(self, sql):
+        self.sql = sql
+        self.data = ""
+        cursor = self
+
+        class Copy:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+            def write(self, data):
+                cursor.data += data
+
+        return Copy()
+
+    def close(self):
+        self.closed = True
+
+
+def connection(cursor):
+    return SimpleNamespace(
+        dialect=postgresql.dialect(),
+        connection=SimpleNamespace(
+            dbapi_connection=SimpleNamespace(cursor=lambda: cursor)))
+
+
+@pytest.mark.parametrize("value, column_type, field", [
+    (np.float64(1.5), Float(), "1.5"),
+    (np.float32(0.5), Float(), "0.5"),
+    (np.int64(42), Integer(), "42"),
+    (1e-7, Float(), "1e-07"),
+    (float("nan"), Float(), ""),
+    (None, String(), ""),
+    ("", String(), '""'),
+    (np.True_, Boolean(), "t"),
+])
+def test_csv_field(value, column_type, field):
+    assert csv_field(value, column_type) == field
+
+
+@pytest.mark.parametrize("cursor_type", [Psycopg2Cursor, Psycopg3Cursor],
+                         ids=["psycopg2", "psycopg3"])
+def test_copy_rows_payload(cursor_type):
+    cursor = cursor_type()
+    copy_rows(connection(cursor), TABLE, ROWS)
+    assert cursor.sql == ('COPY stage_oxides (n, value, "user", flag, extra) '
+                          "FROM STDIN WITH (FORMAT csv)")
+    assert cursor.data == PAYLOAD
+    assert cursor.closed
+    # Тот же разбор, что у COPY ... (FORMAT csv): пустое без кавычек - NULL
+    rows = list(csv.reader(io.StringIO(cursor.data)))
+    assert rows[0][2] == 'say "hi", ok' and rows[2][2] == ""
+
+
+PIPE = uuid.uuid4()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    url = "sqlite:///{}".format(tmp_path / "tubes.db")
+    ensure_schema(url)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def epma(values):
+    grains = ["g{}".format(i + 1) for i in range(len(values))]
+    return pd.DataFrame({"шашка": ["1"] * len(values), "зерно": grains,
+                         "SiO2": values})
+
+
+def lam(grains, values):
+    return pd.DataFrame({"шашка": ["1"] * len(grains), "зерно": grains,
+                         "Ni": values})
+
+
+def load(engine, model, df, caplog):
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="crust.bulk_load"), \
+            engine.begin() as connection:
+        n = load_dataframe(connection, model, df, PIPE)
+    [record] = [r for r in caplog.records if "изменено" in r.msg]
+    return n, record.args[-1]
+
+
+def values(engine, model, column):
+    table = model.__table__
+    with engine.connect() as connection:
+        return sorted(connection.execute(select(table.c[column])).scalars())
+
+
+def test_grain_analyses_are_idempotent(engine, caplog):
+    def load_epma(sio2):
+        return load(engine, EPMAAnalysis, epma(sio2), caplog)
+
+    assert load_epma([40.0, 41.0, 42.0]) == (3, 3)
+    # Повторный импорт тех же данных ничего не меняет
+    assert load_epma([40.0, 41.0, 42.0]) == (3, 0)
+    # Исправление одного значения меняет одну строку
+    assert load_epma([40.0, 41.5, 42.0]) == (3, 1)
+    assert values(engine, EPMAAnalysis, "sio2") == [40.0, 41.5, 42.0]
+    # Убранная из таблицы строка удаляется
+    assert load_epma([40.0, 41.5]) == (2, 0)
+    assert values(engine, EPMAAnalysis, "sio2") == [40.0, 41.5]
+
+
+def test_lam_rows_without_grain(engine, caplog):
+    load(engine, EPMAAnalysis, epma([40.0, 41.0]), caplog)
+    assert load(engine, LAMAnalysis, lam(["g1", "g2", "g9"], [1.0, 2.0, 9.0]),
+                caplog) == (2, 2)
+    assert "Пропущено 1 записей" in caplog.text
+    assert values(engine, LAMAnalysis, "ni") == [1.0, 2.0]
+
+    # Зерно g2 больше не находится по имени: прежняя строка LAM с тем же
+    # id не должна остаться
+    grains = Grain.__table__
+    with engine.begin() as connection:
+        connection.execute(update(grains).where(grains.c.grain_name == "g2")
+                           .values(grain_name="g2x"))
+    assert load(engine, LAMAnalysis, lam(["g1", "g2"], [1.0, 2.0]),
+                caplog) == (1, 0)
+    assert values(engine, LAMAnalysis, "ni") == [1.0]
@@ -0,0 +1,113 @@
+"""Публикация дельты графа запросами SPARQL UPDATE (delta)."""
+
+import os
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace
+
+from common import SPARQLClient
+from delta import diff_sorted, make_snapshot, publish_delta, update_batches
+from store_stub import StoreStub
+from uploader import SKOLEM_BASE, external_sort, ntriples_lines
+
+EX = Namespace("http://example.org/")
+GRAPH = "http://example.org/graphs/samples"
+
+
+def write(path, lines):
+    path.write_text("".join(lines), encoding="utf8")
+    return str(path)
+
+
+def test_external_sort(tmp_path):
+    lines = ["{}\n".format(i % 7) for i in range(30, 0, -1)]
+    filename = str(tmp_path / "sorted.txt")
+    assert external_sort(iter(lines), filename, run_lines=4) == 7
+    with open(filename, encoding="utf8") as inp:
+        assert inp.readlines() == sorted(set(lines))
+    assert external_sort(iter([]), filename) == 0
+    assert os.path.getsize(filename) == 0
+
+
+def test_diff_sorted(tmp_path):
+    old = write(tmp_path / "old", ["a\n", "b\n", "d\n"])
+    new = write(tmp_path / "new", ["b\n", "c\n", "d\n", "e\n"])
+    empty = write(tmp_path / "empty", [])
+    assert list(diff_sorted(old, new)) == [("-", "a\n"), ("+", "c\n"),
+                                           ("+", "e\n")]
+    assert list(diff_sorted(old, old)) == []
+    assert list(diff_sorted(empty, old)) == [("+", "a\n"), ("+", "b\n"),
+                                             ("+", "d\n")]
+
+
+def test_update_batches():
+    diff = [("+", "<a> <p> 1 .\n"), ("-", "<b> <p> 2 .\n"),
+            ("+", "<c> <p> 3 .\n"), ("+", "<d> <p> 4 .\n"),
+            ("-", "<e> <p> 5 .\n")]
+    batches = list(update_batches(iter(diff), GRAPH, batch_size=2))
+    assert [(op, n) for op, n, _ in batches] == [("+", 2), ("-", 2), ("+", 1)]
+    op, n, q = batches[1]
+    assert q == ("DELETE DATA { GRAPH <" + GRAPH + "> {\n"
+                 "<b> <p> 2 .\n<e> <p> 5 .\n} }")
+    assert batches[2][2].startswith("INSERT DATA")
+    assert list(update_batches(iter([]), GRAPH)) == []
+
+
+def graph(values):
+    g = Graph()
+    for v in values:
+        g.add((EX.s, EX.value, Literal(v)))
+    unit = BNode()
+    g.add((EX.s, EX.unit, unit))
+    g.add((unit, EX.name, Literal("PPM")))
+    return g
+
+
+def test_make_snapshot_file_matches_graph(tmp_path):
+    g = graph([1, 2, 3])
+    ttl = str(tmp_path / "g.ttl")
+    g.serialize(destination=ttl, format="turtle")
+    assert make_snapshot(ttl, str(tmp_path / "a.nt")) == 5
+    assert make_snapshot(g, str(tmp_path / "b.nt")) == 5
+    with open(tmp_path / "a.nt", encoding="utf8") as a:
+        assert a.readlines() == ntriples_lines(g, SKOLEM_BASE)
+    assert (tmp_path / "a.nt").read_bytes() == (tmp_path / "b.nt").read_bytes()
+
+
+@pytest.fixture
+def store():
+    with StoreStub() as s:
+        yield s
+
+
+def test_publish_delta(tmp_path, store):
+    ttl = tmp_path / "g.ttl"
+    snapshot = str(tmp_path / "g.published.nt")
+    client = SPARQLClient(cache_size=0)
+
+    graph([1, 2, 3]).serialize(destination=str(ttl), format="turtle")
+    report = publish_delta(str(ttl), GRAPH, store.query_url, client=client)
+    assert (report["full"], report["added"], report["removed"]) == (True, 5, 0)
+    assert store.updates[0] == "CLEAR SILENT GRAPH <{}>".format(GRAPH)
+    assert len(store.graph(GRAPH)) == 5
+
+    graph([2, 3, 4, 5]).serialize(destination=str(ttl), format="turtle")
+    report = publish_delta(str(ttl), GRAPH, store.query_url, client=client,
+                           dry_run=True)
+    assert (report["added"], report["removed"],
+            report["requests"]) == (2, 1, 0)
+    assert len(store.graph(GRAPH)) == 5
+
+    report = publish_delta(str(ttl), GRAPH, store.query_url, client=client,
+                           batch_size=1)
+    assert (report["full"], report["added"], report["removed"],
+            report["requests"]) == (False, 2, 1, 3)
+    with open(snapshot, encoding="utf8") as inp:
+        published = Graph().parse(data=inp.read(), format="nt")
+    assert set(store.graph(GRAPH)) == set(published)
+    assert {o for o in store.graph(GRAPH).objects(EX.s, EX.value)} == {
+        Literal(v) for v in (2, 3, 4, 5)}
+
+    report = publish_delta(str(ttl), GRAPH, store.query_url, client=client)
+    assert (report["added"], report["removed"],
+            report["requests"]) == (0, 0, 0)
@@ -0,0 +1,27 @@
+"""Статическая таблица элементов и её версия (elements)."""
+
+import logging
+
+import elements
+import element_table
+
+
+def test_table_version_matches_generator():
+    assert element_table.VERSION == elements.TABLE_VERSION
+    assert elements.check_table()
+
+
+def test_stale_table_warns(caplog):
+    with caplog.at_level(logging.WARNING, logger="crust.elements"):
+        assert not elements.check_table(elements.TABLE_VERSION - 1)
+    [record] = caplog.records
+    assert "regenerate" in record.getMessage()
+
+
+def test_written_table_version(tmp_path):
+    filename = tmp_path / "table.py"
+    elements.write_table(element_table.ELEMENTS, "test", str(filename))
+    namespace = {}
+    exec(filename.read_text(encoding="utf8"), namespace)
+    assert namespace["VERSION"] == elements.TABLE_VERSION
+    assert namespace["OXIDES"] == element_table.OXIDES
@@ -0,0 +1,95 @@
+"""Загрузка графов по протоколу Graph Store (graph_store)."""
+
+import pytest
+from rdflib import Graph, Literal, Namespace
+
+from alrosa_importer import pipe_graph, publish_shards
+from graph_store import GraphStore, source_lines
+from store_stub import StoreStub
+
+EX = Namespace("http://example.org/")
+G1 = "http://example.org/graphs/1"
+G2 = "http://example.org/graphs/2"
+
+
+def shard(path, name, n, start=0):
+    g = Graph()
+    for i in range(start, start + n):
+        g.add((EX[name], EX.value, Literal(i)))
+    g.add((EX[name], EX.unit, EX.PPM))
+    filename = path / "{}.ttl".format(name)
+    g.serialize(destination=str(filename), format="turtle")
+    return str(filename)
+
+
+@pytest.fixture
+def store():
+    with StoreStub() as s:
+        yield s
+
+
+def test_source_lines(tmp_path):
+    filename = shard(tmp_path, "a", 3)
+    g = Graph()
+    g.parse(filename)
+    lines = list(source_lines(filename))
+    assert lines == list(source_lines(g)) == sorted(set(lines))
+    assert len(lines) == 4
+
+
+def test_load_all_in_batches(tmp_path, store):
+    client = GraphStore(store.data_url, store.query_url, batch_size=3)
+    reports = client.load_all({G1: shard(tmp_path, "a", 9),
+                               G2: shard(tmp_path, "b", 2)})
+    assert [(r["graph"], r["triples"], r["batches"], r["count"])
+            for r in reports] == [(G1, 10, 4, 10), (G2, 3, 1, 3)]
+    methods = [m for m, path, _, _ in store.requests if "graph=" in path]
+    assert methods.count("PUT") == 2 and methods.count("POST") == 3
+
+    # Повторная замена не удваивает граф
+    client.load_all({G1: shard(tmp_path, "a", 2)})
+    assert len(store.graph(G1)) == 3
+
+
+def test_append(tmp_path, store):
+    client = GraphStore(store.data_url, store.query_url)
+    client.load(G1, shard(tmp_path, "a", 5))
+    report = client.load(G1, shard(tmp_path, "a", 5, start=3), replace=False)
+    assert report["count"] == len(store.graph(G1)) == 9
+
+
+def test_lost_batches(tmp_path):
+    with StoreStub(ignore_post=True) as store:
+        client = GraphStore(store.data_url, store.query_url, batch_size=3)
+        [report] = client.load_all({G1: shard(tmp_path, "a", 9)})
+    assert "10 loaded" in report["error"]
+
+
+def test_bad_count_reply_keeps_other_reports(tmp_path, store, monkeypatch):
+    client = GraphStore(store.data_url, store.query_url)
+    select = client.client.select
+
+    def reply(url, query, cache=False):
+        if G1 in query:
+            return {"results": {"bindings": []}}
+        return select(url, query, cache=cache)
+
+    monkeypatch.setattr(client.client, "select", reply)
+    reports = client.load_all({G1: shard(tmp_path, "a", 3),
+                               G2: shard(tmp_path, "b", 2)})
+    assert "unexpected COUNT reply" in reports[0]["error"]
+    assert reports[1]["count"] == 3
+
+    down = GraphStore(store.data_url, "http://127.0.0.1:1/sparql")
+    [report] = down.load_all({G1: shard(tmp_path, "a", 3)})
+    assert "error" in report
+
+
+def test_publish_shards_per_pipe(tmp_path, store):
+    shards = [shard(tmp_path, name, 4) for name in ("Мир", "Удачная")]
+    reports = publish_shards(shards, store.data_url, store.query_url)
+    assert [r["graph"] for r in reports] == [
+        str(pipe_graph("Мир")), str(pipe_graph("Удачная"))]
+    assert all(r["count"] == 5 for r in reports)
+    assert (EX["Мир"], EX.unit, EX.PPM) in store.graph(pipe_graph("Мир"))
+    assert (EX["Мир"], EX.unit, EX.PPM) not in store.graph(pipe_graph("Удачная"))
@@ -0,0 +1,92 @@
+"""Пределы обнаружения и соединения при разборе листов i_pol."""
+
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+import xlrd
+from rdflib import RDF, Graph, Literal, URIRef
+
+import i_pol
+import synthetic
+from namespace import PT
+
+SAMPLES = 50
+
+
+def parse(g):
+    sheet = synthetic.SyntheticSheet(synthetic.georock_rows(SAMPLES))
+    return i_pol.parse_sheet(sheet, i_pol.P["test"], "test.xls_Sheet1",
+                             (i_pol.Alrosa_Xenolites, {"pages": ()}), graph=g)
+
+
+def test_detection_limits_in_each_graph():
+    graphs = [Graph(), Graph()]
+    for g in graphs:
+        st = parse(g)
+        stats = st.detection_limits.stats()
+        assert stats["detection_limits"] > 0 and stats["reused"] > 0
+        limits = set(g.objects(None, PT.detectionLimit))
+        assert limits == set(g.subjects(RDF.type, PT.DetectionLimit))
+        censored = [v for v in g.objects(None, PT.value) if isinstance(v, URIRef)]
+        assert censored and set(censored) <= limits
+        for compound in g.objects(None, PT.compound):
+            assert (compound, RDF.type, PT.Compound) in g
+    assert set(graphs[0]) == set(graphs[1])
+
+
+def test_detlim_row_counts_censored_measurement():
+    g = Graph()
+    st = i_pol.Yarki(g, i_pol.P["ds"])
+    st.proc_comp(("Ni_PPM", "Ni_PPM"), 5.0, delim=True)
+    declared = st.dlims["Ni"]
+    st.sample = i_pol.P["sample"]
+    st.analysis = i_pol.P["analysis"]
+    st.proc_comp(("Ni_PPM", "Ni_PPM"), "<5")
+    measurement = next(g.objects(st.analysis, PT.measurement))
+    assert (measurement, PT.value, declared) in g
+    assert st.detection_limits.stats() == {
+        "detection_limits": 0,
+        "reused": 0,
+        "declared": 1,
+        "censored_measurements": 1,
+    }
+
+
+@pytest.mark.parametrize("cls", [i_pol.Yarki, i_pol.Alrosa])
+def test_unknown_column_warning_reports_row_number(cls, caplog):
+    st = cls(Graph(), i_pol.P["ds"])
+    st.header = {}
+    cell = xlrd.sheet.Cell(xlrd.XL_CELL_NUMBER, 1.5)
+    with caplog.at_level(logging.WARNING, logger="crust.i_pol"):
+        st.c(cell, 17, 3, sheet_row=[cell] * 4)
+    [record] = caplog.records
+    assert record.getMessage().endswith("row 17")
+
+
+@pytest.mark.parametrize("cls", [i_pol.Yarki, i_pol.Alrosa])
+def test_repeated_header_gives_separate_measurements(cls):
+    g = Graph()
+    st = cls(g, i_pol.P["ds"])
+    st.header = {3: ("Ni_PPM", "Ni_PPM"), 4: ("Ni_PPM", "Ni_PPM")}
+    st.sample = i_pol.P["sample"]
+    st.analysis = i_pol.P["analysis"]
+    for col, value in ((3, 5.0), (4, 7.0)):
+        st.c(xlrd.sheet.Cell(xlrd.XL_CELL_NUMBER, value), [], col, 10)
+    measurements = set(g.objects(st.analysis, PT.measurement))
+    assert len(measurements) == 2
+    assert {v for m in measurements for v in g.objects(m, PT.value)} == {
+        Literal(5), Literal(7)}
+
+
+def test_import_does_not_load_publishing_stack():
+    """Запуск импортёра не ждёт загрузки pandas и requests."""
+    code = ("import sys, i_pol; print(sorted(m for m in ('pandas', 'numpy', "
+            "'requests', 'uploader', 'graph_store', 'delta', 'common') "
+            "if m in sys.modules))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.splitlines()[-1] == "[]"
@@ -0,0 +1,58 @@
+"""Табличный приёмник измерений (measurement_table)."""
+
+import importlib.util
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement_table import PARQUET_ENGINES, TABLE_NAME, MeasurementTable
+
+
+@pytest.fixture
+def table():
+    t = MeasurementTable()
+    t.add("ds", "s1", "a1", "Ni", None, "1200", "PPM")
+    t.add("ds", "s1", "a1", None, "SiO2", 41.5, "%")
+    t.add("ds", "s2", "a2", "Cr", None, "<5", "PPM", censored=True,
+          detection_limit="5")
+    return t
+
+
+def test_to_frame(table):
+    df = table.to_frame()
+    assert len(df) == len(table) == 3
+    np.testing.assert_allclose(df["normalized_value"][:2], [0.12, 41.5])
+    assert df["censored"].tolist() == [False, False, True]
+    assert np.isnan(df["value"][2]) and df["detection_limit"][2] == 5.0
+
+
+def test_write_sqlite_replaces_table(table, tmp_path):
+    filename = str(tmp_path / "m.sqlite")
+    table.write(filename)
+    table.write(filename)
+    with closing(sqlite3.connect(filename)) as con:
+        df = pd.read_sql("SELECT * FROM {}".format(TABLE_NAME), con)
+    assert len(df) == 3 and df["element"].tolist()[0] == "Ni"
+
+
+def test_write_csv(table, tmp_path):
+    filename = tmp_path / "m.csv"
+    table.write(str(filename))
+    assert len(pd.read_csv(filename)) == 3
+
+
+def test_write_unknown_format(table, tmp_path):
+    with pytest.raises(ValueError):
+        table.write(str(tmp_path / "m.xlsx"))
+
+
+@pytest.mark.skipif(any(importlib.util.find_spec(e) for e in PARQUET_ENGINES),
+                    reason="движок Parquet установлен")
+def test_write_parquet_without_engine(table, tmp_path):
+    filename = tmp_path / "m.parquet"
+    with pytest.raises(ImportError, match="pyarrow"):
+        table.write(str(filename))
+    assert not filename.exists()
@@ -0,0 +1,81 @@
+"""Таблица измерений в длинном формате (alrosa_models.Measurement)."""
+
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, select
+
+from alrosa_models import (
+    Grain,
+    LAMAnalysis,
+    Measurement,
+    Oxides,
+    Sample,
+    analyte_formula,
+)
+from schema import ensure_schema
+
+PIPE = uuid.uuid4()
+OTHER = uuid.uuid4()
+
+
+def test_analyte_formula():
+    assert analyte_formula("ni") == "Ni"
+    assert analyte_formula("cr2o3") == "Cr2O3"
+    assert analyte_formula("sio2") == "SiO2"
+    assert analyte_formula("total") is None
+    assert analyte_formula("nio_1") is None
+
+
+@pytest.fixture
+def engine(tmp_path):
+    url = "sqlite:///{}".format(tmp_path / "tubes.db")
+    ensure_schema(url)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(insert(Oxides.__table__).values(
+            id=uuid.uuid4(), pipe_uuid=PIPE, sio2=40.0, tio2=None))
+        conn.execute(insert(Oxides.__table__).values(
+            id=uuid.uuid4(), pipe_uuid=OTHER, mgo=30.0))
+        sample, grain = uuid.uuid4(), uuid.uuid4()
+        conn.execute(insert(Sample.__table__).values(
+            id=sample, pipe_uuid=PIPE, sample_name="1"))
+        conn.execute(insert(Grain.__table__).values(
+            id=grain, sample_id=sample, grain_name="g1"))
+        conn.execute(insert(LAMAnalysis.__table__).values(
+            id=uuid.uuid4(), grain_id=grain, ni=1200.0, la=3.5))
+    yield engine
+    engine.dispose()
+
+
+def measurements(conn):
+    table = Measurement.__table__
+    return sorted(conn.execute(select(
+        table.c.pipe_uuid, table.c.source_table, table.c.analyte,
+        table.c.value, table.c.unit)).all())
+
+
+def test_refresh_pipe(engine):
+    with engine.begin() as conn:
+        assert Measurement.refresh(conn, PIPE) == 3
+        assert Measurement.refresh(conn, str(PIPE)) == 3  # без повторов
+        rows = measurements(conn)
+    assert sorted(rows) == sorted([
+        (PIPE, "oxides", "SiO2", 40.0, "%"),
+        (PIPE, "lam_analyses", "La", 3.5, "PPM"),
+        (PIPE, "lam_analyses", "Ni", 1200.0, "PPM"),
+    ])
+
+
+def test_refresh_all_and_tables(engine):
+    with engine.begin() as conn:
+        assert Measurement.refresh(conn) == 4
+        conn.execute(delete(Oxides.__table__).where(
+            Oxides.__table__.c.pipe_uuid == PIPE))
+        assert Measurement.refresh(conn, PIPE, tables=["oxides"]) == 0
+        rows = measurements(conn)
+    assert (PIPE, "oxides", "SiO2", 40.0, "%") not in rows
+    # Другие таблицы и трубки не затронуты
+    assert (PIPE, "lam_analyses", "Ni", 1200.0, "PPM") in rows
+    assert (OTHER, "oxides", "MgO", 30.0, "%") in rows
+    assert len(rows) == 3
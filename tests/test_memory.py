@@ -0,0 +1,86 @@
+"""Бюджет памяти потокового импорта (memory)."""
+
+import json
+import logging
+import tracemalloc
+
+import pytest
+
+from instrument import TRACER
+from logs import setup_logging
+from memory import MemoryBudget, MemoryBudgetExceeded, rss
+
+
+@pytest.fixture
+def no_tracing():
+    was_tracing = tracemalloc.is_tracing()
+    tracemalloc.stop()
+    yield
+    tracemalloc.stop()
+    if was_tracing:
+        tracemalloc.start()
+
+
+def test_rss():
+    assert rss() > 0
+
+
+@pytest.fixture
+def memory_log(tmp_path):
+    """Сообщения журнала memory, записанные в JSON."""
+    root = logging.getLogger("crust")
+    saved = root.handlers[:], root.level, root.propagate
+    jsonl = tmp_path / "import.log.jsonl"
+    setup_logging("WARNING", jsonl=str(jsonl))
+
+    def records():
+        for h in root.handlers:
+            if isinstance(h, logging.FileHandler):
+                h.flush()
+        with open(jsonl, encoding="utf8") as inp:
+            return [r for r in map(json.loads, inp)
+                    if r["logger"] == "crust.memory"]
+    yield records
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+        if isinstance(h, logging.FileHandler):
+            h.close()
+    handlers, root.level, root.propagate = saved
+    for h in handlers:
+        root.addHandler(h)
+
+
+def test_rss_only_by_default(no_tracing, memory_log):
+    budget = MemoryBudget(1e6)
+    assert not tracemalloc.is_tracing()
+    budget.check("pipe")
+    assert budget.peak_rss > 0
+    [record] = memory_log()
+    assert record["level"] == "INFO"
+    assert record["message"].startswith("memory after pipe: RSS")
+    assert "traced" not in record["message"]
+
+
+def test_trace_opt_in(no_tracing, memory_log):
+    budget = MemoryBudget(trace=True)
+    assert tracemalloc.is_tracing()
+    budget.check("pipe")
+    assert "traced" in memory_log()[0]["message"]
+    assert TRACER.counters[("pipe", "traced_peak_bytes")] > 0
+
+
+def test_budget_exceeded(no_tracing, memory_log):
+    budget = MemoryBudget(1e-3)
+    with pytest.raises(MemoryBudgetExceeded, match="after pipe"):
+        budget.check("pipe")
+    info, warning = memory_log()
+    assert (info["level"], warning["level"]) == ("INFO", "WARNING")
+    assert "--trace-memory" in warning["message"]
+
+
+def test_budget_exceeded_sites(no_tracing, memory_log):
+    budget = MemoryBudget(1e-3, trace=True, top=3)
+    with pytest.raises(MemoryBudgetExceeded):
+        budget.check("pipe")
+    sites = memory_log()[-1]["message"].splitlines()
+    assert sites[0] == "top 3 allocation sites:" and len(sites) == 4
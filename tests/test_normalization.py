@@ -0,0 +1,102 @@
+"""Пересчёт единиц измерения (normalization)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alrosa_importer import normalize_frames
+from normalization import (
+    canonical_unit,
+    element_to_oxide,
+    normalize,
+    normalize_frame,
+    oxide_to_element,
+    to_numeric,
+    unit_factors,
+)
+
+
+def test_canonical_unit():
+    assert canonical_unit(" wt% ") == "%"
+    assert canonical_unit("г/т") == "PPM"
+    assert canonical_unit("мкг/кг") == "PPB"
+    assert canonical_unit("furlong") is None
+    assert canonical_unit(None) is None
+
+
+def test_unit_factors():
+    np.testing.assert_allclose(unit_factors(["%", "PPM", "PPB"], "PPM"),
+                               [1e4, 1.0, 1e-3])
+    assert np.isnan(unit_factors(["?"])[0])
+
+
+def test_to_numeric():
+    values = to_numeric(["0,15", " 2 ", "<0.1", None, 3])
+    np.testing.assert_allclose(values[[0, 1, 4]], [0.15, 2.0, 3.0])
+    assert np.isnan(values[[2, 3]]).all()
+
+
+def test_normalize():
+    np.testing.assert_allclose(normalize([1200, 0.5], ["PPM", "%"]), [0.12, 0.5])
+    np.testing.assert_allclose(normalize([0.12], "%", "PPM"), [1200.0])
+
+
+def test_oxide_element_roundtrip():
+    element = oxide_to_element([10.0], "Al2O3")
+    np.testing.assert_allclose(element, [5.29251], rtol=1e-5)
+    np.testing.assert_allclose(element_to_oxide(element, "Al2O3"), [10.0])
+    with pytest.raises(ValueError):
+        oxide_to_element([1.0], "Total")
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"шашка": ["a", "b"], "Ni": ["1200", "0,5"],
+                         "SiO2": [40.0, 41.0]})
+
+
+def test_normalize_frame_scalar_unit(frame):
+    df = normalize_frame(frame, "PPM", to_unit="%")
+    np.testing.assert_allclose(df["Ni"], [0.12, 0.00005])
+    np.testing.assert_allclose(df["SiO2"], [0.004, 0.0041])
+    assert list(df["шашка"]) == ["a", "b"]
+    assert frame["Ni"].tolist() == ["1200", "0,5"]  # исходная не изменяется
+
+
+def test_normalize_frame_same_unit_only_coerces(frame):
+    df = normalize_frame(frame, "wt%", to_unit="%")
+    np.testing.assert_allclose(df["Ni"], [1200.0, 0.5])
+
+
+def test_normalize_frame_dict_unit(frame):
+    df = normalize_frame(frame, {"Ni": "PPM"}, to_unit="%")
+    np.testing.assert_allclose(df["Ni"], [0.12, 0.00005])
+    np.testing.assert_allclose(df["SiO2"], [40.0, 41.0])
+
+
+@pytest.mark.parametrize("wrap", [list, np.array, pd.Series])
+def test_normalize_frame_vector_unit(frame, wrap):
+    df = normalize_frame(frame, wrap(["PPM", "%"]), to_unit="PPM")
+    np.testing.assert_allclose(df["Ni"], [1200.0, 5000.0])
+    np.testing.assert_allclose(df["SiO2"], [40.0, 410000.0])
+
+
+def test_normalize_frame_vector_unit_errors(frame):
+    with pytest.raises(ValueError):
+        normalize_frame(frame, np.array(["PPM", "%"]))
+    with pytest.raises(ValueError):
+        normalize_frame(frame, ["PPM"], to_unit="%")
+
+
+def test_normalize_frame_as_elements():
+    df = normalize_frame(pd.DataFrame({"Al2O3": [10.0]}), "%", as_elements=True)
+    assert list(df.columns) == ["Al"]
+    np.testing.assert_allclose(df["Al"], [5.29251], rtol=1e-5)
+
+
+def test_normalize_frames_converts_to_storage_units():
+    dfs = {"geochemy": pd.DataFrame({"Ni": ["0,12"]}),
+           "epma": pd.DataFrame({"NiO": [0.3]})}
+    new = normalize_frames(dfs, source_units={"geochemy": "%"})
+    np.testing.assert_allclose(new["geochemy"]["Ni"], [1200.0])
+    np.testing.assert_allclose(new["epma"]["NiO"], [0.3])
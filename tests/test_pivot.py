@@ -0,0 +1,68 @@
+"""Сводные таблицы «образец x элемент» (pivot)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pivot import PivotTable, column_key, column_name, parse_value
+
+NS = "http://www.daml.org/2003/01/periodictable/PeriodicTable#"
+
+
+def test_column_name():
+    assert column_name(NS + "Ni") == "Ni"
+    assert column_name("http://example.org/elements/Cr") == "Cr"
+    assert column_name("LOI") == "LOI"
+
+
+def test_column_order():
+    names = ["LOI", "Zr", "H", "Ni", "Au"]
+    assert sorted(names, key=column_key) == ["H", "Ni", "Zr", "Au", "LOI"]
+
+
+def test_parse_value():
+    assert parse_value("0,5") == (0.5, False)
+    assert parse_value(3) == (3.0, False)
+    value, censored = parse_value("<0.1")
+    assert np.isnan(value) and censored
+
+
+@pytest.fixture
+def table():
+    t = PivotTable()
+    t.add("site", "s1", "sample 1", NS + "Zr", "150")
+    t.add("site", "s1", "sample 1", NS + "Ni", "<5")
+    t.add("site", "s2", "sample 2", NS + "Ni", 1200)
+    t.add("site", "s2", "sample 2", NS + "Ni", 1300)  # заменяет предыдущее
+    return t
+
+
+def test_to_frame(table):
+    df = table.to_frame()
+    assert len(table) == 4
+    assert list(df.columns) == ["sample", "site", "Ni", "Zr"]
+    assert df["sample"].tolist() == ["sample 1", "sample 2"]
+    assert df["Ni"].tolist() == [0.0, 1300.0]  # цензурированное - 0.0
+    assert df["Zr"][0] == 150.0 and np.isnan(df["Zr"][1])  # отсутствует
+
+
+def test_censored_and_missing_values(table):
+    table.censored_value = -1.0
+    table.missing_value = -999.0
+    df = table.to_frame()
+    assert df["Ni"].tolist() == [-1.0, 1300.0]
+    assert df["Zr"].tolist() == [150.0, -999.0]
+
+
+def test_empty_table():
+    df = PivotTable().to_frame()
+    assert list(df.columns) == ["sample", "site"] and len(df) == 0
+
+
+def test_write(table, tmp_path):
+    filename = str(tmp_path / "site.csv")
+    table.write(filename)
+    df = pd.read_csv(filename)
+    assert list(df.columns) == ["sample", "site", "Ni", "Zr"]
+    with pytest.raises(ValueError):
+        table.write(str(tmp_path / "site.txt"))
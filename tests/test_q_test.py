@@ -0,0 +1,28 @@
+"""Параллельная выгрузка участков (q_test.export_sites)."""
+
+import os
+
+import common
+import q_test
+from sparql_stub import SPARQLStub
+
+VARIABLES = ["uri", "site_name", "sample_name", "element", "value", "unitid",
+             "unit"]
+PT = "http://www.daml.org/2003/01/periodictable/PeriodicTable#"
+ELEMENTS = ["Ni", "Cr", "Co", "V"]
+ROWS = [["s{}".format(i // 4), "site", "s{}".format(i // 4),
+         PT + ELEMENTS[i % 4], str(i), "ppm", "мг/кг"]
+        for i in range(q_test.PAGE_SIZE * 2 + 100)]
+SITES = ["site {}".format(i) for i in range(6)]
+
+
+def test_export_sites_bounded_by_connection_pool(monkeypatch, tmp_path):
+    with SPARQLStub(VARIABLES, ROWS, delay=0.05) as stub:
+        monkeypatch.setattr(common.NTQuery, "_endpoint_", stub.url)
+        reports = q_test.export_sites(SITES, str(tmp_path), jobs=4)
+    assert [r["site"] for r in reports] == SITES
+    assert all("error" not in r for r in reports), reports
+    assert all(r["samples"] == len(ROWS) // 4 for r in reports)
+    assert all(os.path.exists(r["file"]) for r in reports)
+    # 4 участка по 4 страницы без общего пула - до 16 запросов
+    assert stub.max_active <= common.CLIENT.pool_size
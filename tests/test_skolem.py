@@ -0,0 +1,33 @@
+"""Детерминированные UUID и IRI узлов (skolem)."""
+
+import uuid
+
+from rdflib import URIRef
+
+from skolem import SKOLEM_BASE, generate_deterministic_uuid, skolem_iri
+
+
+def test_generate_deterministic_uuid():
+    u = generate_deterministic_uuid("Мир")
+    assert isinstance(u, uuid.UUID) and u.version == 5
+    assert u == generate_deterministic_uuid("Мир")
+    assert u != generate_deterministic_uuid("Удачная")
+    assert u != generate_deterministic_uuid("Мир", sample="1")
+    assert (generate_deterministic_uuid("Мир", sample="1")
+            != generate_deterministic_uuid("Мир", sample="2"))
+    assert (generate_deterministic_uuid(pipe_uuid=u)
+            == generate_deterministic_uuid(pipe_uuid=str(u)))
+
+
+def test_skolem_iri():
+    parent = URIRef("http://example.org/analysis/1")
+    iri = skolem_iri(parent, "measurement", field="SiO2")
+    assert isinstance(iri, URIRef)
+    assert iri.startswith(SKOLEM_BASE + "measurement/")
+    uuid.UUID(iri.rsplit("/", 1)[1])
+    assert iri == skolem_iri(str(parent), "measurement", field="SiO2")
+    assert iri != skolem_iri(parent, "measurement", field="TiO2")
+    assert iri != skolem_iri(parent + "x", "measurement", field="SiO2")
+    # Вид узла - часть пространства имён UUID, а не только префикс IRI
+    other = skolem_iri(parent, "location", field="SiO2")
+    assert other.rsplit("/", 1)[1] != iri.rsplit("/", 1)[1]
@@ -0,0 +1,80 @@
+"""Пул соединений и кэш результатов SPARQLClient (common)."""
+
+import pytest
+
+from common import NTQuery, Query, ResultCache, SPARQLClient
+from sparql_stub import SPARQLStub
+
+QUERY = "SELECT ?name ?value FROM <{graph}> WHERE {{ ?s ?name ?value }}"
+ROWS = [["a", "1"], ["b", "2"], ["c", None]]
+
+
+@pytest.fixture
+def stub():
+    with SPARQLStub(["name", "value"], ROWS) as s:
+        yield s
+
+
+def test_result_cache_lru():
+    cache = ResultCache(maxsize=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" становится самой свежей записью
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_result_cache_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("common.time.monotonic", lambda: now[0])
+    cache = ResultCache(maxsize=2, ttl=10.0)
+    cache.put("a", 1)
+    now[0] += 5
+    assert cache.get("a") == 1
+    now[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_pooled_connection(stub):
+    client = SPARQLClient()
+    for _ in range(5):
+        Query(QUERY, "g", endpoint=stub.url, client=client).rows()
+    assert len(stub.queries) == 5
+    assert len(stub.ports) == 1
+    client.close()
+
+
+def test_cache_is_opt_in(stub):
+    client = SPARQLClient()
+    for _ in range(2):
+        rows = list(Query(QUERY, "g", endpoint=stub.url, client=client).rows())
+    assert rows == ROWS
+    assert len(stub.queries) == 2
+    for _ in range(2):
+        rows = list(Query(QUERY, "g", endpoint=stub.url, client=client,
+                          cache=True).rows())
+    assert rows == ROWS
+    assert len(stub.queries) == 3
+    # Другие параметры - другой ключ кэша
+    Query(QUERY, "other", endpoint=stub.url, client=client, cache=True).rows()
+    assert len(stub.queries) == 4
+    assert client.cache.hits == 1
+
+
+def test_cache_disabled_client(stub):
+    client = SPARQLClient(cache_size=0)
+    for _ in range(2):
+        client.select(stub.url, QUERY, cache=True)
+    assert client.cache is None
+    assert len(stub.queries) == 2
+
+
+def test_stream_rows(stub):
+    q = NTQuery(QUERY, "g", endpoint=stub.url, client=SPARQLClient())
+    assert [tuple(r) for r in q.results()] == [tuple(r) for r in ROWS]
+    assert q.header == ["name", "value"]
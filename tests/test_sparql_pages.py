@@ -0,0 +1,73 @@
+"""Постраничная выборка Query (common)."""
+
+import pytest
+
+from common import NTQuery, Query, SPARQLClient, TruncatedResult
+from sparql_stub import SPARQLStub
+
+QUERY = "SELECT ?name ?value FROM <{graph}> WHERE {{ ?s ?name ?value }}"
+ROWS = [["s{:02}".format(i), str(i)] for i in range(25)]
+
+
+def paged(stub, cls=Query, client=None, **kwargs):
+    return cls(QUERY, "g", endpoint=stub.url, client=client or SPARQLClient(),
+               page_size=10, workers=2, **kwargs)
+
+
+def test_pages_in_order_over_tsv():
+    with SPARQLStub(["name", "value"], ROWS) as stub:
+        q = paged(stub, NTQuery)
+        assert [list(r) for r in q.results()] == ROWS
+    assert all("tab-separated" in a for a in stub.accepts)
+    assert all("ORDER BY ?name ?value" in x for x in stub.queries)
+    offsets = sorted(int(x.rsplit("OFFSET", 1)[1]) for x in stub.queries)
+    assert offsets == [0, 10, 20, 30]
+
+
+def test_pages_exact_multiple_ends_on_empty_page():
+    with SPARQLStub(["name", "value"], ROWS[:20]) as stub:
+        assert list(paged(stub).rows()) == ROWS[:20]
+
+
+def test_pages_not_cached():
+    client = SPARQLClient()
+    with SPARQLStub(["name", "value"], ROWS) as stub:
+        for _ in range(2):
+            assert list(paged(stub, client=client, cache=True).rows()) == ROWS
+    assert len(client.cache) == 0
+    assert len(stub.queries) == 8
+
+
+def test_page_validated_before_yield():
+    """Точка доступа молча урезает ответ до 7 строк при странице 10."""
+    with SPARQLStub(["name", "value"], ROWS, max_rows=7, silent=True) as stub:
+        got = []
+        with pytest.raises(TruncatedResult):
+            for row in paged(stub).rows():
+                got.append(row)
+    assert got == []
+
+
+def test_oversized_page():
+    with SPARQLStub(["name", "value"], ROWS, ignore_limit=True) as stub:
+        with pytest.raises(TruncatedResult):
+            next(paged(stub).rows())
+
+
+def test_maxrows_header():
+    with SPARQLStub(["name", "value"], ROWS, max_rows=7) as stub:
+        with pytest.raises(TruncatedResult):
+            list(paged(stub).rows())
+
+
+def test_unbound_single_variable_rows():
+    """Строка TSV с единственной несвязанной переменной пуста."""
+    rows = [[None] if i % 3 == 0 else ["s{:02}".format(i)] for i in range(25)]
+    with SPARQLStub(["name"], rows) as stub:
+        client = SPARQLClient()
+        header, got = client.select_rows(stub.url, "SELECT ?name {}")
+        assert header == ["name"]
+        assert list(got) == rows
+        q = Query("SELECT ?name FROM <{graph}> WHERE {{ ?s ?name ?o }}", "g",
+                  endpoint=stub.url, client=client, page_size=10, workers=2)
+        assert list(q.rows()) == rows
@@ -0,0 +1,72 @@
+"""Проходы преобразования RDF-графа (transforms)."""
+
+import pytest
+from rdflib import RDF, RDFS, BNode, Graph, Literal
+from rdflib.namespace import WGS
+
+from namespace import PT, P
+from skolem import skolem_iri
+from transforms import (
+    LOCATION_UPDATE,
+    label_whitespace,
+    location_points,
+    normalized_values,
+    run_passes,
+    synthetic_graph,
+)
+
+
+def test_location_points():
+    g = synthetic_graph(3)
+    assert location_points(g) == 3
+    for s in g.subjects(RDF.type, PT.Sample):
+        point = g.value(s, WGS.location)
+        assert point == skolem_iri(s, "point")
+        assert (point, RDF.type, WGS.Point) in g
+        assert g.value(point, WGS.lat) is not None
+        assert (s, WGS.lat, None) not in g and (s, WGS.long, None) not in g
+        assert (s, RDF.type, WGS.SpatialThing) not in g
+    assert location_points(g) == 0
+
+
+def test_location_points_matches_update():
+    g = synthetic_graph(5)
+    location_points(g)
+    u = synthetic_graph(5)
+    u.update(LOCATION_UPDATE)
+    assert len(g) == len(u)
+    for s in u.subjects(RDF.type, PT.Sample):
+        point = g.value(s, WGS.location)
+        assert g.value(point, WGS.lat) == u.value(u.value(s, WGS.location),
+                                                  WGS.lat)
+
+
+def test_label_whitespace():
+    g = Graph()
+    g.add((P.a, RDFS.label, Literal("  Мир \n трубка ", lang="ru")))
+    g.add((P.b, RDFS.label, Literal("ok")))
+    assert label_whitespace(g) == 1
+    assert g.value(P.a, RDFS.label) == Literal("Мир трубка", lang="ru")
+    assert label_whitespace(g) == 0
+
+
+def test_normalized_values():
+    g = Graph()
+    g.add((P.m1, PT.value, Literal(1200)))
+    g.add((P.m1, PT.unit, PT.PPM))
+    g.add((P.m2, PT.value, BNode()))  # предел обнаружения
+    g.add((P.m2, PT.unit, PT.PPM))
+    g.add((P.m3, PT.value, Literal(41.5)))
+    g.add((P.m3, PT.unit, PT.Percent))
+    assert normalized_values(g) == 1
+    assert g.value(P.m1, PT.normalizedValue).toPython() == pytest.approx(0.12)
+    assert g.value(P.m1, PT.normalizedUnit) == PT.Percent
+    assert (P.m2, PT.normalizedValue, None) not in g
+    assert (P.m3, PT.normalizedValue, None) not in g
+    assert normalized_values(g) == 0
+
+
+def test_run_passes():
+    report = run_passes(synthetic_graph(4))
+    assert {name: n for name, (n, _) in report.items()} == {
+        "location_points": 4, "label_whitespace": 4, "normalized_values": 0}
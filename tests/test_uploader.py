@@ -0,0 +1,151 @@
+"""Сколемизация, разбиение на части и загрузка RDF-файлов (uploader)."""
+
+import json
+
+import pytest
+from rdflib import RDF, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.collection import Collection
+
+from http_stub import HTTPStub
+from uploader import (
+    Uploader,
+    UploadError,
+    bnode_labels,
+    nt_literal,
+    ntriples_lines,
+    ntriples_stream,
+    split_ntriples,
+)
+
+EX = Namespace("http://example.org/")
+SKOLEM = "http://example.org/.well-known/genid/"
+
+TURTLE = """
+@prefix ex: <http://example.org/> .
+ex:s1 ex:value "a\\nb" ;
+    ex:label "камень"@ru ;
+    ex:count 3 ;
+    ex:item [ ex:value 1 ; ex:unit [ ex:name "PPM" ] ] ;
+    ex:list ( 1 2 3 ) .
+ex:s2 ex:value "c" .
+"""
+
+
+@pytest.fixture
+def ttl(tmp_path):
+    filename = tmp_path / "g.ttl"
+    filename.write_text(TURTLE, encoding="utf8")
+    return str(filename)
+
+
+def test_long_list_labels():
+    g = Graph()
+    head = BNode()
+    Collection(g, head, [Literal(i) for i in range(5000)])
+    g.add((EX.s, EX.list, head))
+    labels = bnode_labels(g)
+    assert len(set(labels.values())) == 5000
+
+
+def cycle(g, ids, values):
+    """Цикл пустых узлов ids[0] -> ids[1] -> ... -> ids[0]."""
+    nodes = [BNode(i) for i in ids]
+    for i, (b, v) in enumerate(zip(nodes, values)):
+        g.add((b, EX.value, Literal(v)))
+        g.add((b, EX.next, nodes[(i + 1) % len(nodes)]))
+    g.add((EX.s, EX.item, nodes[0]))
+    return nodes
+
+
+def test_cycle_labels_do_not_depend_on_order():
+    g1 = Graph()
+    a = cycle(g1, ["a", "b", "c"], [1, 2, 3])
+    g2 = Graph()
+    b = cycle(g2, ["z", "y", "x"], [1, 2, 3])
+    triples = list(g2)
+    labels1 = bnode_labels(g1)
+    for shift in range(len(triples)):
+        labels2 = bnode_labels(triples[shift:] + triples[:shift])
+        assert [labels2[n] for n in b] == [labels1[n] for n in a]
+    assert len(set(labels1.values())) == 3
+
+
+def test_nt_literal():
+    assert nt_literal(Literal('a\n"b"\\')) == '"a\\n\\"b\\"\\\\"'
+    assert nt_literal(Literal("x", lang="ru")) == '"x"@ru'
+    assert nt_literal(Literal(3)) == (
+        '"3"^^<http://www.w3.org/2001/XMLSchema#integer>')
+
+
+def test_stream_matches_graph(ttl):
+    g = Graph()
+    g.parse(ttl)
+    assert sorted(set(ntriples_stream(ttl, SKOLEM))) == ntriples_lines(g, SKOLEM)
+    assert not any("_:" in line for line in ntriples_stream(ttl, SKOLEM))
+
+
+def test_split_ntriples(ttl):
+    parts = list(split_ntriples(ttl, triples_per_chunk=4, skolem_base=SKOLEM))
+    assert parts == list(split_ntriples(ttl, triples_per_chunk=4,
+                                        skolem_base=SKOLEM))
+    lines = b"".join(parts).decode("utf8").splitlines(keepends=True)
+    assert lines == sorted(set(lines))
+    assert all(len(p.splitlines()) <= 4 for p in parts)
+
+    g = Graph()
+    g.parse(ttl)
+    r = Graph()
+    r.parse(data=b"".join(parts).decode("utf8"), format="nt")
+    assert len(r) == len(g)
+    assert (EX.s1, EX.value, Literal("a\nb")) in r
+    items = list(r.objects(EX.s1, EX.list))
+    assert len(items) == 1 and isinstance(items[0], URIRef)
+    assert list(Collection(r, items[0])) == [Literal(i) for i in (1, 2, 3)]
+    assert (None, RDF.first, None) in r
+
+
+def test_upload_file_compressed(ttl):
+    with HTTPStub() as stub:
+        up = Uploader(compress=True, backoff=0.0)
+        up.upload_file(ttl, stub.url + "/dav/g.ttl")
+    [(method, path, headers, body)] = stub.requests
+    assert (method, path) == ("PUT", "/dav/g.ttl")
+    assert headers["Content-Type"] == "text/turtle"
+    assert body.decode("utf8") == TURTLE
+
+
+def test_upload_retries():
+    with HTTPStub(failures={"/dav/g.nt": 2}) as stub:
+        up = Uploader(retries=2, backoff=0.0)
+        up.put(stub.url + "/dav/g.nt", lambda counter: iter([b"x"]),
+               "application/n-triples")
+        assert stub.bodies() == [b"x"]
+    with HTTPStub(failures={"/dav/g.nt": 3}) as stub:
+        up = Uploader(retries=2, backoff=0.0)
+        with pytest.raises(UploadError):
+            up.put(stub.url + "/dav/g.nt", lambda counter: iter([b"x"]),
+                   "application/n-triples")
+
+
+def test_upload_chunks_resume(ttl):
+    url = "{user}/{name}"
+    with HTTPStub(failures={"/dav/g.part0002.nt": 10}) as stub:
+        up = Uploader(retries=1, backoff=0.0, workers=2)
+        with pytest.raises(UploadError):
+            up.upload_chunks(ttl, stub.url + "/" + url, user="dav",
+                             triples_per_chunk=4)
+        first = {p: b for _, p, _, b in stub.requests}
+        assert "/dav/g.part0001.nt" in first
+
+        stub.failures.clear()
+        stub.requests.clear()
+        parts = up.upload_chunks(ttl, stub.url + "/" + url, user="dav",
+                                 triples_per_chunk=4)
+        second = {p: b for _, p, _, b in stub.requests}
+    assert not set(first) & set(second)
+    assert set(first) | set(second) == {"/dav/" + p for p in parts}
+    with open(ttl + ".upload.json") as inp:
+        assert sorted(json.load(inp)["parts"]) == parts
+    bodies = dict(first, **second)
+    uploaded = b"".join(bodies[k] for k in sorted(bodies))
+    assert uploaded == b"".join(split_ntriples(ttl, 4))
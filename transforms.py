@@ -0,0 +1,194 @@
+"""
+Проходы преобразования RDF-графа на Python вместо SPARQL UPDATE.
+
+Перестройка всего графа запросом ``g.update()`` выполняется движком SPARQL
+rdflib очень медленно. Лучше всего записывать данные сразу в нужной форме
+(координаты импортёр i_pol пишет сразу в узел wgs:Point), а проходы
+применять к графам, полученным из других источников. Здесь те же преобразования записаны как проходы по
+индексам графа (``g.subjects()``, ``g.objects()``, ``g.triples()``):
+сначала собираются изменения, затем они применяются, поэтому время прохода
+линейно по числу затронутых триплетов.
+
+Проход - функция ``f(g) -> int`` (число изменённых узлов). Проходы
+выполняются функцией run_passes() по списку PASSES.
+
+Проходы:
+- location_points(): Перенос wgs:lat/wgs:long образцов в узел wgs:Point
+- label_whitespace(): Нормализация пробелов в rdfs:label
+- normalized_values(): Нормализованные значения (в %) для измерений в PPM
+
+Сравнение с g.update():
+    python transforms.py --bench 10000
+"""
+
+import time
+
+from rdflib import Graph, Literal, RDF, RDFS
+from rdflib.namespace import WGS
+
+from namespace import PT
+from normalization import PERCENT, normalize
+from skolem import skolem_iri
+
+# Тот же перенос координат, что и location_points(), на SPARQL UPDATE
+LOCATION_UPDATE = """
+    PREFIX pt: <{pt}>
+    PREFIX wgs: <{wgs}>
+    DELETE {{
+        ?sample a wgs:SpatialThing .
+        ?sample wgs:long ?long .
+        ?sample wgs:lat ?lat .
+    }}
+    INSERT {{
+        ?sample wgs:location _:l .
+        _:l a wgs:Point .
+        _:l wgs:long ?long .
+        _:l wgs:lat ?lat .
+    }}
+    WHERE {{
+        ?sample a pt:Sample .
+        ?sample wgs:long ?long .
+        ?sample wgs:lat ?lat .
+    }}
+    """.format(pt=PT, wgs=WGS)
+
+# IRI единицы -> обозначение для normalization.normalize()
+NORMALIZED_UNITS = {PT.PPM: "PPM"}
+
+
+def location_points(g, sample_type=PT.Sample):
+    """
+    Переносит координаты образцов в узлы wgs:Point.
+
+    Для каждого образца с wgs:lat и wgs:long создаётся точка
+    (sample wgs:location point), координаты и тип wgs:SpatialThing у
+    образца удаляются. IRI точки выводится из образца - так же, как при
+    записи координат импортёром (ImpState.point_coordinate()).
+    """
+    todo = [(s, lat, long)
+            for s in set(g.subjects(RDF.type, sample_type))
+            for lat in g.objects(s, WGS.lat)
+            for long in g.objects(s, WGS.long)]
+    for s, lat, long in todo:
+        point = skolem_iri(s, "point")
+        g.add((s, WGS.location, point))
+        g.add((point, RDF.type, WGS.Point))
+        g.add((point, WGS.long, long))
+        g.add((point, WGS.lat, lat))
+    for s, lat, long in todo:
+        g.remove((s, WGS.lat, lat))
+        g.remove((s, WGS.long, long))
+    for s in set(s for s, _, _ in todo):
+        g.remove((s, RDF.type, WGS.SpatialThing))
+    return len(todo)
+
+
+def label_whitespace(g):
+    """Убирает лишние пробелы и переводы строк в rdfs:label."""
+    todo = []
+    for s, label in g.subject_objects(RDFS.label):
+        if isinstance(label, Literal):
+            text = " ".join(str(label).split())
+            if text != str(label):
+                todo.append((s, label, text))
+    for s, label, text in todo:
+        g.remove((s, RDFS.label, label))
+        g.add((s, RDFS.label, Literal(text, lang=label.language,
+                                      datatype=label.datatype)))
+    return len(todo)
+
+
+def normalized_values(g, units=NORMALIZED_UNITS):
+    """
+    Добавляет pt:normalizedValue (в %) измерениям, у которых его нет.
+
+    Пересчёт выполняется одним векторным вызовом normalize() для всех
+    измерений графа (тот же, что ImpState.flush_normalized() для листа).
+    """
+    nodes, values, codes = [], [], []
+    for m, unit in g.subject_objects(PT.unit):
+        code = units.get(unit)
+        if code is None or (m, PT.normalizedValue, None) in g:
+            continue
+        value = g.value(m, PT.value)
+        if not isinstance(value, Literal):
+            continue  # Предел обнаружения - узел, а не число
+        nodes.append(m)
+        values.append(value.toPython())
+        codes.append(code)
+    if not nodes:
+        return 0
+    count = 0
+    for m, value in zip(nodes, normalize(values, codes, PERCENT)):
+        if value == value:  # не NaN
+            g.add((m, PT.normalizedValue, Literal(float(value))))
+            g.add((m, PT.normalizedUnit, PT.Percent))
+            count += 1
+    return count
+
+
+PASSES = [location_points, label_whitespace, normalized_values]
+
+
+def run_passes(g, passes=PASSES):
+    """
+    Выполняет проходы по очереди и печатает время каждого.
+
+    Returns:
+        dict: имя прохода -> (число изменений, время в секундах)
+    """
+    report = {}
+    for f in passes:
+        start = time.perf_counter()
+        n = f(g)
+        report[f.__name__] = (n, time.perf_counter() - start)
+        print("#!INFO: pass {}: {} changes in {:.3f}s".format(
+            f.__name__, n, report[f.__name__][1]))
+    return report
+
+
+def synthetic_graph(n):
+    """Граф из n образцов с координатами для сравнения производительности."""
+    from namespace import P
+
+    g = Graph()
+    for i in range(n):
+        s = P["sample-bench-{}".format(i)]
+        g.add((s, RDF.type, PT.Sample))
+        g.add((s, RDF.type, WGS.SpatialThing))
+        g.add((s, RDFS.label, Literal("  sample\n{} ".format(i))))
+        g.add((s, WGS.lat, Literal(50.0 + i * 1e-4)))
+        g.add((s, WGS.long, Literal(100.0 + i * 1e-4)))
+    return g
+
+
+def benchmark(n=10000):
+    """Сравнивает location_points() с тем же преобразованием через g.update()."""
+    results = {}
+    for name in ("g.update", "location_points"):
+        g = synthetic_graph(n)
+        start = time.perf_counter()
+        if name == "g.update":
+            g.update(LOCATION_UPDATE)
+        else:
+            location_points(g)
+        elapsed = time.perf_counter() - start
+        points = len(set(g.subjects(RDF.type, WGS.Point)))
+        left = len(list(g.triples((None, WGS.lat, None)))) - points
+        results[name] = elapsed
+        print("{:<16} {:>8} samples {:>9.3f}s  points={} left={}".format(
+            name, n, elapsed, points, left))
+    print("speedup: {:.1f}x".format(
+        results["g.update"] / max(results["location_points"], 1e-9)))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Сравнение проходов преобразования с g.update()")
+    parser.add_argument("--bench", type=int, default=10000,
+                        help="Число образцов в синтетическом графе")
+    args = parser.parse_args()
+    benchmark(args.bench)
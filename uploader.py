@@ -0,0 +1,551 @@
+"""
+Потоковая загрузка RDF-файлов в WebDAV-хранилище Virtuoso (rdf_sink).
+
+Файл передаётся телом-генератором блоками фиксированного размера, без
+чтения целиком в память, при необходимости со сжатием gzip
+(Content-Encoding). Очень большие графы можно разбить на части в формате
+N-Triples, которые загружаются несколькими параллельными запросами PUT.
+Разбиение не строит граф в памяти: триплеты разбираются потоком, и в
+памяти остаются только триплеты с пустыми узлами (для их меток);
+остальные строки сортируются внешней сортировкой на диске.
+Неудачные запросы повторяются с экспоненциальной задержкой.
+
+Загрузка по частям возобновляема: контрольные суммы загруженных частей
+записываются в файл-манифест (<файл>.upload.json), и при повторном
+запуске уже загруженные части пропускаются.
+
+Части загружаются в rdf_sink отдельными ресурсами
+(<name>.part0001.nt, ...). Чтобы все они попали в один именованный граф,
+для папки rdf_sink должно быть задано свойство virt:rdf_graph.
+
+Пример использования:
+    up = Uploader(auth=HTTPBasicAuth(USER, CRED))
+    up.upload_file("samples.ttl", PUTURL.format(user=USER, name="samples.ttl"))
+    up.upload_chunks("samples.ttl", PUTURL, user=USER, name="samples.ttl",
+                     triples_per_chunk=500000)
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import os.path
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests as rq
+from requests.adapters import HTTPAdapter
+
+from skolem import SKOLEM_BASE
+
+BLOCK_SIZE = 1 << 20  # 1 МиБ
+TRIPLES_PER_CHUNK = 500000
+RUN_LINES = 1000000  # Строк в одном отсортированном фрагменте
+
+CONTENT_TYPES = {
+    ".ttl": "text/turtle",
+    ".nt": "application/n-triples",
+    ".rdf": "application/rdf+xml",
+    ".owl": "application/rdf+xml",
+    ".xml": "application/rdf+xml",
+}
+
+# Коды ответа, при которых запрос повторяется
+RETRY_STATUS = frozenset([408, 429, 500, 502, 503, 504])
+
+
+class UploadError(Exception):
+    """Часть не удалось загрузить после всех повторов."""
+
+
+def content_type(filename):
+    """Возвращает MIME-тип RDF-файла по расширению."""
+    ext = os.path.splitext(filename)[1].lower()
+    return CONTENT_TYPES.get(ext, "application/octet-stream")
+
+
+def iter_file(filename, block_size=BLOCK_SIZE, compress=False, counter=None):
+    """
+    Читает файл блоками, при необходимости сжимая их gzip.
+
+    Args:
+        counter (list): Если задан, в counter[0] накапливается число
+            отправленных байт.
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    with open(filename, "rb") as inp:
+        while True:
+            block = inp.read(block_size)
+            if not block:
+                break
+            if z is not None:
+                block = z.compress(block)
+                if not block:
+                    continue
+            if counter is not None:
+                counter[0] += len(block)
+            yield block
+    if z is not None:
+        block = z.flush()
+        if counter is not None:
+            counter[0] += len(block)
+        yield block
+
+
+def iter_bytes(data, block_size=BLOCK_SIZE, compress=False, counter=None):
+    """То же, что iter_file(), для данных в памяти."""
+    if compress:
+        z = zlib.compressobj(6, zlib.DEFLATED, 31)
+        data = z.compress(data) + z.flush()
+    for i in range(0, len(data), block_size):
+        block = data[i:i + block_size]
+        if counter is not None:
+            counter[0] += len(block)
+        yield block
+
+
+def strongly_connected(nodes, edges):
+    """
+    Компоненты сильной связности графа (алгоритм Тарьяна без рекурсии).
+
+    Args:
+        nodes: Вершины.
+        edges (dict): Вершина -> список соседних вершин.
+
+    Returns:
+        list: Компоненты (множества вершин); каждая идёт после всех
+        компонент, достижимых из неё.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(edges.get(w, ()))))
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
+                if low[v] == index[v]:
+                    component = set()
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.add(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+
+def bnode_labels(graph):
+    """
+    Вычисляет детерминированные метки пустых узлов графа.
+
+    Метка - хэш содержимого узла (исходящих триплетов, вложенные пустые
+    узлы учитываются своими хэшами содержимого) и контекста, в котором он
+    упоминается (субъект и предикат входящих триплетов). Метки не зависят
+    от случайных идентификаторов, выдаваемых парсером, и от порядка обхода
+    графа, поэтому повторный разбор того же файла даёт те же метки. Узлы
+    с одинаковым содержимым в одинаковом контексте получают общую метку.
+
+    Хэши вычисляются без рекурсии по компонентам сильной связности, от
+    листьев к корням, поэтому длинные списки RDF не упираются в глубину
+    стека. Ссылки внутри цикла пустых узлов записываются как "_".
+
+    Args:
+        graph: Граф rdflib или последовательность триплетов.
+
+    Returns:
+        dict: BNode -> строка-хэш
+    """
+    from rdflib import BNode
+
+    out = {}
+    inc = {}
+    for s, p, o in graph:
+        if isinstance(s, BNode):
+            out.setdefault(s, []).append((p, o))
+        if isinstance(o, BNode):
+            inc.setdefault(o, []).append((s, p))
+    nodes = set(out) | set(inc)
+
+    def joined(items):
+        return "\n".join(sorted(items)).encode("utf8")
+
+    content = {}
+    children = {b: [o for _, o in out.get(b, ()) if isinstance(o, BNode)]
+                for b in nodes}
+    for component in strongly_connected(nodes, children):
+        for b in component:
+            items = []
+            for p, o in out.get(b, ()):
+                if isinstance(o, BNode):
+                    o = "_" if o in component else content[o]
+                else:
+                    o = o.n3()
+                items.append(p.n3() + " " + o)
+            content[b] = hashlib.sha1(joined(items)).hexdigest()
+
+    labels = {}
+    parents = {b: [s for s, _ in inc.get(b, ()) if isinstance(s, BNode)]
+               for b in nodes}
+    for component in strongly_connected(nodes, parents):
+        for b in component:
+            ctx = []
+            for s, p in inc.get(b, ()):
+                if isinstance(s, BNode):
+                    s = "_" if s in component else labels[s]
+                else:
+                    s = s.n3()
+                ctx.append(s + " " + p.n3())
+            h = hashlib.sha1(content[b].encode("ascii"))
+            h.update(joined(ctx))
+            labels[b] = h.hexdigest()
+    return labels
+
+
+NT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n",
+                            "\r": "\\r"})
+
+
+def nt_literal(lit):
+    """
+    Записывает литерал в синтаксисе N-Triples (в одну строку).
+
+    Literal.n3() записывает многострочные литералы в тройных кавычках,
+    что недопустимо в N-Triples.
+    """
+    text = '"{}"'.format(str(lit).translate(NT_ESCAPES))
+    if lit.language:
+        return text + "@" + lit.language
+    if lit.datatype:
+        return text + "^^<{}>".format(lit.datatype)
+    return text
+
+
+def ntriples_iter(graph, skolem_base):
+    """
+    Выдаёт строки N-Triples графа (без сортировки).
+
+    Пустые узлы заменяются IRI skolem_base + метка из bnode_labels().
+
+    Args:
+        graph: Граф rdflib или список триплетов.
+    """
+    from rdflib import BNode, Literal
+
+    labels = bnode_labels(graph)
+
+    def n3(t):
+        if isinstance(t, BNode):
+            return "<{}{}>".format(skolem_base, labels[t])
+        if isinstance(t, Literal):
+            return nt_literal(t)
+        return t.n3()
+
+    for s, p, o in graph:
+        yield "{} {} {} .\n".format(n3(s), n3(p), n3(o))
+
+
+def ntriples_lines(graph, skolem_base):
+    """Возвращает отсортированные строки N-Triples графа без повторов."""
+    return sorted(set(ntriples_iter(graph, skolem_base)))
+
+
+def ntriples_stream(filename, skolem_base=SKOLEM_BASE, format=None):
+    """
+    Выдаёт строки N-Triples RDF-файла (без сортировки), не строя граф.
+
+    Парсер rdflib пишет триплеты в хранилище-приёмник: триплеты без пустых
+    узлов сразу записываются во временный файл, в памяти остаются только
+    триплеты с пустыми узлами - их метки (bnode_labels()) зависят от всех
+    триплетов узла, поэтому они выдаются после разбора всего файла.
+    """
+    from rdflib import BNode, Graph, Literal
+    from rdflib.store import Store
+
+    def n3(t):
+        return nt_literal(t) if isinstance(t, Literal) else t.n3()
+
+    bnodes = []
+    with tempfile.TemporaryFile("w+", encoding="utf8") as spool:
+
+        class Sink(Store):
+            def add(self, triple, context, quoted=False):
+                s, p, o = triple
+                if isinstance(s, BNode) or isinstance(o, BNode):
+                    bnodes.append(triple)
+                else:
+                    spool.write("{} {} {} .\n".format(n3(s), n3(p), n3(o)))
+
+        Graph(store=Sink()).parse(filename, format=format)
+        spool.seek(0)
+        yield from spool
+    yield from ntriples_iter(bnodes, skolem_base)
+
+
+def external_sort(lines, filename, run_lines=RUN_LINES):
+    """
+    Записывает строки в файл отсортированными и без повторов.
+
+    Строки сортируются фрагментами по run_lines во временные файлы,
+    которые затем сливаются (heapq.merge).
+
+    Returns:
+        int: Число записанных строк.
+    """
+    runs = []
+    buf = []
+
+    def spill():
+        buf.sort()
+        tmp = tempfile.TemporaryFile("w+", encoding="utf8")
+        tmp.writelines(buf)
+        tmp.seek(0)
+        runs.append(tmp)
+        buf.clear()
+
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= run_lines:
+            spill()
+    if buf or not runs:
+        spill()
+
+    count = 0
+    last = None
+    with open(filename, "w", encoding="utf8") as o:
+        for line in heapq.merge(*runs):
+            if line != last:
+                o.write(line)
+                count += 1
+                last = line
+    for tmp in runs:
+        tmp.close()
+    return count
+
+
+def split_ntriples(filename, triples_per_chunk=TRIPLES_PER_CHUNK, format=None,
+                   skolem_base=SKOLEM_BASE):
+    """
+    Разбивает RDF-файл на части в формате N-Triples.
+
+    Пустые узлы заменяются IRI (сколемизация, см. bnode_labels()), иначе
+    ссылки на них между частями были бы потеряны. Строки отсортированы,
+    поэтому при повторном разборе того же файла части совпадают побайтно.
+    Файл разбирается потоком (ntriples_stream()) и сортируется на диске
+    (external_sort()); в памяти держатся триплеты с пустыми узлами,
+    фрагмент сортировки и одна часть.
+
+    Yields:
+        bytes: Текст N-Triples очередной части.
+    """
+    fd, sorted_name = tempfile.mkstemp(suffix=".nt")
+    os.close(fd)
+    try:
+        external_sort(ntriples_stream(filename, skolem_base, format),
+                      sorted_name)
+        with open(sorted_name, encoding="utf8") as lines:
+            while True:
+                chunk = "".join(itertools.islice(lines, triples_per_chunk))
+                if not chunk:
+                    break
+                yield chunk.encode("utf8")
+    finally:
+        os.remove(sorted_name)
+
+
+class Uploader:
+    """
+    Клиент загрузки с пулом соединений и повторами.
+
+    Args:
+        auth: Авторизация requests (например, HTTPBasicAuth).
+        workers (int): Число параллельных запросов PUT при загрузке по частям.
+        retries (int): Число повторов неудачного запроса.
+        backoff (float): Начальная задержка перед повтором, с; удваивается.
+        compress (bool): Сжимать тело запроса gzip.
+        timeout (float): Таймаут запроса, с.
+    """
+
+    def __init__(self, auth=None, workers=4, retries=5, backoff=1.0,
+                 compress=False, timeout=600.0):
+        self.session = rq.Session()
+        self.session.trust_env = False
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.auth = auth
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def put(self, url, body, ctype):
+        """Выполняет PUT с повторами (см. send())."""
+        return self.send("PUT", url, body, ctype)
+
+    def send(self, method, url, body, ctype, params=None):
+        """
+        Выполняет запрос с телом (PUT, POST) с повторами.
+
+        Args:
+            body: Функция от счётчика байт, возвращающая новый генератор
+                тела (генератор нельзя прочитать повторно).
+            params (dict): Параметры строки запроса.
+
+        Returns:
+            int: Число отправленных байт.
+        """
+        headers = {"Content-Type": ctype}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            counter = [0]
+            try:
+                rc = self.session.request(method, url, data=body(counter),
+                                          params=params, headers=headers,
+                                          auth=self.auth, timeout=self.timeout)
+            except (rq.ConnectionError, rq.Timeout) as e:
+                error = repr(e)
+            else:
+                if rc.status_code < 400:
+                    return counter[0]
+                error = "HTTP {}".format(rc.status_code)
+                if rc.status_code not in RETRY_STATUS:
+                    raise UploadError("{}: {}".format(url, error))
+            if attempt < self.retries:
+                print("#!WARNING {}: {}, retry in {:.1f}s".format(
+                    url, error, delay))
+                time.sleep(delay)
+                delay *= 2
+        raise UploadError("{}: {} after {} retries".format(
+            url, error, self.retries))
+
+    def upload_file(self, filename, url):
+        """Загружает файл целиком одним потоковым запросом PUT."""
+        start = time.perf_counter()
+        sent = self.put(
+            url,
+            lambda counter: iter_file(filename, compress=self.compress,
+                                      counter=counter),
+            content_type(filename))
+        report(url, sent, os.path.getsize(filename),
+               time.perf_counter() - start)
+        return sent
+
+    def upload_chunks(self, filename, url, user, name=None,
+                      triples_per_chunk=TRIPLES_PER_CHUNK, manifest=None):
+        """
+        Загружает файл частями N-Triples параллельными запросами PUT.
+
+        Args:
+            url (str): Шаблон адреса с полями {user} и {name}.
+            name (str): Базовое имя ресурса на сервере.
+            manifest (str): Файл учёта загруженных частей
+                (по умолчанию <filename>.upload.json).
+
+        Returns:
+            list: Имена частей на сервере.
+        """
+        if name is None:
+            name = os.path.basename(filename)
+        if manifest is None:
+            manifest = filename + ".upload.json"
+        with open(filename, "rb") as inp:
+            source = hashlib.sha1()
+            for block in iter(lambda: inp.read(BLOCK_SIZE), b""):
+                source.update(block)
+        state = {"source": source.hexdigest(),
+                 "triples_per_chunk": triples_per_chunk,
+                 "parts": {}}
+        if os.path.exists(manifest):
+            with open(manifest) as inp:
+                saved = json.load(inp)
+            # Изменённый файл или размер частей - загрузка заново
+            if all(saved.get(k) == state[k]
+                   for k in ("source", "triples_per_chunk")):
+                state = saved
+        done = state["parts"]
+
+        start = time.perf_counter()
+        totals = {"sent": 0, "raw": 0, "skipped": 0}
+
+        def save():
+            tmp = manifest + ".tmp"
+            with open(tmp, "w") as o:
+                json.dump(state, o, indent=1, sort_keys=True)
+            os.replace(tmp, manifest)
+
+        def run(number, data):
+            part = "{}.part{:04d}.nt".format(os.path.splitext(name)[0], number)
+            digest = hashlib.sha1(data).hexdigest()
+            if done.get(part) == digest:
+                with self._lock:
+                    totals["skipped"] += 1
+                return part
+            sent = self.put(
+                url.format(user=user, name=part),
+                lambda counter: iter_bytes(data, compress=self.compress,
+                                           counter=counter),
+                "application/n-triples")
+            with self._lock:
+                totals["sent"] += sent
+                totals["raw"] += len(data)
+                done[part] = digest
+                save()
+            print("PUT: {} ({} bytes)".format(part, sent))
+            return part
+
+        # Не более workers готовых частей в очереди: части берутся из
+        # потокового split_ntriples() по мере загрузки
+        parts = []
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            pending = []
+            for number, data in enumerate(
+                    split_ntriples(filename, triples_per_chunk), 1):
+                pending.append(ex.submit(run, number, data))
+                if len(pending) >= self.workers:
+                    parts.append(pending.pop(0).result())
+            parts.extend(f.result() for f in pending)
+
+        if totals["skipped"]:
+            print("#!INFO: {} parts already uploaded, skipped".format(
+                totals["skipped"]))
+        report(url.format(user=user, name=name), totals["sent"],
+               totals["raw"], time.perf_counter() - start)
+        return parts
+
+
+def report(url, sent, raw, elapsed):
+    """Печатает объём и скорость загрузки."""
+    elapsed = max(elapsed, 1e-9)
+    print("UPLOADED: {} {:.1f} MiB ({:.1f} MiB raw) in {:.1f}s, "
+          "{:.2f} MiB/s".format(url, sent / 2**20, raw / 2**20, elapsed,
+                                raw / 2**20 / elapsed))